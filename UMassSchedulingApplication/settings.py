@@ -40,6 +40,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'appusers.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -47,16 +48,47 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'appusers.profiling.TemplateProfilerMiddleware',
+    'appusers.profiling.RequestProfilerMiddleware',
 ]
 
+# Sampling profiler for live requests; see appusers.profiling.RequestProfilerMiddleware.
+REQUEST_PROFILER = False
+# Share of all requests profiled without being asked for, e.g. 0.001 for one in a thousand.
+REQUEST_PROFILE_SAMPLE_RATE = 0
+REQUEST_PROFILE_DIR = BASE_DIR / 'profiles'
+
+# Days rows are kept by the purge_old_data command before they are deleted.
+RETENTION_DAYS = {
+    'signups': 7,
+    'slots': 30,
+    'slot_events': 90,
+    'emails': 30,
+}
+
+# (failed attempts, seconds) allowed per username and per client address before logins are refused.
+# The counters live in the shared default cache, see CACHES.
+LOGIN_USER_LIMIT = (5, 5 * 60)
+LOGIN_IP_LIMIT = (50, 5 * 60)
+# Set when behind a proxy that sets X-Forwarded-For, so limits apply to the real client address.
+LOGIN_TRUST_FORWARDED_FOR = False
+
 ROOT_URLCONF = 'UMassSchedulingApplication.urls'
 
+# Strip indentation and blank lines from the project's HTML templates.
+MINIFY_TEMPLATES = True
+# Warm a WSGI worker up when it boots; see appusers.warmup.warm_up.
+WORKER_WARMUP = True
+# Compile all project templates as part of the warm-up.
+TEMPLATE_WARMUP = True
+# Responses smaller than this many bytes are not gzipped.
+COMPRESSION_MIN_SIZE = 1024
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates']
         ,
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -64,6 +96,14 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # The project's HTML templates are minified once when first compiled and then cached.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'appusers.template_loaders.MinifyingLoader' if MINIFY_TEMPLATES
+                    else 'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
@@ -81,6 +121,22 @@ DATABASES = {
     }
 }
 
+# The cache holds the invalidation versions, the login failure counters and the calendar feeds,
+# so every worker process must share it; a per-process cache such as LocMemCache fails the
+# appusers.E001 check. The table is created by the migrations. Redis or Memcached can replace it.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'appusers_cache',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    }
+}
+
+# Department codes mapped to a database alias above, usually a replica of 'default', that the
+# department's dashboard and reporting reads are sent to, so one busy department can't slow the
+# others down. Departments not listed read from 'default'.
+DEPARTMENT_DATABASES = {}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
@@ -120,6 +176,20 @@ STATIC_URL = 'static/'
 STATICFILES_DIRS = [
     BASE_DIR / "static",
     ]
+# Built by `manage.py build_static`: only the assets the templates use, content-hashed and precompressed.
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'appusers.assets.ManifestStaticStorage'},
+}
+
+# Uploaded files; profile pictures are stored under their content hash below MEDIA_ROOT.
+MEDIA_URL = '/media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+PROFILE_PICTURE_MAX_SIZE = 2 * 1024 * 1024
+# Serve the static assets and profile pictures through Django. Only meant for development; in
+# production the web server serves STATIC_URL and MEDIA_URL itself, see the README.
+SERVE_FILES = DEBUG
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
 
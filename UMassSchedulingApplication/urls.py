@@ -1,13 +1,21 @@
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 from appusers.views import home_view, signup_view, login_view, logout_view, available_slots, book_slots, create_slot, \
     activate, activation_sent, profile_view, assign_roles, forgot_password, passwordResetconfirm, enter_dates, \
-    add_semester, cancel_session, session_history, custom_page_not_found, change_password, get_sessions
+    add_semester, cancel_session, session_history, custom_page_not_found, change_password, get_sessions, \
+    slot_events, typeahead, course_options, roster_import, mark_attendance, \
+    cancel_sessions_range, profile_picture, static_asset, dashboard_stats, dashboard_chart, \
+    dashboard_heatmap, calendar_feed
+from appusers import api
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', login_view, name='login'),
     path('home/', home_view, name='home'),
+    path('dashboard/stats/', dashboard_stats, name='dashboard_stats'),
+    path('dashboard/chart/', dashboard_chart, name='dashboard_chart'),
+    path('dashboard/heatmap/', dashboard_heatmap, name='dashboard_heatmap'),
     path('signup/', signup_view, name='signup'),
     path('login/', login_view, name='login'),
     path('logout/', logout_view, name='logout'),
@@ -17,15 +25,32 @@ urlpatterns = [
     path('activate/<str:uidb64>/<str:token>/', activate, name='activate'),
     path('activation_sent/', activation_sent, name='activation_sent'),
     path('profile/', profile_view, name='profile'),
+    path('calendar/<str:token>.ics', calendar_feed, name='calendar_feed'),
     path('assign_roles/', assign_roles, name='assign_roles'),
+    path('roster-import/', roster_import, name='roster_import'),
     path('forgot_password/', forgot_password, name='forgot_password'),
     path('password_reset_confirm/<uidb64>/<token>/',passwordResetconfirm , name='password_reset_confirm'),
     path('enter_dates/', enter_dates, name='enter_dates'),
     path('add_semester/',add_semester,name='add_semester'),
     path('cancel-session/', cancel_session, name='cancel_session'),
+    path('cancel-sessions-range/', cancel_sessions_range, name='cancel_sessions_range'),
     path('session-hsitory/', session_history, name='session_history'),
+    path('mark-attendance/', mark_attendance, name='mark_attendance'),
     path('change-password/', change_password, name='change_password'),
     path('get_sessions/', get_sessions, name='get_sessions'),
+    path('slot-events/', slot_events, name='slot_events'),
+    path('typeahead/', typeahead, name='typeahead'),
+    path('course-options/', course_options, name='course_options'),
+    path(f'api/{api.API_VERSION}/slots/', api.slots, name='api_slots'),
+    path(f'api/{api.API_VERSION}/batch/', api.batch, name='api_batch'),
     path('404/', custom_page_not_found, name='404'),
 
 ]
+
+# Every file request served here takes up a Python worker; in production the web server serves
+# these paths, see the README.
+if settings.SERVE_FILES:
+    urlpatterns += [
+        path('media/profile_pictures/<path:name>', profile_picture, name='profile_picture'),
+        path('static/<path:path>', static_asset, name='static_asset'),
+    ]
@@ -9,8 +9,15 @@ https://docs.djangoproject.com/en/4.1/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'UMassSchedulingApplication.settings')
 
 application = get_wsgi_application()
+
+if settings.WORKER_WARMUP:
+    # Resolve URLs, compile templates, fill caches and connect to the database before the
+    # worker accepts its first request.
+    from appusers.warmup import warm_up
+    warm_up()
@@ -1,12 +1,123 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.utils.functional import cached_property
+
+from .attendance import mark_no_shows
+from .caching import estimated_count, forget_count_gap
+from .events import publish_slot_events
 from .models import Tutor, Student, Course, Department, Availability, SemesterDates
 
-# Register your models here.
-admin.site.register(Tutor)
-admin.site.register(Student)
-admin.site.register(Course)
-admin.site.register(Department)
-admin.site.register(Availability)
-admin.site.register(SemesterDates)
+# Below this many rows the changelist counts exactly; above it, unfiltered pages use an estimate.
+ESTIMATE_THRESHOLD = 10000
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that estimates the size of an unfiltered table instead of counting every row.
+
+    The estimate comes from estimated_count, which corrects the largest primary key for deleted
+    rows with an occasional exact count, and is only used when there is no filter to apply.
+    If rows were deleted since that count, such as by purge_old_data, the estimate is too high;
+    a page that comes back empty then replaces it with an exact count and serves the real last
+    page.
+    """
+
+    estimated = False
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            estimate = estimated_count(self.object_list.model)
+            if estimate > ESTIMATE_THRESHOLD:
+                self.estimated = True
+                return estimate
+        return super().count
+
+    def page(self, number):
+        page = super().page(number)
+        if self.estimated and page.number > 1 and not len(page.object_list):
+            forget_count_gap(self.object_list.model)
+            self.estimated = False
+            self.__dict__['count'] = super().count
+            self.__dict__.pop('num_pages', None)
+            page = super().page(min(page.number, self.num_pages))
+        return page
+
+
+@admin.register(Tutor)
+class TutorAdmin(admin.ModelAdmin):
+    list_display = ('user', 'department', 'notification_mode')
+    list_select_related = ('user', 'department')
+    list_filter = ('department',)
+    ordering = ('user__username',)
+    search_fields = ('user__username', 'user__first_name', 'user__last_name')
+    raw_id_fields = ('user',)
+    filter_horizontal = ('courses',)
+
 
+@admin.register(Student)
+class StudentAdmin(admin.ModelAdmin):
+    list_display = ('user', 'ums_id', 'no_shows')
+    list_select_related = ('user',)
+    ordering = ('user__username',)
+    search_fields = ('user__username', 'user__first_name', 'user__last_name', 'ums_id')
+    raw_id_fields = ('user',)
+    filter_horizontal = ('courses',)
 
+
+@admin.register(Course)
+class CourseAdmin(admin.ModelAdmin):
+    list_display = ('c_name', 'c_code', 'department')
+    list_select_related = ('department',)
+    list_filter = ('department',)
+    ordering = ('c_code',)
+    search_fields = ('c_name', 'c_code')
+
+
+@admin.register(Availability)
+class AvailabilityAdmin(admin.ModelAdmin):
+    list_display = ('date', 'start_time', 'end_time', 'course', 'tutor', 'booked_by', 'status', 'attended')
+    list_select_related = ('course', 'tutor__user', 'booked_by__user')
+    # Status, course and the date drill-down are each served by an index on Availability.
+    list_filter = ('status', 'course__department', 'course', 'attended')
+    date_hierarchy = 'date'
+    ordering = ('-date', 'start_time')
+    autocomplete_fields = ('tutor', 'booked_by', 'course')
+    search_fields = ('tutor__user__username', 'booked_by__user__username', 'course__c_code')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ('mark_booked', 'cancel_sessions', 'mark_no_show')
+
+    @admin.action(description='Mark selected sessions as booked')
+    def mark_booked(self, request, queryset):
+        with transaction.atomic():
+            sessions = list(queryset.filter(booked_by__isnull=False).exclude(status='B')
+                            .select_related('tutor__user', 'course'))
+            publish_slot_events('booked', sessions, 'B')
+            updated = Availability.objects.filter(id__in=[session.id for session in sessions]).update(status='B')
+        self.message_user(request, f'{updated} session(s) marked as booked.', messages.SUCCESS)
+
+    @admin.action(description='Cancel selected sessions')
+    def cancel_sessions(self, request, queryset):
+        with transaction.atomic():
+            sessions = list(queryset.exclude(status='C').select_related('tutor__user', 'course'))
+            publish_slot_events('cancelled', sessions, 'C')
+            updated = Availability.objects.filter(id__in=[session.id for session in sessions]).update(status='C')
+        self.message_user(request, f'{updated} session(s) cancelled.', messages.SUCCESS)
+
+    @admin.action(description='Mark selected sessions as no-shows')
+    def mark_no_show(self, request, queryset):
+        updated = mark_no_shows(list(queryset.values_list('id', flat=True)))
+        self.message_user(request, f'{updated} session(s) marked as no-shows.', messages.SUCCESS)
+
+
+@admin.register(Department)
+class DepartmentAdmin(admin.ModelAdmin):
+    list_display = ('d_name', 'code')
+    ordering = ('d_name',)
+    prepopulated_fields = {'code': ('d_name',)}
+
+
+admin.site.register(SemesterDates)
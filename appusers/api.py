@@ -0,0 +1,295 @@
+import functools
+import json
+from contextlib import ExitStack
+
+from django.db import connections, transaction
+from django.http import JsonResponse
+from django.utils.dateparse import parse_date
+from django.views.decorators.http import require_GET, require_POST
+
+from .calendar_feed import touch_calendars
+from .events import publish_slot_events
+from .intervals import IntervalIndex
+from .mail import build_email, queue_emails
+from .models import Availability, Student
+from .notifications import tutor_email
+
+API_VERSION = 'v1'
+MAX_OPERATIONS = 100
+MAX_PAGE_SIZE = 500
+DEFAULT_PAGE_SIZE = 100
+
+# Fields a client may ask for, mapped to the lookups they are read from; only the joins the
+# requested fields need end up in the query.
+SLOT_FIELDS = {
+    'id': 'id',
+    'date': 'date',
+    'start_time': 'start_time',
+    'end_time': 'end_time',
+    'status': 'status',
+    'course_id': 'course_id',
+    'course': 'course__c_name',
+    'course_code': 'course__c_code',
+    'department': 'course__department__code',
+    'tutor_id': 'tutor_id',
+    'tutor': 'tutor__user__username',
+    'booked_by_id': 'booked_by_id',
+    'booked_by': 'booked_by__user__username',
+    'attended': 'attended',
+}
+DEFAULT_SLOT_FIELDS = ('id', 'date', 'start_time', 'end_time', 'status', 'course', 'tutor')
+# Fields naming the booking student; only superusers, the slot's tutor and that student see them.
+PRIVATE_SLOT_FIELDS = ('booked_by_id', 'booked_by')
+
+
+class QueryCounter:
+    """Counts the queries run while it is active, on every database connection."""
+
+    def __init__(self):
+        self.count = 0
+        self._stack = ExitStack()
+
+    def __enter__(self):
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def api_view(view):
+    """
+    Wraps an API view: requires a logged-in user, answering 401 rather than redirecting, and adds
+    the API version and the number of queries the request ran to the JSON response.
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'version': API_VERSION, 'error': 'Authentication required.'}, status=401)
+        with QueryCounter() as queries:
+            data, status = view(request, *args, **kwargs)
+        return JsonResponse(dict(data, version=API_VERSION, queries=queries.count), status=status)
+    return wrapper
+
+
+def _error(message, status=400):
+    return {'error': message}, status
+
+
+@require_GET
+@api_view
+def slots(request):
+    """
+    Lists slots with only the fields the client asks for.
+
+    GET parameters:
+        fields: Comma-separated SLOT_FIELDS keys; defaults to DEFAULT_SLOT_FIELDS.
+        status, course, tutor: Filter on status and on course and tutor ids.
+        department: Filter on the code of the courses' department.
+        date_from, date_to: Filter on the date range, inclusive.
+        mine: Only the user's own bookings (students) or slots (tutors).
+        after, limit: Keyset pagination on the slot id.
+
+    Students only see slots of their own courses. Cancelled slots are left out unless asked for.
+    The PRIVATE_SLOT_FIELDS are null on the rows of other tutors and other students.
+    """
+    fields = [field.strip() for field in request.GET.get('fields', '').split(',') if field.strip()]
+    fields = fields or list(DEFAULT_SLOT_FIELDS)
+    unknown = [field for field in fields if field not in SLOT_FIELDS]
+    if unknown:
+        return _error(f"Unknown field(s): {', '.join(unknown)}.")
+    if 'id' not in fields:
+        fields.insert(0, 'id')
+
+    queryset = Availability.objects.all() if request.GET.get('status') == 'C' else Availability.objects.active()
+    if request.GET.get('status'):
+        queryset = queryset.filter(status=request.GET['status'])
+    for param, lookup in (('course', 'course_id'), ('tutor', 'tutor_id')):
+        if request.GET.get(param, '').isdigit():
+            queryset = queryset.filter(**{lookup: int(request.GET[param])})
+    if request.GET.get('department'):
+        queryset = queryset.filter(course__department__code=request.GET['department'])
+    for param, lookup in (('date_from', 'date__gte'), ('date_to', 'date__lte')):
+        if request.GET.get(param):
+            value = parse_date(request.GET[param])
+            if value is None:
+                return _error(f'{param} must be a YYYY-MM-DD date.')
+            queryset = queryset.filter(**{lookup: value})
+
+    student = request.user.student if hasattr(request.user, 'student') else None
+    tutor = request.user.tutor if hasattr(request.user, 'tutor') else None
+    if request.GET.get('mine'):
+        if student:
+            queryset = queryset.filter(booked_by=student)
+        elif tutor:
+            queryset = queryset.filter(tutor=tutor)
+    if student and not request.user.is_superuser:
+        queryset = queryset.filter(course__in=student.courses.values('id'))
+
+    try:
+        limit = min(int(request.GET.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        after = int(request.GET.get('after', 0))
+    except ValueError:
+        return _error('limit and after must be integers.')
+
+    # The owners of each row, read along to decide whether its private fields are shown.
+    private = [field for field in PRIVATE_SLOT_FIELDS if field in fields] if not request.user.is_superuser else []
+    lookups = [SLOT_FIELDS[field] for field in fields] + (['tutor_id', 'booked_by_id'] if private else [])
+    rows = list(queryset.filter(id__gt=after).order_by('id').values_list(*lookups)[:limit])
+    results = [dict(zip(fields, row)) for row in rows]
+    for result, row in zip(results, rows):
+        if private and not ((tutor and row[-2] == tutor.id) or (student and row[-1] == student.id)):
+            result.update(dict.fromkeys(private))
+        if 'date' in result:
+            result['date'] = str(result['date'])
+        for field in ('start_time', 'end_time'):
+            if field in result:
+                result[field] = result[field].isoformat(timespec='minutes')
+    return {'slots': results, 'next_after': results[-1]['id'] if len(results) == limit else None}, 200
+
+
+def _check_operation(op, slot, user, student, enrolled):
+    """Returns an error message if the user may not apply the operation to the slot, else None."""
+    if slot is None:
+        return 'Slot not found.'
+    if op == 'book':
+        if slot.status != 'A' or slot.booked_by_id:
+            return 'Slot is not available.'
+        if student is None:
+            return 'Only students can book slots.'
+        if student.no_shows > 2:
+            return 'Booking is blocked after more than 2 no-shows.'
+        if not user.is_superuser and slot.course_id not in enrolled:
+            return 'You are not enrolled in this course.'
+        return None
+    if slot.status == 'C':
+        return 'Slot is already cancelled.'
+    if user.is_superuser:
+        return None
+    if hasattr(user, 'student') and slot.booked_by_id == user.student.id:
+        return None
+    if hasattr(user, 'tutor') and slot.tutor_id == user.tutor.id:
+        return None
+    return 'You can only cancel your own sessions.'
+
+
+@require_POST
+@api_view
+def batch(request):
+    """
+    Applies many booking and cancelling operations in one transaction.
+
+    The body is JSON: {"operations": [{"op": "book" or "cancel", "slot": id}, ...],
+    "all_or_nothing": bool}. Superusers may add "student" to book on a student's behalf. Each slot
+    may appear once, and bookings may not overlap the student's other sessions. Operations are
+    validated first and then applied with one update per kind, so the number of queries doesn't
+    grow with the number of operations. Invalid operations are reported and skipped, or, with
+    all_or_nothing, make the whole batch be rejected.
+
+    Students cancelling reopen their slot; tutors and superusers cancelling close it.
+    """
+    try:
+        body = json.loads(request.body or b'{}')
+        operations = body['operations']
+        assert isinstance(operations, list)
+    except (ValueError, KeyError, AssertionError):
+        return _error('Expected a JSON body with an "operations" list.')
+    if not operations or len(operations) > MAX_OPERATIONS:
+        return _error(f'Send between 1 and {MAX_OPERATIONS} operations.')
+
+    user = request.user
+    own_student = user.student if hasattr(user, 'student') else None
+    results = []
+    slot_ids = []
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict) or operation.get('op') not in ('book', 'cancel') \
+                or not isinstance(operation.get('slot'), int):
+            results.append({'index': index, 'ok': False, 'error': 'Each operation needs an op and a slot id.'})
+        elif operation['slot'] in slot_ids:
+            results.append({'index': index, 'ok': False, 'error': 'A slot may appear only once per batch.'})
+        else:
+            results.append({'index': index, 'op': operation['op'], 'slot': operation['slot'], 'ok': True})
+        slot_ids.append(operation.get('slot') if isinstance(operation, dict) else None)
+
+    with transaction.atomic():
+        slots_by_id = Availability.objects.select_for_update().select_related('course', 'tutor__user') \
+            .in_bulk([result['slot'] for result in results if result['ok']])
+        students = {}
+        if user.is_superuser:
+            wanted = {operation.get('student') for operation in operations
+                      if isinstance(operation, dict) and isinstance(operation.get('student'), int)}
+            students = Student.objects.select_related('user').in_bulk(wanted)
+        enrolled = set(own_student.courses.values_list('id', flat=True)) if own_student else set()
+
+        # Each student's sessions on the days being booked, to keep bookings from overlapping.
+        schedules = {}
+        if any(operation.get('op') == 'book' for operation in operations if isinstance(operation, dict)):
+            for student_id, day, start, end, slot_id in (
+                    Availability.objects.active()
+                    .filter(booked_by_id__in=set(students) | {own_student.id if own_student else None},
+                            date__in={slot.date for slot in slots_by_id.values()})
+                    .values_list('booked_by_id', 'date', 'start_time', 'end_time', 'id')):
+                schedules.setdefault((student_id, day), []).append((start, end, slot_id))
+        schedules = {key: IntervalIndex(intervals) for key, intervals in schedules.items()}
+
+        booked, student_cancelled, closed = {}, [], []
+        for result, operation in zip(results, operations):
+            if not result['ok']:
+                continue
+            slot = slots_by_id.get(result['slot'])
+            student = students.get(operation.get('student')) if user.is_superuser else own_student
+            error = _check_operation(operation['op'], slot, user, student, enrolled)
+            if not error and operation['op'] == 'book':
+                schedule = schedules.setdefault((student.id, slot.date), IntervalIndex())
+                if schedule.add(slot.start_time, slot.end_time, slot.id) is not None:
+                    error = "Overlaps another of the student's sessions."
+            if error:
+                result.update(ok=False, error=error)
+            elif operation['op'] == 'book':
+                booked.setdefault(student, []).append(slot)
+                result['status'] = 'B'
+            elif own_student and slot.booked_by_id == own_student.id and not user.is_superuser:
+                student_cancelled.append(slot)
+                result['status'] = 'A'
+            else:
+                closed.append(slot)
+                result['status'] = 'C'
+
+        if body.get('all_or_nothing') and not all(result['ok'] for result in results):
+            for result in results:
+                if result['ok']:
+                    result.update(ok=False, error='Not applied because another operation failed.')
+                    result.pop('status', None)
+            return {'applied': 0, 'results': results}, 409
+
+        emails = []
+        for student, student_slots in booked.items():
+            publish_slot_events('booked', student_slots, 'B', student_id=student.id)
+            Availability.objects.filter(id__in=[slot.id for slot in student_slots]).update(
+                status='B', booked_by=student)
+            touch_calendars(student_ids=[student.id])
+            for slot in student_slots:
+                slot.status, slot.booked_by = 'B', student
+                emails.append(build_email(student.user.email, 'Session Booked', 'emails/session_booked_email.html', {
+                    'user': student.user,
+                    'course': slot.course,
+                    'tutor': slot.tutor,
+                    'timeblock': slot.get_timeblock_display(),
+                }))
+                emails.append(tutor_email('booked', slot, student))
+        if student_cancelled:
+            emails.extend(tutor_email('cancelled', slot, own_student) for slot in student_cancelled)
+            publish_slot_events('cancelled', student_cancelled, 'A')
+            Availability.objects.filter(id__in=[slot.id for slot in student_cancelled]).update(
+                status='A', booked_by=None, reminder_sent_at=None)
+        if closed:
+            publish_slot_events('cancelled', closed, 'C')
+            Availability.objects.filter(id__in=[slot.id for slot in closed]).update(status='C')
+        queue_emails([email for email in emails if email is not None and email.to_email], send=True)
+
+    return {'applied': sum(result['ok'] for result in results), 'results': results}, 200
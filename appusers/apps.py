@@ -10,3 +10,31 @@ class AppusersConfig(AppConfig):
     """
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'appusers'
+
+    def ready(self):
+        """
+        Connects the signal handlers that keep the in-memory typeahead index, the cached
+        course-tutor mapping and the calendar feeds up to date, and registers the system checks.
+        """
+        from django.contrib.auth.models import User
+        from django.core.checks import register
+        from django.db.models.signals import m2m_changed, post_save, post_delete
+        from . import caching, calendar_feed, checks, search
+        from .models import Availability, Course, Tutor
+
+        post_save.connect(search.course_saved, sender=Course, dispatch_uid='typeahead_course_saved')
+        post_delete.connect(search.course_deleted, sender=Course, dispatch_uid='typeahead_course_deleted')
+        post_save.connect(search.tutor_saved, sender=Tutor, dispatch_uid='typeahead_tutor_saved')
+        post_delete.connect(search.tutor_deleted, sender=Tutor, dispatch_uid='typeahead_tutor_deleted')
+        post_save.connect(search.user_saved, sender=User, dispatch_uid='typeahead_user_saved')
+
+        m2m_changed.connect(caching.invalidate_course_tutor_map, sender=Tutor.courses.through,
+                            dispatch_uid='course_tutor_map_changed')
+        post_delete.connect(caching.invalidate_course_tutor_map, sender=Tutor, dispatch_uid='course_tutor_map_tutor')
+        post_delete.connect(caching.invalidate_course_tutor_map, sender=Course, dispatch_uid='course_tutor_map_course')
+        post_save.connect(calendar_feed.availability_changed, sender=Availability,
+                          dispatch_uid='calendar_availability_saved')
+        post_delete.connect(calendar_feed.availability_changed, sender=Availability,
+                            dispatch_uid='calendar_availability_deleted')
+
+        register(checks.check_shared_cache, 'caches')
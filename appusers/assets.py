@@ -0,0 +1,155 @@
+import gzip
+import os
+import posixpath
+import re
+from urllib.parse import unquote, urlsplit
+
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.storage import FileSystemStorage
+from django.template import engines
+
+try:
+    import brotli
+except ImportError:  # Brotli siblings are optional; gzip ones are always written.
+    brotli = None
+
+STATIC_TAG_RE = re.compile(r"""{%\s*static\s+(['"])(?P<path>[^'"]+)\1""")
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.json', '.map', '.svg', '.txt', '.eot', '.ttf')
+# A compressed sibling is only kept when it saves at least this share of the original size.
+MIN_SAVING = 0.05
+
+
+class ManifestStaticStorage(ManifestStaticFilesStorage):
+    """
+    Static storage that resolves names through the build manifest and tolerates unbuilt assets.
+
+    Assets referenced by templates are content-hashed by the build_static command. Anything else,
+    such as assets referenced through template variables, keeps its plain name and is served
+    from its source directory instead of failing the page.
+    """
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def is_hashed(self, name):
+        """Returns whether name is a content-hashed asset from the manifest."""
+        if not hasattr(self, '_hashed_names'):
+            self._hashed_names = set(self.hashed_files.values())
+        return name in self._hashed_names
+
+
+def template_sources():
+    """Yields the source of every template of every template engine."""
+    for engine in engines.all():
+        directories = list(getattr(engine, 'template_dirs', ()))
+        for directory in directories:
+            for root, _, files in os.walk(directory):
+                for filename in files:
+                    if filename.endswith(('.html', '.txt', '.xml')):
+                        with open(os.path.join(root, filename), encoding='utf-8', errors='replace') as source:
+                            yield source.read()
+
+
+def _dependencies(path, content):
+    """Yields the static paths a CSS or JS file refers to, as the hashing storage will look them up."""
+    for pattern, expressions in ManifestStaticFilesStorage.patterns:
+        if not posixpath.basename(path).endswith(pattern.lstrip('*')):
+            continue
+        for expression in expressions:
+            if isinstance(expression, tuple):
+                expression = expression[0]
+            for match in re.finditer(expression, content, re.IGNORECASE):
+                url = match.group('url').strip()
+                if not url or url.startswith(('#', '/', 'data:')) or re.match(r'^[a-z]+:', url, re.IGNORECASE):
+                    continue
+                yield posixpath.normpath(posixpath.join(posixpath.dirname(path), unquote(urlsplit(url).path)))
+
+
+def referenced_assets():
+    """
+    Finds the static assets the templates use, along with the files those assets refer to.
+
+    Returns:
+        dict: Static paths mapped to their absolute source paths.
+
+    Raises:
+        FileNotFoundError: If a referenced asset can't be found by the static file finders.
+    """
+    pending = {match.group('path') for source in template_sources() for match in STATIC_TAG_RE.finditer(source)}
+    found = {}
+    while pending:
+        path = pending.pop()
+        if path in found:
+            continue
+        absolute = finders.find(path)
+        if absolute is None:
+            raise FileNotFoundError(f'Static asset {path} is referenced but could not be found.')
+        found[path] = absolute
+        if path.endswith(('.css', '.js')):
+            with open(absolute, encoding='utf-8', errors='replace') as asset:
+                pending.update(set(_dependencies(path, asset.read())) - set(found))
+    return found
+
+
+def compress_asset(path):
+    """
+    Writes gzip and, when available, brotli siblings next to a built asset.
+
+    Args:
+        path (str): The absolute path of the asset.
+
+    Returns:
+        list: The paths of the siblings written.
+    """
+    with open(path, 'rb') as asset:
+        data = asset.read()
+    variants = [('.gz', lambda raw: gzip.compress(raw, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', lambda raw: brotli.compress(raw, quality=11)))
+    written = []
+    for suffix, compress in variants:
+        compressed = compress(data)
+        if len(compressed) <= len(data) * (1 - MIN_SAVING):
+            with open(path + suffix, 'wb') as sibling:
+                sibling.write(compressed)
+            written.append(path + suffix)
+    return written
+
+
+def build_static(storage):
+    """
+    Collects the referenced assets into the static root, hashes them and precompresses them.
+
+    The files are copied, then content-hashed by the storage, which also rewrites the references
+    between them and writes the manifest that {% static %} resolves names through.
+
+    Args:
+        storage (ManifestStaticStorage): The static files storage to build into.
+
+    Returns:
+        tuple: (number of assets built, number of compressed siblings written).
+    """
+    assets = referenced_assets()
+    sources = {}
+    for path, absolute in assets.items():
+        source = FileSystemStorage(location=absolute[:-len(path)])
+        sources[path] = (source, path)
+        if storage.exists(path):
+            storage.delete(path)
+        with source.open(path) as asset:
+            storage.save(path, asset)
+
+    for name, hashed_name, processed in storage.post_process(sources):
+        if isinstance(processed, Exception):
+            raise processed
+
+    siblings = 0
+    for hashed_name in set(storage.hashed_files.values()):
+        if hashed_name.endswith(COMPRESSIBLE_EXTENSIONS):
+            siblings += len(compress_asset(storage.path(hashed_name)))
+    return len(assets), siblings
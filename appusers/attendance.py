@@ -0,0 +1,120 @@
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Availability, JobWatermark, Student
+
+NO_SHOW_JOB = 'no_shows'
+
+
+def _processed_until():
+    # Locks the no-show job's watermark, so the job can't process the same sessions meanwhile.
+    return (JobWatermark.objects.select_for_update().filter(name=NO_SHOW_JOB)
+            .values_list('date', flat=True).first())
+
+
+def _add_no_shows(sessions, sign):
+    """
+    Moves the no-show count of each student of the sessions by ``sign`` per session, with one
+    UPDATE recounting the sessions per student in the database. Counts never go below zero.
+    Returns the number of students updated.
+    """
+    per_student = (sessions.filter(booked_by=OuterRef('pk'))
+                   .order_by().values('booked_by').annotate(missed=Count('id')).values('missed'))
+    return Student.objects.filter(id__in=sessions.values('booked_by')).update(
+        no_shows=Greatest(F('no_shows') + sign * Coalesce(Subquery(per_student), 0), 0))
+
+
+def _booked_sessions(session_ids, tutor, today):
+    sessions = Availability.objects.filter(id__in=session_ids, status='B', booked_by__isnull=False,
+                                           date__lte=today or date.today())
+    if tutor is not None:
+        sessions = sessions.filter(tutor=tutor)
+    return sessions
+
+
+def mark_attended(session_ids, tutor=None, today=None):
+    """
+    Marks many booked sessions as attended, correcting the counts of sessions already processed.
+
+    Sessions on or before the no-show job's watermark that were not marked attended were counted
+    by the job as no-shows, so their students' no-show counts are lowered here with one update;
+    later sessions are left for the job, which skips attended ones.
+
+    Args:
+        session_ids (list): The ids of the sessions to mark.
+        tutor (Tutor): Only mark this tutor's sessions, if given.
+        today (date): Sessions after this date are left alone; defaults to today.
+
+    Returns:
+        int: The number of sessions updated.
+    """
+    sessions = _booked_sessions(session_ids, tutor, today)
+    with transaction.atomic():
+        processed_until = _processed_until()
+        if processed_until:
+            _add_no_shows(sessions.filter(attended=False, date__lte=processed_until), -1)
+        return sessions.update(attended=True)
+
+
+def mark_no_shows(session_ids, tutor=None, today=None):
+    """
+    Marks many booked sessions as missed, correcting the counts of sessions already processed.
+
+    Sessions on or before the no-show job's watermark were skipped by the job if they were marked
+    attended, so their students' no-show counts are raised here with one update; later sessions
+    are left for the job to count.
+
+    Args:
+        session_ids (list): The ids of the sessions to mark.
+        tutor (Tutor): Only mark this tutor's sessions, if given.
+        today (date): Sessions after this date are left alone; defaults to today.
+
+    Returns:
+        int: The number of sessions updated.
+    """
+    sessions = _booked_sessions(session_ids, tutor, today)
+    with transaction.atomic():
+        processed_until = _processed_until()
+        if processed_until:
+            _add_no_shows(sessions.filter(attended=True, date__lte=processed_until), 1)
+        return sessions.update(attended=False)
+
+
+def process_no_shows(until, since=None, batch_days=7):
+    """
+    Adds booked sessions that were never marked attended to their students' no-show counts.
+
+    Sessions are processed in date-range batches after the job's watermark up to and including
+    ``until``. Each batch is one UPDATE of Student.no_shows, computed in the database from a
+    per-student count of missed sessions, and moves the watermark in the same transaction, so
+    running the job again never counts a session twice.
+
+    Args:
+        until (date): The last session date to process.
+        since (date): The last date considered already processed when the job has never run;
+            defaults to ``until`` so a first run only records the watermark.
+        batch_days (int): The number of session dates per batch.
+
+    Returns:
+        tuple: (number of missed sessions counted, number of student rows updated).
+    """
+    JobWatermark.objects.get_or_create(name=NO_SHOW_JOB, defaults={'date': since or until})
+    missed_total = students_total = 0
+    while True:
+        with transaction.atomic():
+            # Locking the watermark keeps overlapping runs from counting the same batch.
+            watermark = JobWatermark.objects.select_for_update().get(name=NO_SHOW_JOB)
+            start = watermark.date or since or until
+            if start >= until:
+                break
+            end = min(start + timedelta(days=batch_days), until)
+            missed = Availability.objects.filter(status='B', attended=False, booked_by__isnull=False,
+                                                 date__gt=start, date__lte=end)
+            missed_total += missed.count()
+            students_total += _add_no_shows(missed, 1)
+            watermark.date = end
+            watermark.save(update_fields=['date', 'updated_at'])
+    return missed_total, students_total
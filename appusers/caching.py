@@ -0,0 +1,175 @@
+from django.core.cache import cache
+from django.db.models import Max
+from django.utils.text import slugify
+
+from .departments import department_db, department_key
+from .heatmap import occupancy
+from .models import Availability, Course, Student, Tutor
+from .rollups import session_counts_by_course
+
+# Seconds a cached value may live; entries are also dropped whenever their version is bumped.
+CACHE_TIMEOUT = 60 * 60
+# Seconds the site-wide dashboard figures may be stale; they are not invalidated on writes.
+DASHBOARD_STATS_TIMEOUT = 60
+DASHBOARD_CHART_TIMEOUT = 5 * 60
+
+
+def get_version(name):
+    """
+    Returns the current version of a cached value.
+
+    Cached values are stored under a key that includes their version, so bumping the version
+    invalidates every copy at once without having to know the keys.
+
+    Args:
+        name (str): The name of the cached value.
+
+    Returns:
+        int: The current version.
+    """
+    version = cache.get(f'{name}:version')
+    if version is None:
+        cache.add(f'{name}:version', 1, None)
+        version = cache.get(f'{name}:version', 1)
+    return version
+
+
+def bump_version(name):
+    """
+    Invalidates a cached value by moving it to a new version.
+
+    Args:
+        name (str): The name of the cached value.
+    """
+    try:
+        cache.incr(f'{name}:version')
+    except ValueError:
+        cache.add(f'{name}:version', 2, None)
+
+
+def get_course_tutor_map():
+    """
+    Returns the mapping between courses and the tutors who teach them.
+
+    The mapping is built with a single query over the Tutor.courses through table and cached
+    until a tutor's courses change.
+
+    Returns:
+        dict: 'course_tutors' maps course ids to lists of tutor ids, and 'tutor_courses' maps
+        tutor ids to lists of course ids.
+    """
+    key = f'course_tutor_map:{get_version("course_tutor_map")}'
+    mapping = cache.get(key)
+    if mapping is None:
+        course_tutors = {}
+        tutor_courses = {}
+        for course_id, tutor_id in Tutor.courses.through.objects.values_list('course_id', 'tutor_id'):
+            course_tutors.setdefault(course_id, []).append(tutor_id)
+            tutor_courses.setdefault(tutor_id, []).append(course_id)
+        mapping = {'course_tutors': course_tutors, 'tutor_courses': tutor_courses}
+        cache.set(key, mapping, CACHE_TIMEOUT)
+    return mapping
+
+
+def tutor_ids_for_course(course_id):
+    """Returns the ids of the tutors who teach a course."""
+    return get_course_tutor_map()['course_tutors'].get(int(course_id), [])
+
+
+def course_ids_for_tutor(tutor_id):
+    """Returns the ids of the courses a tutor teaches."""
+    return get_course_tutor_map()['tutor_courses'].get(int(tutor_id), [])
+
+
+def invalidate_course_tutor_map(sender, action=None, **kwargs):
+    """Signal handler dropping the cached course-tutor mapping after courses or tutors change."""
+    if action is None or action.startswith('post_'):
+        bump_version('course_tutor_map')
+
+
+def estimated_count(model):
+    """
+    Returns a cheap estimate of the number of rows of a table.
+
+    The estimate is the largest primary key, read from the index, less the gap between it and
+    the real number of rows left by deleted rows. The gap is measured with an exact count at
+    most once per CACHE_TIMEOUT, or again after forget_count_gap.
+    """
+    key = f'count_gap:{model._meta.label_lower}'
+    last = model._default_manager.aggregate(last=Max('pk'))['last'] or 0
+    gap = cache.get(key)
+    if gap is None:
+        gap = last - model._default_manager.count()
+        cache.set(key, gap, CACHE_TIMEOUT)
+    return max(last - gap, 0)
+
+
+def forget_count_gap(model):
+    """Makes the next estimated_count of a table count it exactly, after many rows were deleted."""
+    cache.delete(f'count_gap:{model._meta.label_lower}')
+
+
+def _dashboard_stats(department):
+    using = department_db(department)
+    if department is None:
+        return {
+            'sessions': Availability.objects.using(using).active().count(),
+            'tutors': Tutor.objects.using(using).count(),
+            'students': Student.objects.using(using).count(),
+            'courses': Course.objects.using(using).count(),
+        }
+    return {
+        'sessions': Availability.objects.using(using).active().for_department(department).count(),
+        'tutors': Tutor.objects.using(using).filter(department=department).count(),
+        'students': Student.objects.using(using).filter(courses__department=department).distinct().count(),
+        'courses': Course.objects.using(using).filter(department=department).count(),
+    }
+
+
+def get_dashboard_stats(department=None):
+    """
+    Returns the counts shown on the administrators' dashboard tiles.
+
+    Args:
+        department (Department): Only count this department's sessions, tutors, courses and the
+            students taking its courses, if given.
+
+    Returns:
+        dict: The numbers of sessions, tutors, students and courses.
+    """
+    return cache.get_or_set(department_key('dashboard_stats', department),
+                            lambda: _dashboard_stats(department), DASHBOARD_STATS_TIMEOUT)
+
+
+def get_sessions_by_course(department=None):
+    """
+    Returns the number of sessions per course shown on the dashboard chart.
+
+    Args:
+        department (Department): Only include this department's courses, if given.
+
+    Returns:
+        dict: Course names mapped to session counts.
+    """
+    return cache.get_or_set(
+        department_key('dashboard_sessions_by_course', department),
+        lambda: session_counts_by_course(department=department, using=department_db(department)),
+        DASHBOARD_CHART_TIMEOUT)
+
+
+def get_occupancy_heatmap(semester, department=None, tutor=None):
+    """
+    Returns the session occupancy of a semester shown on the staffing heatmap.
+
+    Args:
+        semester (SemesterDates): The semester.
+        department (Department): Only include this department's sessions, if given.
+        tutor (int): Only include this tutor's sessions, if given.
+
+    Returns:
+        dict: The occupancy matrices, as returned by heatmap.occupancy.
+    """
+    return cache.get_or_set(
+        department_key(f'heatmap:{slugify(semester.name)}:{tutor or "all"}', department),
+        lambda: occupancy(semester.startDate, semester.endDate, department, tutor, using=department_db(department)),
+        DASHBOARD_CHART_TIMEOUT)
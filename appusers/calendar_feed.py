@@ -0,0 +1,193 @@
+import hashlib
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+from django.core import signing
+from django.core.cache import cache
+from django.db.models import Q
+
+from .caching import CACHE_TIMEOUT, bump_version, get_version
+from .models import Availability, SlotEvent
+
+FEED_SALT = 'appusers.calendar-feed'
+# Days of past sessions kept in the feed, so calendars keep recent history without the whole archive.
+FEED_HISTORY_DAYS = 90
+STATUS_MAP = {'A': 'TENTATIVE', 'B': 'CONFIRMED', 'C': 'CANCELLED'}
+# Stamp of feeds whose sessions have no slot events left, e.g. after the event log was purged.
+FEED_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def feed_token(user):
+    """
+    Returns the signed token that identifies a user's calendar feed.
+
+    Args:
+        user (User): The feed's owner.
+
+    Returns:
+        str: The token used in the feed URL.
+    """
+    return signing.Signer(salt=FEED_SALT).sign(str(user.pk))
+
+
+def user_id_from_token(token):
+    """
+    Returns the user id a feed token was issued for, or None if the token is not valid.
+
+    Args:
+        token (str): The token from the feed URL.
+
+    Returns:
+        int: The user id, or None.
+    """
+    try:
+        return int(signing.Signer(salt=FEED_SALT).unsign(token))
+    except (signing.BadSignature, ValueError):
+        return None
+
+
+def touch_calendars(tutor_ids=(), student_ids=()):
+    """
+    Marks the calendar feeds of some tutors and students as changed, so they are rebuilt.
+
+    Args:
+        tutor_ids (iterable): The ids of the tutors whose sessions changed.
+        student_ids (iterable): The ids of the students whose sessions changed.
+    """
+    for tutor_id in set(tutor_ids):
+        if tutor_id:
+            bump_version(f'calendar:tutor:{tutor_id}')
+    for student_id in set(student_ids):
+        if student_id:
+            bump_version(f'calendar:student:{student_id}')
+
+
+def availability_changed(sender, instance, **kwargs):
+    """Signal handler that marks the feeds of a saved or deleted slot's tutor and student as changed."""
+    touch_calendars([instance.tutor_id], [instance.booked_by_id])
+
+
+def _escape(text):
+    return (str(text).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _fold(line):
+    # RFC 5545 lines are at most 75 octets; longer ones continue on lines starting with a space.
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line
+    parts = []
+    while encoded:
+        limit = 75 if not parts else 74
+        cut = min(limit, len(encoded))
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+    return '\r\n '.join(parts)
+
+
+def _event_lines(session, stamp, host):
+    tutor = (session.tutor.user.get_full_name() or session.tutor.user.username) if session.tutor else ''
+    student = (session.booked_by.user.get_full_name() or session.booked_by.user.username) if session.booked_by else ''
+    description = f'Tutor: {tutor}' + (f'\nStudent: {student}' if student else '')
+    return [
+        'BEGIN:VEVENT',
+        f'UID:availability-{session.id}@{host}',
+        f'DTSTAMP:{stamp}',
+        # Floating local times: the sessions happen on campus, in the campus's time zone.
+        f'DTSTART:{datetime.combine(session.date, session.start_time):%Y%m%dT%H%M%S}',
+        f'DTEND:{datetime.combine(session.date, session.end_time):%Y%m%dT%H%M%S}',
+        f'SUMMARY:{_escape(f"Tutoring: {session.course.c_name}")}',
+        f'DESCRIPTION:{_escape(description)}',
+        f'STATUS:{STATUS_MAP.get(session.status, "CONFIRMED")}',
+        'END:VEVENT',
+    ]
+
+
+def last_changed(tutor_id, student_id):
+    """
+    Returns when a tutor's slots or a student's bookings last changed, from the slot event log.
+
+    Each lookup is one seek on the event log's (tutor, id) or (student, id) index. Events record
+    the student of the slot, so a booking the student has since cancelled still counts.
+
+    Args:
+        tutor_id (int): The user's Tutor id, if they are a tutor.
+        student_id (int): The user's Student id, if they are a student.
+
+    Returns:
+        datetime: The time of the latest slot event, or FEED_EPOCH if there is none.
+    """
+    events = []
+    if tutor_id:
+        events.append(SlotEvent.objects.filter(tutor_id=tutor_id))
+    if student_id:
+        events.append(SlotEvent.objects.filter(student_id=student_id))
+    stamps = [stamp for stamp in (event.order_by('-id').values_list('created_at', flat=True).first()
+                                  for event in events) if stamp]
+    return max(stamps, default=FEED_EPOCH)
+
+
+def build_feed(tutor_id, student_id, host, stamp, today=None):
+    """
+    Renders the iCalendar feed of a tutor's slots and a student's bookings.
+
+    Args:
+        tutor_id (int): The user's Tutor id, if they are a tutor.
+        student_id (int): The user's Student id, if they are a student.
+        host (str): The host used in the event UIDs.
+        stamp (datetime): The DTSTAMP of the events, from last_changed, so rebuilding a feed
+            whose sessions didn't change gives the same bytes.
+        today (date): Sessions more than FEED_HISTORY_DAYS before this are left out.
+
+    Returns:
+        str: The feed.
+    """
+    since = (today or date.today()) - timedelta(days=FEED_HISTORY_DAYS)
+    owner = Q()
+    if tutor_id:
+        owner |= Q(tutor_id=tutor_id)
+    if student_id:
+        owner |= Q(booked_by_id=student_id)
+    sessions = (Availability.objects.filter(owner, date__gte=since)
+                .select_related('course', 'tutor__user', 'booked_by__user')
+                .order_by('date', 'start_time')) if owner else []
+
+    stamp = stamp.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    lines = ['BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//UMass Boston//OATS//EN', 'CALSCALE:GREGORIAN',
+             'METHOD:PUBLISH', 'X-WR-CALNAME:Tutoring sessions']
+    for session in sessions:
+        lines.extend(_event_lines(session, stamp, host))
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(_fold(line) for line in lines) + '\r\n'
+
+
+def get_feed(user_id, tutor_id, student_id, host):
+    """
+    Returns a user's feed with its validators, rebuilding it only after their sessions changed.
+
+    Args:
+        user_id (int): The feed's owner.
+        tutor_id (int): The user's Tutor id, if any.
+        student_id (int): The user's Student id, if any.
+        host (str): The host used in the event UIDs.
+
+    Both validators come from the data, so they stay the same across rebuilds, cache expiry and
+    worker processes until the sessions change.
+
+    Returns:
+        dict: 'body', 'etag' (a hash of the body) and 'last_modified' (when the sessions last
+        changed, in seconds since the epoch).
+    """
+    versions = [get_version(f'calendar:tutor:{tutor_id}') if tutor_id else 0,
+                get_version(f'calendar:student:{student_id}') if student_id else 0]
+    key = f'calendar_feed:{user_id}:{host}:{versions[0]}:{versions[1]}'
+    feed = cache.get(key)
+    if feed is None:
+        changed = last_changed(tutor_id, student_id)
+        body = build_feed(tutor_id, student_id, host, changed)
+        feed = {'body': body, 'etag': f'"{hashlib.md5(body.encode()).hexdigest()}"',
+                'last_modified': int(changed.timestamp())}
+        cache.set(key, feed, CACHE_TIMEOUT)
+    return feed
@@ -0,0 +1,108 @@
+from datetime import date
+
+from django.db import transaction
+from django.urls import reverse
+
+from .events import publish_slot_events
+from .mail import build_email, queue_emails
+from django.db.models import Q
+
+from .models import TIMEBLOCK_TIMES, Availability
+
+REPLACEMENTS_PER_SESSION = 3
+
+
+def find_replacements(sessions, exclude_tutor, limit=REPLACEMENTS_PER_SESSION):
+    """
+    Finds open slots with other tutors of the same course for each cancelled session.
+
+    All candidates are loaded with one query; each session then gets the candidates closest to
+    its original date, preferring slots not already offered to another student.
+
+    Args:
+        sessions (list): The cancelled booked sessions.
+        exclude_tutor (Tutor): The tutor whose sessions were cancelled.
+        limit (int): The maximum number of replacements per session.
+
+    Returns:
+        dict: Session ids mapped to lists of replacement Availability objects.
+    """
+    if not sessions:
+        return {}
+    candidates = {}
+    for slot in (Availability.objects
+                 .filter(status='A', booked_by__isnull=True, date__gt=date.today(),
+                         course_id__in={session.course_id for session in sessions})
+                 .exclude(tutor=exclude_tutor)
+                 .select_related('tutor__user', 'course')
+                 .order_by('date', 'start_time')):
+        candidates.setdefault(slot.course_id, []).append(slot)
+
+    offered = set()
+    replacements = {}
+    for session in sessions:
+        ranked = sorted(candidates.get(session.course_id, []),
+                        key=lambda slot: (slot.id in offered, abs((slot.date - session.date).days)))
+        replacements[session.id] = ranked[:limit]
+        offered.update(slot.id for slot in ranked[:limit])
+    return replacements
+
+
+def cancel_range(tutor, start_date, end_date, timeblocks=None, offer_replacements=True, domain=None):
+    """
+    Cancels all of a tutor's sessions in a date range, optionally only in some timeblocks.
+
+    The affected sessions are marked cancelled with one statement and their status changes are
+    logged with one insert. Students with a booking are notified with a single bulk insert into
+    the email queue, optionally with replacement slots from other tutors of the same course.
+
+    Args:
+        tutor (Tutor): The tutor whose sessions are cancelled.
+        start_date (date): The first date to cancel; past dates are left alone.
+        end_date (date): The last date to cancel.
+        timeblocks (list): Only cancel sessions overlapping these TIMEBLOCK_CHOICES keys, if given.
+        offer_replacements (bool): Whether to suggest other tutors' open slots to the students.
+        domain (str): The host used in booking links.
+
+    Returns:
+        tuple: (number of sessions cancelled, number of students notified).
+    """
+    sessions = Availability.objects.active().filter(tutor=tutor, date__gte=max(start_date, date.today()),
+                                                    date__lte=end_date)
+    if timeblocks:
+        overlapping = Q()
+        for block in timeblocks:
+            start, end = TIMEBLOCK_TIMES[block]
+            overlapping |= Q(start_time__lt=end, end_time__gt=start)
+        sessions = sessions.filter(overlapping)
+
+    with transaction.atomic():
+        affected = list(sessions.select_related('tutor__user', 'course', 'booked_by__user'))
+        if not affected:
+            return 0, 0
+        booked = [session for session in affected if session.booked_by_id]
+        replacements = find_replacements(booked, tutor) if offer_replacements else {}
+
+        emails = []
+        for session in booked:
+            if not session.booked_by.user.email:
+                continue
+            emails.append(build_email(session.booked_by.user.email, 'Session Cancelled',
+                                      'emails/session_cancelled_by_tutor_email.html', {
+                'user': session.booked_by.user,
+                'course': session.course,
+                'tutor': session.tutor,
+                'date': session.date,
+                'timeblock': session.get_timeblock_display(),
+                'replacements': [{
+                    'date': slot.date,
+                    'tutor': slot.tutor,
+                    'timeblock': slot.get_timeblock_display(),
+                    'url': f"http://{domain}{reverse('booking_page', args=[slot.id])}" if domain else None,
+                } for slot in replacements.get(session.id, [])],
+            }))
+
+        publish_slot_events('cancelled', affected, 'C')
+        Availability.objects.filter(id__in=[session.id for session in affected]).update(status='C')
+        notified = queue_emails(emails, send=True)
+    return len(affected), notified
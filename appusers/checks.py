@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.checks import Error, Warning
+
+# Cache backends that keep their entries inside one process.
+PER_PROCESS_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Rejects a default cache that is not shared between worker processes.
+
+    Cache versions bumped by one worker, login failure counts and calendar feeds must be seen by
+    all of them. Under DEBUG, with the single process of runserver, this is only a warning.
+    """
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if backend not in PER_PROCESS_CACHES:
+        return []
+    message = f'The default cache, {backend}, is not shared between worker processes.'
+    hint = ('Use DatabaseCache, Redis or Memcached, so cache invalidations and login limits hold '
+            'across workers.')
+    if settings.DEBUG:
+        return [Warning(message, hint=hint, id='appusers.W001')]
+    return [Error(message, hint=hint, id='appusers.E001')]
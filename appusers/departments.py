@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from .models import Department
+
+# Department codes mapped to the database alias their reporting reads go to, e.g. a replica
+# reserved for a busy department; departments not listed read from the default database.
+DEPARTMENT_DATABASES = getattr(settings, 'DEPARTMENT_DATABASES', {})
+
+
+def department_db(department):
+    """
+    Returns the database alias a department's read-only queries are routed to.
+
+    Args:
+        department (Department): The department, or None for the whole site.
+
+    Returns:
+        str: The database alias.
+    """
+    if department is None:
+        return DEFAULT_DB_ALIAS
+    return DEPARTMENT_DATABASES.get(department.code, DEFAULT_DB_ALIAS)
+
+
+def department_key(name, department):
+    """
+    Returns the cache key of a value computed for one department, or for the whole site.
+
+    Args:
+        name (str): The name of the cached value.
+        department (Department): The department, or None for the whole site.
+
+    Returns:
+        str: The cache key.
+    """
+    return f'{name}:{department.code if department else "all"}'
+
+
+def get_department(request):
+    """
+    Returns the department chosen with the ``department`` GET parameter, if any.
+
+    Args:
+        request (HttpRequest): The request.
+
+    Returns:
+        Department: The department, or None if none or an unknown one was given.
+    """
+    code = request.GET.get('department')
+    return Department.objects.filter(code=code).first() if code else None
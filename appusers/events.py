@@ -0,0 +1,211 @@
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+from .calendar_feed import touch_calendars
+from .models import SlotEvent
+
+# Seconds a stream waits for an in-process wake-up before polling the change log, which is how
+# events published by other worker processes are picked up.
+POLL_INTERVAL = getattr(settings, 'SLOT_EVENTS_POLL_INTERVAL', 2)
+# Seconds between keep-alive comments so proxies don't drop an idle stream.
+KEEPALIVE_INTERVAL = getattr(settings, 'SLOT_EVENTS_KEEPALIVE', 15)
+# Seconds before a stream is closed; the browser reconnects with Last-Event-ID and resumes,
+# so a worker is never held by one client for long.
+MAX_STREAM_DURATION = getattr(settings, 'SLOT_EVENTS_MAX_DURATION', 60)
+# Streams a process serves at once. Each holds a worker thread and a database connection, so
+# this keeps streams from using up a WSGI worker's threads; clients over it are asked to come
+# back later.
+MAX_STREAMS = getattr(settings, 'SLOT_EVENTS_MAX_STREAMS', 8)
+# Milliseconds the browser waits before reconnecting, and before retrying when streams are full.
+RETRY_MS = 3000
+BUSY_RETRY_MS = 30000
+BATCH_SIZE = 100
+
+_condition = threading.Condition()
+_latest_event_id = 0
+_open_streams = 0
+
+
+def serialize_slot(availability):
+    """
+    Serializes an availability slot into the payload sent to clients.
+
+    Args:
+        availability (Availability): The slot to serialize.
+
+    Returns:
+        dict: The slot fields needed to render a slot card.
+    """
+    tutor = availability.tutor
+    return {
+        'id': availability.id,
+        'date': str(availability.date),
+        'start_time': availability.start_time.isoformat(timespec='minutes'),
+        'end_time': availability.end_time.isoformat(timespec='minutes'),
+        'timeblock_display': availability.get_timeblock_display(),
+        'course_id': availability.course_id,
+        'course': availability.course.c_name,
+        'tutor_id': availability.tutor_id,
+        'tutor': tutor.user.username if tutor else '',
+        'status': availability.status,
+    }
+
+
+def _notify(event_id):
+    global _latest_event_id
+    with _condition:
+        if event_id > _latest_event_id:
+            _latest_event_id = event_id
+        _condition.notify_all()
+
+
+def publish_slot_event(kind, availability, from_status='', student_id=None):
+    """
+    Records a slot change in the change log and wakes the streams of this process.
+
+    Must be called after the slot's status has changed, and before a slot is deleted so its
+    fields can still be serialized.
+
+    Args:
+        kind (str): One of the SLOT_EVENT_CHOICES keys.
+        availability (Availability): The slot that changed.
+        from_status (str): The status of the slot before the change, blank for new slots.
+        student_id (int): The student the change concerns, if the slot no longer names them,
+            such as the student who just cancelled their booking.
+
+    Returns:
+        SlotEvent: The recorded event.
+    """
+    event = SlotEvent.objects.create(
+        kind=kind,
+        availability_id=availability.id,
+        course_id=availability.course_id,
+        tutor_id=availability.tutor_id,
+        student_id=student_id or availability.booked_by_id,
+        from_status=from_status,
+        to_status='' if kind == 'deleted' else availability.status,
+        payload=serialize_slot(availability),
+    )
+    transaction.on_commit(lambda: _notify(event.id))
+    return event
+
+
+def publish_slot_events(kind, availabilities, to_status, student_id=None):
+    """
+    Records the same change for many slots with one insert and wakes the streams of this process.
+
+    Must be called before the slots are updated or deleted, so their current status is recorded
+    as the status before the change.
+
+    Args:
+        kind (str): One of the SLOT_EVENT_CHOICES keys.
+        availabilities (list): The slots that are about to change.
+        to_status (str): The status the slots are moving to, blank if they are being deleted.
+        student_id (int): The student the slots are being booked for, if they don't name them yet.
+
+    Returns:
+        list: The recorded events.
+    """
+    events = SlotEvent.objects.bulk_create([
+        SlotEvent(kind=kind, availability_id=availability.id, course_id=availability.course_id,
+                  tutor_id=availability.tutor_id, student_id=student_id or availability.booked_by_id,
+                  from_status=availability.status, to_status=to_status,
+                  payload=dict(serialize_slot(availability), status=to_status))
+        for availability in availabilities
+    ])
+    if events:
+        # Bulk updates don't send the model signals that keep the calendar feeds current.
+        touch_calendars([availability.tutor_id for availability in availabilities],
+                        [availability.booked_by_id for availability in availabilities])
+        latest = SlotEvent.objects.order_by('-id').values_list('id', flat=True).first()
+        transaction.on_commit(lambda: _notify(latest))
+    return events
+
+
+def _wait_for_event(seen_event_id, timeout):
+    """Blocks until this process publishes an event newer than seen_event_id, or timeout expires."""
+    with _condition:
+        if _latest_event_id > seen_event_id:
+            return True
+        return _condition.wait(timeout)
+
+
+def format_event(event):
+    """
+    Formats a SlotEvent as a server-sent event frame.
+
+    Args:
+        event (SlotEvent): The event to format.
+
+    Returns:
+        str: The text/event-stream frame.
+    """
+    return f"id: {event.id}\nevent: {event.kind}\ndata: {json.dumps(event.payload)}\n\n"
+
+
+def _open_stream():
+    """Counts a new stream, or returns False if the process already serves MAX_STREAMS."""
+    global _open_streams
+    with _condition:
+        if _open_streams >= MAX_STREAMS:
+            return False
+        _open_streams += 1
+        return True
+
+
+def _close_stream():
+    global _open_streams
+    with _condition:
+        _open_streams -= 1
+
+
+def slot_event_stream(course_ids=None, tutor_id=None, last_event_id=None):
+    """
+    Yields server-sent event frames for slot changes, optionally scoped by course or tutor.
+
+    When the process already serves MAX_STREAMS streams, only a retry frame is sent and the
+    stream ends, so the browser comes back after BUSY_RETRY_MS and resumes from Last-Event-ID.
+
+    Args:
+        course_ids (list): Only stream events for these courses, if given.
+        tutor_id (int): Only stream events for this tutor, if given.
+        last_event_id (int): Resume after this event id; defaults to the latest recorded event.
+
+    Yields:
+        str: text/event-stream frames.
+    """
+    events = SlotEvent.objects.all()
+    if course_ids is not None:
+        events = events.filter(course_id__in=course_ids)
+    if tutor_id is not None:
+        events = events.filter(tutor_id=tutor_id)
+
+    if last_event_id is None:
+        last_event_id = SlotEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+    if not _open_stream():
+        yield f"retry: {BUSY_RETRY_MS}\n\n"
+        return
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        started = last_sent = time.monotonic()
+        while time.monotonic() - started < MAX_STREAM_DURATION:
+            # Snapshot before querying so a publish racing with the query still wakes the wait below.
+            seen_event_id = _latest_event_id
+            batch = list(events.filter(id__gt=last_event_id).order_by('id')[:BATCH_SIZE])
+            for event in batch:
+                last_event_id = event.id
+                yield format_event(event)
+            if batch:
+                last_sent = time.monotonic()
+                continue
+            if time.monotonic() - last_sent >= KEEPALIVE_INTERVAL:
+                last_sent = time.monotonic()
+                yield ": keep-alive\n\n"
+            _wait_for_event(seen_event_id, POLL_INTERVAL)
+    finally:
+        _close_stream()
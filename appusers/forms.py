@@ -1,9 +1,13 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, UserChangeForm
-from django.core.files.base import ContentFile
-from django.forms import DateInput
+from django.core.files.storage import default_storage
+from django.db import models
+from django.db.models.signals import m2m_changed
+from django.forms import DateInput, TimeInput
 from django.contrib.auth.models import User
-from .models import Availability, Tutor, Student
+from .models import TIMEBLOCK_CHOICES, TIMEBLOCK_TIMES, Availability, Tutor, Student, Course
+from .intervals import find_overlap
+from .uploads import PROFILE_PICTURE_EXTENSIONS, PROFILE_PICTURE_MAX_SIZE, store_upload
 
 
 
@@ -11,12 +15,15 @@ class AvailabilityForm(forms.ModelForm):
     """
    Form for creating and updating availability.
 
-   Allows tutors to specify their availability for a specific date and time block.
+   Allows tutors to specify their availability for a specific date, either as one of the standard
+   time blocks or with any start and end time.
 
    Attributes:
        tutor (ModelChoiceField): The associated tutor.
        date (DateField): The date of availability.
-       timeblock (CharField): The selected time block.
+       timeblock (ChoiceField): A standard time block filling in the start and end times.
+       start_time (TimeField): When the session starts.
+       end_time (TimeField): When the session ends.
        booked_by (ModelChoiceField): The student who booked the slot.
        course (ModelChoiceField): The associated course.
        status (CharField): The status of the availability.
@@ -24,14 +31,20 @@ class AvailabilityForm(forms.ModelForm):
    """
     class Meta:
         model = Availability
-        fields = ['tutor', 'date', 'timeblock', 'course', 'booked_by', 'status', 'semester']
+        fields = ['tutor', 'date', 'timeblock', 'start_time', 'end_time', 'course', 'booked_by', 'status', 'semester']
         widgets = {
             'date': DateInput(attrs={'type': 'date', 'onchange': 'setSemester()'}),
+            'start_time': TimeInput(attrs={'type': 'time', 'step': 900}),
+            'end_time': TimeInput(attrs={'type': 'time', 'step': 900}),
         }
         labels = {
             'booked_by': 'Student'
         }
         initial = {'status': 'A'}
+
+    timeblock = forms.ChoiceField(choices=[('', 'Custom times')] + list(TIMEBLOCK_CHOICES), required=False,
+                                  label='Time block')
+
     def __init__(self, *args, **kwargs):
         self.user = kwargs.pop('user', None)
         self.include_all_tutors = kwargs.pop('include_all_tutors', False)
@@ -39,9 +52,12 @@ class AvailabilityForm(forms.ModelForm):
         initial['status'] = 'A'
         kwargs['initial'] = initial
         super(AvailabilityForm, self).__init__(*args, **kwargs)
+        # Either can come from the time block instead; clean() checks that both end up set.
+        self.fields['start_time'].required = False
+        self.fields['end_time'].required = False
 
         if self.user.is_superuser and self.include_all_tutors:
-            self.fields['tutor'] = forms.ModelChoiceField(queryset=Tutor.objects.all())
+            self.fields['tutor'] = forms.ModelChoiceField(queryset=Tutor.objects.select_related('user'))
         elif not self.user.is_superuser:
             self.fields['tutor'].widget = forms.HiddenInput()
             self.fields['tutor'].initial = self.user.tutor
@@ -50,12 +66,22 @@ class AvailabilityForm(forms.ModelForm):
         cleaned_data = super().clean()
         date = cleaned_data.get('date')
         timeblock = cleaned_data.get('timeblock')
+        if timeblock and not (cleaned_data.get('start_time') or cleaned_data.get('end_time')):
+            cleaned_data['start_time'], cleaned_data['end_time'] = TIMEBLOCK_TIMES[timeblock]
+        start_time = cleaned_data.get('start_time')
+        end_time = cleaned_data.get('end_time')
+        if not start_time or not end_time:
+            raise forms.ValidationError('Choose a time block or enter a start and end time.')
+        if end_time <= start_time:
+            raise forms.ValidationError('The session must end after it starts.')
         if not self.user.is_superuser:
             tutor = self.user.tutor
         else:
             tutor = cleaned_data.get('tutor')
-        if Availability.objects.filter(tutor=tutor, date=date, timeblock=timeblock).exists():
-            raise forms.ValidationError('A slot already exists for the selected tutor, date, and timeblock.')
+        overlap = find_overlap(Availability.objects.active().filter(tutor=tutor, date=date), start_time, end_time)
+        if overlap is not None:
+            raise forms.ValidationError(
+                f'The tutor already has a session from {overlap.get_timeblock_display()} on that date.')
         return cleaned_data
 
 
@@ -84,6 +110,24 @@ Attributes:
             user.save()
         return user
 
+class CoursePicker(forms.SelectMultiple):
+    """
+    Multiple select over the course catalogue that only renders the chosen courses.
+
+    The other courses are fetched a page at a time from the course_options view as the user
+    searches, so rendering the form never loads the whole catalogue.
+    """
+
+    def optgroups(self, name, value, attrs=None):
+        catalogue = self.choices
+        chosen = catalogue.queryset.filter(pk__in=[pk for pk in value if pk.isdigit()])
+        self.choices = [(course.pk, str(course)) for course in chosen]
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = catalogue
+
+
 class BaseForm(forms.ModelForm):
     """
    Base form for student and tutor forms.
@@ -108,7 +152,7 @@ class BaseForm(forms.ModelForm):
             'first_name': forms.TextInput(attrs={'class': 'form-control'}),
             'last_name': forms.TextInput(attrs={'class': 'form-control'}),
             'ums_id': forms.TextInput(attrs={'class': 'form-control'}),
-            'courses': forms.SelectMultiple(attrs={'class': 'form-control'}),
+            'courses': CoursePicker(attrs={'class': 'form-control'}),
         }
 
         
@@ -124,11 +168,28 @@ class BaseForm(forms.ModelForm):
            **kwargs: Arbitrary keyword arguments.
        """
         super().__init__(*args, **kwargs)
-        self.fields['first_name'].initial = self.instance.user.first_name
-        self.fields['last_name'].initial = self.instance.user.last_name
+        user = self.instance.user
+        self.fields['first_name'].initial = user.first_name
+        self.fields['last_name'].initial = user.last_name
         self.fields['first_name'].widget.attrs.update({'class': 'form-control'})
         self.fields['last_name'].widget.attrs.update({'class': 'form-control'})
 
+    def clean_profile_picture(self):
+        """
+      Validates the uploaded profile picture.
+
+      Returns:
+          The uploaded file, if it is an image of an accepted type and size.
+      """
+        profile_picture = self.cleaned_data.get('profile_picture')
+        if profile_picture:
+            if not profile_picture.name.lower().endswith(PROFILE_PICTURE_EXTENSIONS):
+                raise forms.ValidationError('Upload a GIF, JPEG, PNG or WebP image.')
+            if profile_picture.size > PROFILE_PICTURE_MAX_SIZE:
+                raise forms.ValidationError(
+                    f'The picture must be at most {PROFILE_PICTURE_MAX_SIZE // (1024 * 1024)} MB.')
+        return profile_picture
+
     def save(self, commit=True):
         """
       Saves the form.
@@ -147,16 +208,45 @@ class BaseForm(forms.ModelForm):
         user.last_name = self.cleaned_data['last_name']
         profile_picture = self.cleaned_data.get('profile_picture')
         if profile_picture:
-            # Use the ContentFile object to create a new file object from the uploaded image data
-            file_data = ContentFile(profile_picture.read())
-            filename = profile_picture.name
-            # Set the profile picture field to the newly created file object
-            self.instance.profile_picture.save(filename, file_data, save=False)
+            # Stored under its content hash, so uploading the same picture again reuses the file
+            name = store_upload(profile_picture)
+            if isinstance(self.instance._meta.get_field('profile_picture'), models.FileField):
+                self.instance.profile_picture.name = name
+            else:
+                self.instance.profile_picture = default_storage.url(name)
 
         if commit:
             user.save()
         return super().save(commit=commit)
 
+    def _save_m2m(self):
+        """
+      Saves the many-to-many fields, writing only the course enrollments that changed.
+
+      The through-rows of the courses added are inserted in one bulk insert and those of the
+      courses removed deleted in one query, instead of the related manager resetting the set.
+      """
+        if 'courses' not in self.cleaned_data:
+            return super()._save_m2m()
+        manager = self.instance.courses
+        through = manager.through
+        owner = {manager.source_field_name: self.instance}
+        course_field = f'{manager.target_field_name}_id'
+        current = set(through.objects.filter(**owner).values_list(course_field, flat=True))
+        chosen = {course.pk for course in self.cleaned_data['courses']}
+        removed, added = current - chosen, chosen - current
+        if removed:
+            through.objects.filter(**owner, **{f'{course_field}__in': removed}).delete()
+        if added:
+            through.objects.bulk_create([through(**owner, **{course_field: pk}) for pk in added],
+                                        ignore_conflicts=True)
+        # Receivers such as the cached course-tutor mapping still hear about the change.
+        for action, pks in (('post_remove', removed), ('post_add', added)):
+            if pks:
+                m2m_changed.send(sender=through, instance=self.instance, action=action, reverse=False,
+                                 model=Course, pk_set=pks, using=through.objects.db)
+
+
 class TutorForm(BaseForm):
     """
   Form for creating and updating tutor profiles.
@@ -167,7 +257,9 @@ class TutorForm(BaseForm):
       fields (list): The fields to be displayed in the form.
   """
     class Meta(BaseForm.Meta):
-        fields = ['courses']
+        model = Tutor
+        fields = ['courses', 'notification_mode']
+        widgets = dict(BaseForm.Meta.widgets, notification_mode=forms.Select(attrs={'class': 'form-control'}))
 
 class StudentForm(BaseForm):
     """
@@ -181,21 +273,14 @@ class AdminForm(UserChangeForm):
     """
     Form for updating admin user profiles.
 
-    Inherits from UserChangeForm and adds initialization and saving behavior.
+    Inherits from UserChangeForm and adds saving behavior.
 
     Attributes:
         fields (tuple): The fields to be displayed in the form.
     """
     class Meta:
         model = User
-        fields = ('first_name', 'last_name', 'username', 'email')
-
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.initial['first_name'] = self.first_name
-        self.initial['last_name'] = self.last_name
-        self.initial['username'] = self.username
-        self.initial['email'] = self.email
+        fields = ('first_name', 'last_name')
 
     def save(self, commit=True):
         user = super().save(commit=False)
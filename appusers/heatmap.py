@@ -0,0 +1,104 @@
+from array import array
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Count
+
+from .models import Availability
+
+# Sessions are binned by the hour they start in; earlier and later ones go to the first and last bins.
+FIRST_HOUR = 8
+HOURS = 9
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+PEAK_COUNT = 5
+
+
+def _ratio(booked, offered):
+    return round(booked / offered, 2) if offered else None
+
+
+def occupancy(start, end, department=None, tutor=None, using=DEFAULT_DB_ALIAS):
+    """
+    Computes the occupancy of the sessions offered between two dates, for staffing decisions.
+
+    The database counts the sessions per (date, start time, status) and per (tutor, status), so
+    only a few thousand grouped rows reach Python whatever the number of sessions. They are
+    added into flat day-by-hour arrays, and everything else is derived from those arrays with
+    work proportional to the number of cells.
+
+    Unmet demand can't be observed directly; a cell whose every offered session was booked is
+    counted as saturated, since students may have wanted more sessions there than were offered.
+
+    Args:
+        start (date): The first day.
+        end (date): The last day.
+        department (Department): Only count this department's sessions, if given.
+        tutor (int): Only count this tutor's sessions, if given.
+        using (str): The database alias to read from.
+
+    Returns:
+        dict: 'offered' and 'booked' day-by-hour matrices, the weekday-by-hour 'utilization' and
+        'saturated' matrices, the busiest weekday hours as 'peaks' and per-tutor totals.
+    """
+    days = (end - start).days + 1
+    sessions = (Availability.objects.using(using).active().for_department(department)
+                .filter(date__range=(start, end)).order_by())
+    if tutor is not None:
+        sessions = sessions.filter(tutor_id=tutor)
+
+    offered = array('I', bytes(4 * days * HOURS))
+    booked = array('I', bytes(4 * days * HOURS))
+    first_day = start.toordinal()
+    for day, start_time, status, count in (sessions.values_list('date', 'start_time', 'status')
+                                           .annotate(count=Count('id'))):
+        cell = (day.toordinal() - first_day) * HOURS + min(max(start_time.hour - FIRST_HOUR, 0), HOURS - 1)
+        offered[cell] += count
+        if status == 'B':
+            booked[cell] += count
+
+    # Fold the days onto the weekdays they fall on.
+    week_offered = [[0] * HOURS for _ in WEEKDAYS]
+    week_booked = [[0] * HOURS for _ in WEEKDAYS]
+    saturated = [[0] * HOURS for _ in WEEKDAYS]
+    for day in range(days):
+        weekday = (start + timedelta(days=day)).weekday()
+        base = day * HOURS
+        for hour in range(HOURS):
+            offered_here, booked_here = offered[base + hour], booked[base + hour]
+            week_offered[weekday][hour] += offered_here
+            week_booked[weekday][hour] += booked_here
+            if offered_here and booked_here == offered_here:
+                saturated[weekday][hour] += 1
+
+    peaks = sorted(((week_booked[weekday][hour], weekday, hour) for weekday in range(7) for hour in range(HOURS)
+                    if week_booked[weekday][hour]), reverse=True)[:PEAK_COUNT]
+
+    tutor_offered, tutor_booked = {}, {}
+    for tutor_id, status, count in sessions.values_list('tutor_id', 'status').annotate(count=Count('id')):
+        if tutor_id is not None:
+            tutor_offered[tutor_id] = tutor_offered.get(tutor_id, 0) + count
+            if status == 'B':
+                tutor_booked[tutor_id] = count
+    names = dict(User.objects.using(using).filter(tutor__id__in=list(tutor_offered))
+                 .values_list('tutor__id', 'username'))
+
+    return {
+        'start': str(start),
+        'end': str(end),
+        'hours': [FIRST_HOUR + hour for hour in range(HOURS)],
+        'weekdays': WEEKDAYS,
+        'sessions': sum(offered),
+        'offered': [offered[day * HOURS:(day + 1) * HOURS].tolist() for day in range(days)],
+        'booked': [booked[day * HOURS:(day + 1) * HOURS].tolist() for day in range(days)],
+        'utilization': [[_ratio(week_booked[weekday][hour], week_offered[weekday][hour]) for hour in range(HOURS)]
+                        for weekday in range(7)],
+        'saturated': saturated,
+        'peaks': [{'weekday': WEEKDAYS[weekday], 'hour': FIRST_HOUR + hour, 'booked': count,
+                   'utilization': _ratio(count, week_offered[weekday][hour])} for count, weekday, hour in peaks],
+        'tutors': sorted(({'id': tutor_id, 'name': names.get(tutor_id, ''), 'offered': count,
+                           'booked': tutor_booked.get(tutor_id, 0),
+                           'utilization': _ratio(tutor_booked.get(tutor_id, 0), count)}
+                          for tutor_id, count in tutor_offered.items()),
+                         key=lambda row: (-row['booked'], row['name'])),
+    }
@@ -0,0 +1,78 @@
+from bisect import bisect_left
+
+
+class IntervalIndex:
+    """
+    Sorted index of one schedule's non-overlapping [start, end) intervals, such as a tutor's or a
+    student's sessions on one day.
+
+    Because the intervals never overlap, sorting them by start also sorts them by end, so the
+    only interval that can overlap a new one is the last one starting before the new one ends.
+    Finding it is a binary search, which keeps checks O(log n) however finely a day is divided.
+
+    Attributes:
+        starts (list): The interval starts, sorted.
+        intervals (list): (start, end, item) tuples in the same order.
+    """
+
+    def __init__(self, intervals=()):
+        self.starts = []
+        self.intervals = []
+        for start, end, item in sorted(intervals, key=lambda interval: interval[:2]):
+            self.starts.append(start)
+            self.intervals.append((start, end, item))
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def overlapping(self, start, end):
+        """
+        Returns an interval overlapping [start, end), or None.
+
+        Args:
+            start: The start of the interval to check.
+            end: The end of the interval to check.
+
+        Returns:
+            tuple: The (start, end, item) of an overlapping interval, or None.
+        """
+        position = bisect_left(self.starts, end)
+        if position and self.intervals[position - 1][1] > start:
+            return self.intervals[position - 1]
+        return None
+
+    def add(self, start, end, item=None):
+        """
+        Adds [start, end) to the index unless it overlaps an interval already in it.
+
+        Returns:
+            tuple: The (start, end, item) of the overlapping interval that kept it out, or None
+            if it was added.
+        """
+        conflict = self.overlapping(start, end)
+        if conflict is None:
+            position = bisect_left(self.starts, start)
+            self.starts.insert(position, start)
+            self.intervals.insert(position, (start, end, item))
+        return conflict
+
+
+def find_overlap(slots, start_time, end_time):
+    """
+    Returns a slot of a schedule that overlaps the given times, or None.
+
+    Uses the same rule as IntervalIndex against the database: the last slot starting before
+    end_time is the only candidate, which is one seek on the (owner, date, start_time) indexes.
+
+    Args:
+        slots (QuerySet): One owner's active slots on one day.
+        start_time (time): The start of the new slot.
+        end_time (time): The end of the new slot.
+
+    Returns:
+        Availability: The overlapping slot, or None.
+    """
+    candidate = slots.filter(start_time__lt=end_time).order_by('-start_time').first()
+    if candidate is not None and candidate.end_time > start_time:
+        return candidate
+    return None
@@ -0,0 +1,114 @@
+import bisect
+import logging
+import time
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from UMassSchedulingApplication.settings import DEFAULT_FROM_EMAIL
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+
+def build_email(to_email, subject, template_name, context):
+    """
+    Renders an email into an unsaved OutboundEmail.
+
+    Args:
+        to_email (str): The recipient.
+        subject (str): The subject line.
+        template_name (str): The template under templates/emails to render.
+        context (dict): The template context.
+
+    Returns:
+        OutboundEmail: The unsaved email.
+    """
+    return OutboundEmail(to_email=to_email, subject=subject, body=render_to_string(template_name, context))
+
+
+def queue_emails(emails, batch_size=1000, send=False):
+    """
+    Queues emails for the send_queued_emails command with bulk inserts.
+
+    Args:
+        emails (iterable): Unsaved OutboundEmail objects, as returned by build_email.
+        batch_size (int): The number of rows per insert.
+        send (bool): Also send these emails as soon as the current transaction commits, for
+            mail users expect right away. Emails that fail to send stay queued.
+
+    Returns:
+        int: The number of queued emails.
+    """
+    queued = OutboundEmail.objects.bulk_create(emails, batch_size=batch_size)
+    if send and queued:
+        ids = [email.id for email in queued]
+        transaction.on_commit(lambda: _send_now(ids))
+    return len(queued)
+
+
+def _send_now(ids):
+    try:
+        send_queued_emails(ids=ids)
+    except Exception:
+        # The request has already succeeded; send_queued_emails retries these later.
+        logger.exception('Sending %d queued emails failed; they stay queued', len(ids))
+
+
+def send_queued_emails(batch_size=100, rate=None, limit=None, connection=None, ids=None):
+    """
+    Sends pending queued emails over a single SMTP connection.
+
+    Emails are sent in batches of batch_size and each batch is marked sent with one update.
+    If sending fails, the current batch stays pending and the error is raised.
+
+    Args:
+        batch_size (int): The number of emails sent and marked per batch.
+        rate (float): The maximum number of emails per second, if given.
+        limit (int): The maximum number of emails to send, if given.
+        connection: The email backend connection to use; one is opened if not given.
+        ids (list): Only send the pending emails with these ids, if given.
+
+    Returns:
+        int: The number of emails sent.
+    """
+    connection = connection or get_connection()
+    ids = None if ids is None else sorted(ids)
+    sent = 0
+    last_id = 0
+    started = time.monotonic()
+    connection.open()
+    try:
+        while limit is None or sent < limit:
+            size = batch_size if limit is None else min(batch_size, limit - sent)
+            pending = OutboundEmail.objects.filter(sent_at__isnull=True, id__gt=last_id).order_by('id')
+            if ids is not None:
+                # The next batch of the given ids, so the query never holds more than batch_size of them.
+                start = bisect.bisect_right(ids, last_id)
+                window = ids[start:start + size]
+                if not window:
+                    break
+                pending = pending.filter(id__in=window)
+            batch = list(pending[:size])
+            if not batch:
+                if ids is None:
+                    break
+                # Sent by someone else meanwhile; move on to the next ids.
+                last_id = window[-1]
+                continue
+            messages = [EmailMessage(email.subject, email.body, DEFAULT_FROM_EMAIL, [email.to_email],
+                                     connection=connection) for email in batch]
+            connection.send_messages(messages)
+            OutboundEmail.objects.filter(id__in=[email.id for email in batch]).update(sent_at=timezone.now())
+            sent += len(batch)
+            last_id = batch[-1].id
+            if rate:
+                # Sleep just long enough to keep the average at or below the rate.
+                ahead = sent / rate - (time.monotonic() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+    finally:
+        connection.close()
+    return sent
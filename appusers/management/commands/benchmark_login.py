@@ -0,0 +1,83 @@
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from appusers import throttling
+
+FLOOD_IP = '203.0.113.66'
+USER_IP = '198.51.100.7'
+
+
+class Command(BaseCommand):
+    help = ('Measures how many real logins go through while other threads flood the login page with '
+            'bad passwords at a fixed rate, with and without login throttling.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='An existing user to log in as.')
+        parser.add_argument('password', help='The password of that user.')
+        parser.add_argument('--seconds', type=float, default=10, help='How long each run lasts.')
+        parser.add_argument('--flooders', type=int, default=4, help='The number of flooding threads.')
+        parser.add_argument('--flood-rate', type=float, default=20, help='Bad attempts per second, in total.')
+
+    def handle(self, *args, **options):
+        if not Client().login(username=options['username'], password=options['password']):
+            raise CommandError('The username and password given do not log in.')
+        baseline = self._run(dict(options, flooders=0))
+        throttled = self._run(options)
+        limits = throttling.LOGIN_USER_LIMIT, throttling.LOGIN_IP_LIMIT
+        throttling.LOGIN_USER_LIMIT = throttling.LOGIN_IP_LIMIT = (float('inf'), 60)
+        try:
+            unthrottled = self._run(options)
+        finally:
+            throttling.LOGIN_USER_LIMIT, throttling.LOGIN_IP_LIMIT = limits
+
+        for label, result in (('No flood', baseline), ('Throttled', throttled), ('Unthrottled', unthrottled)):
+            self.stdout.write(
+                f"{label}: {result['logins'] / options['seconds']:.1f} logins/s "
+                f"({result['latency'] * 1000:.0f} ms average), "
+                f"{result['attempts'] / options['seconds']:.1f} bad attempts/s of which {result['refused']} refused.")
+
+    def _run(self, options):
+        url = reverse('login')
+        stop = threading.Event()
+        lock = threading.Lock()
+        result = {'logins': 0, 'latency': 0.0, 'attempts': 0, 'refused': 0}
+
+        def flood():
+            client = Client(REMOTE_ADDR=FLOOD_IP)
+            interval = options['flooders'] / options['flood_rate']
+            next_at = time.monotonic()
+            while not stop.wait(max(0, next_at - time.monotonic())):
+                next_at += interval
+                response = client.post(url, {'username': uuid.uuid4().hex[:8], 'password': 'wrong'})
+                with lock:
+                    result['attempts'] += 1
+                    result['refused'] += response.status_code == 429
+            connection.close()
+
+        def log_in():
+            client = Client(REMOTE_ADDR=USER_IP)
+            while not stop.is_set():
+                started = time.perf_counter()
+                response = client.post(url, {'username': options['username'], 'password': options['password']})
+                if response.status_code == 302 and response.url == reverse('home'):
+                    result['logins'] += 1
+                    result['latency'] += time.perf_counter() - started
+                client.logout()
+            connection.close()
+
+        threads = [threading.Thread(target=flood) for _ in range(options['flooders'])]
+        threads.append(threading.Thread(target=log_in))
+        for thread in threads:
+            thread.start()
+        time.sleep(options['seconds'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+        result['latency'] /= result['logins'] or 1
+        return result
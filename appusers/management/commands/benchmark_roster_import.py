@@ -0,0 +1,71 @@
+import csv
+import io
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from appusers.api import QueryCounter
+from appusers.models import Course
+from appusers.roster import ROSTER_FIELDS, import_roster, read_roster
+
+BENCHMARK_COURSES = 20
+
+
+def make_roster(rows, course_codes, tutor_share=0.05):
+    """
+    Writes a synthetic CSV roster of students and a share of tutors, each in two or three courses.
+
+    Args:
+        rows (int): The number of rows.
+        course_codes (list): The course codes to enroll the rows in.
+        tutor_share (float): The share of rows that are tutors.
+
+    Returns:
+        io.StringIO: The roster, positioned at the start.
+    """
+    roster = io.StringIO()
+    writer = csv.DictWriter(roster, ROSTER_FIELDS)
+    writer.writeheader()
+    tutor_every = round(1 / tutor_share) if tutor_share else 0
+    for number in range(rows):
+        writer.writerow({
+            'username': f'roster-benchmark-{number}',
+            'email': f'roster-benchmark-{number}@example.com',
+            'first_name': 'Roster',
+            'last_name': f'Benchmark {number}',
+            'role': 'tutor' if tutor_every and number % tutor_every == 0 else 'student',
+            'ums_id': str(10000000 + number),
+            'courses': ';'.join(course_codes[(number + offset) % len(course_codes)] for offset in range(2 + number % 2)),
+        })
+    roster.seek(0)
+    return roster
+
+
+class Command(BaseCommand):
+    help = ('Imports a synthetic roster through the same code path as import_roster and the upload page, '
+            'reports the time and the number of queries, and rolls everything back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--no-email', action='store_true', help='Do not render activation emails.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            codes = [f'BENCH{number:03}' for number in range(BENCHMARK_COURSES)]
+            Course.objects.bulk_create([Course(c_name=f'Benchmark {code}', c_code=code) for code in codes])
+            roster = make_roster(options['rows'], codes)
+            started = time.perf_counter()
+            with QueryCounter() as queries:
+                result = import_roster(read_roster(roster), 'localhost', chunk_size=options['chunk_size'],
+                                       send_activation=not options['no_email'])
+            elapsed = time.perf_counter() - started
+            # Nothing of the benchmark is kept.
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            f'Imported {result.rows} rows in {elapsed:.2f}s ({result.rows / elapsed:.0f} rows/s) with '
+            f'{queries.count} queries: {result.users_created} users, {result.profiles_created} profiles, '
+            f'{result.enrollments} enrollments, {result.emails_queued} activation emails queued, '
+            f'{len(result.errors)} rows rejected.')
@@ -0,0 +1,21 @@
+import shutil
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management.base import BaseCommand
+
+from appusers.assets import build_static
+
+
+class Command(BaseCommand):
+    help = 'Builds the content-hashed, precompressed static assets the templates reference.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clear', action='store_true', help='Remove the previous build first.')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            shutil.rmtree(settings.STATIC_ROOT, ignore_errors=True)
+        built, siblings = build_static(staticfiles_storage)
+        self.stdout.write(self.style.SUCCESS(
+            f'Built {built} assets into {settings.STATIC_ROOT} with {siblings} compressed copies.'))
@@ -0,0 +1,39 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from appusers.roster import import_roster, read_roster, roster_format
+
+
+class Command(BaseCommand):
+    help = 'Imports students, tutors and course enrollments from a CSV, JSON Lines or JSON roster.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Roster file with username, email, first_name, last_name, role, '
+                                         'ums_id and courses (course codes separated by ";") columns.')
+        parser.add_argument('--format', choices=['csv', 'jsonl', 'json'],
+                            help='Roster format; guessed from the file extension by default.')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--domain', default=getattr(settings, 'SITE_DOMAIN', 'localhost:8000'),
+                            help='Host used in activation links.')
+        parser.add_argument('--no-email', action='store_true', help='Do not queue activation emails.')
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or roster_format(options['path'])
+        started = time.monotonic()
+        try:
+            with open(options['path'], newline='', encoding='utf-8-sig') as roster:
+                result = import_roster(read_roster(roster, fmt), options['domain'],
+                                       chunk_size=options['chunk_size'], send_activation=not options['no_email'])
+        except (OSError, ValueError) as error:
+            raise CommandError(error)
+        elapsed = time.monotonic() - started
+
+        for line_num, message in result.errors:
+            self.stderr.write(f'Line {line_num}: {message}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Read {result.rows} rows in {elapsed:.2f}s ({result.rows / elapsed if elapsed else 0:.0f} rows/s): '
+            f'{result.users_created} users and {result.profiles_created} profiles created, '
+            f'{result.enrollments} enrollments, {result.emails_queued} activation emails queued, '
+            f'{len(result.errors)} rows rejected.'))
@@ -0,0 +1,25 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from appusers.profiling import make_profile_token, revoke_profile_tokens
+
+
+class Command(BaseCommand):
+    help = ('Prints a signed token that turns on request profiling when sent in the X-Profile header, '
+            'or revokes the tokens issued to a staff member.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='The staff member the token is issued to.')
+        parser.add_argument('--revoke', action='store_true', help="Revoke this staff member's tokens instead.")
+
+    def handle(self, *args, **options):
+        if options['revoke']:
+            user = User.objects.filter(username=options['username']).first()
+            if user is None:
+                raise CommandError(f"No user named {options['username']}.")
+            self.stdout.write(f'Revoked {revoke_profile_tokens(user)} tokens.')
+            return
+        user = User.objects.filter(username=options['username'], is_staff=True, is_active=True).first()
+        if user is None:
+            raise CommandError(f"{options['username']} is not an active staff user.")
+        self.stdout.write(make_profile_token(user))
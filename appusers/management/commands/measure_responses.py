@@ -0,0 +1,75 @@
+import gzip
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.template import engines
+from django.test import Client
+
+
+def _loaders(minify):
+    # The loaders settings.TEMPLATES configures, with MINIFY_TEMPLATES on or off.
+    return [('django.template.loaders.cached.Loader', [
+        'appusers.template_loaders.MinifyingLoader' if minify else 'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ])]
+
+
+def _use_loaders(loaders):
+    # The engine builds its loaders once; drop them so the next render uses the new ones.
+    engine = engines['django'].engine
+    engine.loaders = loaders
+    engine.__dict__.pop('template_loaders', None)
+
+
+class Command(BaseCommand):
+    help = ('Requests pages with plain templates, with minified templates and with minified templates '
+            'gzipped, and reports their mean size and server time.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', default=['/home/', '/available/', '/session-hsitory/'])
+        parser.add_argument('--username', help='Request the pages logged in as this user.')
+        parser.add_argument('--repeat', type=int, default=5, help='Requests per path and variant.')
+
+    def handle(self, *args, **options):
+        client = Client()
+        if options['username']:
+            user = User.objects.filter(username=options['username']).first()
+            if user is None:
+                raise CommandError(f"No user named {options['username']}.")
+            client.force_login(user)
+
+        engine = engines['django'].engine
+        configured = engine.loaders
+        results = {path: {} for path in options['paths']}
+        try:
+            for variant, loaders, encoding in (('plain', _loaders(False), ''),
+                                               ('minified', _loaders(True), ''),
+                                               ('gzipped', _loaders(True), 'gzip')):
+                _use_loaders(loaders)
+                for path in options['paths']:
+                    results[path][variant] = self._measure(client, path, encoding, options['repeat'])
+        finally:
+            _use_loaders(configured)
+
+        self.stdout.write(f"{'path':<24}{'plain':>12}{'minified':>12}{'gzipped':>12}{'ms (gzipped)':>14}")
+        for path, variants in results.items():
+            self.stdout.write(f'{path:<24}' + ''.join(f"{variants[variant][0] / 1024:>9.1f} KB"
+                                                      for variant in ('plain', 'minified', 'gzipped'))
+                              + f"{variants['gzipped'][1] * 1000:>14.1f}")
+
+    def _measure(self, client, path, encoding, repeat):
+        # One request first, so template compilation isn't measured.
+        client.get(path, HTTP_ACCEPT_ENCODING=encoding)
+        size = elapsed = 0
+        for _ in range(repeat):
+            started = time.perf_counter()
+            response = client.get(path, HTTP_ACCEPT_ENCODING=encoding)
+            elapsed += time.perf_counter() - started
+            if response.status_code != 200:
+                raise CommandError(f'{path} answered {response.status_code}.')
+            size += len(response.content)
+            if response.get('Content-Encoding') == 'gzip':
+                # Make sure the body really is the page, gzipped.
+                gzip.decompress(response.content)
+        return size / repeat, elapsed / repeat
@@ -0,0 +1,25 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+
+from appusers.attendance import process_no_shows
+
+
+class Command(BaseCommand):
+    help = ('Counts booked sessions that were not marked attended as no-shows. '
+            'Meant to run daily; reruns never count a session twice.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-days', type=int, default=2,
+                            help='Only process sessions at least this many days old, so tutors have time '
+                                 'to mark attendance.')
+        parser.add_argument('--since', type=date.fromisoformat,
+                            help='On the first run, process sessions after this date (YYYY-MM-DD). '
+                                 'By default the first run only records where to start.')
+        parser.add_argument('--batch-days', type=int, default=7)
+
+    def handle(self, *args, **options):
+        until = date.today() - timedelta(days=options['grace_days'])
+        missed, students = process_no_shows(until, since=options['since'], batch_days=options['batch_days'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed sessions up to {until}: {missed} no-shows recorded for {students} students.'))
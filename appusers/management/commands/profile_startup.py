@@ -0,0 +1,105 @@
+import json
+import re
+import subprocess
+import sys
+from collections import Counter
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+# One line of -X importtime output: own and cumulative microseconds, then the indented module name.
+IMPORT_TIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|\s+(\S+)\s*$')
+
+
+def _ms(seconds):
+    return f'{seconds * 1000:.1f} ms'
+
+
+class Command(BaseCommand):
+    help = ('Boots the project in fresh processes, with and without the worker warm-up, and reports the '
+            'import time of each module and the cost of the first request to each path.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', default=['/', '/home/'], help='The paths to request.')
+        parser.add_argument('--username', help='Send the requests logged in as this user.')
+        parser.add_argument('--limit', type=int, default=15, help='The number of modules listed per table.')
+        parser.add_argument('--json', action='store_true', help='Print the measurements as JSON, for tracking.')
+
+    def handle(self, *args, **options):
+        cookies = ''
+        session = None
+        if options['username']:
+            session = self._log_in(options['username'])
+            cookies = f'{settings.SESSION_COOKIE_NAME}={session.session_key}'
+        try:
+            imports, cold = self._run(options['paths'], cookies, warmup=False)
+            _, warm = self._run(options['paths'], cookies, warmup=True)
+        finally:
+            if session is not None:
+                session.delete()
+
+        if options['json']:
+            self.stdout.write(json.dumps({'imports': imports, 'cold': cold, 'warm': warm}))
+            return
+        self._report(imports, cold, warm, options['limit'])
+
+    def _log_in(self, username):
+        user = User.objects.filter(username=username).first()
+        if user is None:
+            raise CommandError(f'No user named {username}.')
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session[SESSION_KEY] = user._meta.pk.value_to_string(user)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.save()
+        return session
+
+    def _run(self, paths, cookies, warmup):
+        # A fresh interpreter, so every import is measured cold.
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-m', 'appusers.startup',
+             json.dumps({'paths': paths, 'cookies': cookies, 'warmup': warmup})],
+            cwd=settings.BASE_DIR, capture_output=True, text=True)
+        if process.returncode:
+            raise CommandError(f'The profiled process failed:\n{process.stderr[-2000:]}')
+        imports = []
+        for line in process.stderr.splitlines():
+            match = IMPORT_TIME_RE.match(line)
+            if match:
+                imports.append({'module': match[3], 'self': int(match[1]) / 1e6,
+                                'cumulative': int(match[2]) / 1e6})
+        return imports, json.loads(process.stdout)
+
+    def _report(self, imports, cold, warm, limit):
+        write = self.stdout.write
+        write(f"Import time: {_ms(sum(row['self'] for row in imports))} over {len(imports)} modules")
+        write('Slowest imports, including the modules they import:')
+        for row in sorted(imports, key=lambda row: -row['cumulative'])[:limit]:
+            write(f"  {_ms(row['cumulative']):>10}  {row['module']}")
+        packages = Counter()
+        for row in imports:
+            packages[row['module'].split('.')[0]] += row['self']
+        write('Import time by top-level package:')
+        for package, seconds in packages.most_common(limit):
+            write(f'  {_ms(seconds):>10}  {package}')
+
+        write(f"\nBoot: django.setup() {_ms(cold['setup'])}, WSGI application {_ms(cold['boot'])}")
+        write('Warm-up: ' + ', '.join(f'{step} {"failed" if seconds is None else _ms(seconds)}'
+                                      for step, seconds in warm['warmup'].items()))
+
+        write('\nRequests (first request / second request):')
+        for cold_request, warm_request in zip(cold['requests'], warm['requests']):
+            write(f"  {cold_request['path']} ({cold_request['status']}): "
+                  f"without warm-up {_ms(cold_request['first'])} / {_ms(cold_request['second'])}, "
+                  f"with warm-up {_ms(warm_request['first'])} / {_ms(warm_request['second'])}")
+        for request in cold['requests']:
+            write(f"\nFirst request to {request['path']} without warm-up, profiled:")
+            imported = request['imported']
+            if imported:
+                write(f"  Imported {len(imported)} modules: {', '.join(imported[:limit])}"
+                      f"{', ...' if len(imported) > limit else ''}")
+            for module, seconds in request['modules'][:limit]:
+                write(f'  {_ms(seconds):>10}  {module}')
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from appusers.retention import POLICIES, purge
+
+
+class Command(BaseCommand):
+    help = ('Deletes expired sessions, never-activated signups, old open slots, old slot events '
+            'and old sent emails in small batches.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', nargs='+', choices=list(POLICIES), help='Only apply these policies.')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows deleted per transaction.')
+        parser.add_argument('--pause', type=float, default=0.1, help='Seconds to wait between batches.')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the rows that would be deleted.')
+
+    def handle(self, *args, **options):
+        removed = purge(options['only'], batch_size=options['batch_size'], pause=options['pause'],
+                        dry_run=options['dry_run'])
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        for policy, count in removed.items():
+            self.stdout.write(f'{policy}: {count}')
+        self.stdout.write(self.style.SUCCESS(f'{verb} {sum(removed.values())} rows.'))
@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from appusers.models import Student, Tutor
+from appusers.uploads import purge_unreferenced
+
+
+class Command(BaseCommand):
+    help = 'Deletes stored profile pictures that no student or tutor uses any more.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=int, default=1,
+                            help='Keep files younger than this many hours.')
+        parser.add_argument('--dry-run', action='store_true', help='Only list the files that would be deleted.')
+
+    def handle(self, *args, **options):
+        referenced = set(Student.objects.exclude(profile_picture='').exclude(profile_picture__isnull=True)
+                         .values_list('profile_picture', flat=True))
+        # Tutors keep the picture's URL rather than its storage name.
+        referenced.update(url[len(settings.MEDIA_URL):] for url in Tutor.objects.filter(
+            profile_picture__startswith=settings.MEDIA_URL).values_list('profile_picture', flat=True))
+        deleted = purge_unreferenced(referenced, grace=timedelta(hours=options['grace_hours']),
+                                     dry_run=options['dry_run'])
+        for name in deleted:
+            self.stdout.write(name)
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {len(deleted)} profile pictures.'))
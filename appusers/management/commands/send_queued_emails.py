@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from appusers.mail import send_queued_emails
+
+
+class Command(BaseCommand):
+    help = 'Sends queued emails in batches over a single SMTP connection.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--rate', type=float, help='Maximum emails per second.')
+        parser.add_argument('--limit', type=int, help='Maximum number of emails to send.')
+
+    def handle(self, *args, **options):
+        sent = send_queued_emails(batch_size=options['batch_size'], rate=options['rate'], limit=options['limit'])
+        self.stdout.write(self.style.SUCCESS(f'Sent {sent} emails.'))
@@ -0,0 +1,28 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+
+from appusers.mail import send_queued_emails
+from appusers.reminders import queue_session_reminders
+
+
+class Command(BaseCommand):
+    help = ("Queues reminder emails for tomorrow's booked sessions and sends them in rate-limited "
+            "batches over one SMTP connection. Other queued emails are left to send_queued_emails. "
+            "Safe to rerun.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat,
+                            help='Remind sessions on this date (YYYY-MM-DD) instead of tomorrow.')
+        parser.add_argument('--batch-size', type=int, default=100, help='Emails sent per batch.')
+        parser.add_argument('--rate', type=float, default=10, help='Maximum emails per second; 0 for no limit.')
+        parser.add_argument('--queue-only', action='store_true',
+                            help='Only queue the reminders; leave sending to send_queued_emails.')
+
+    def handle(self, *args, **options):
+        day = options['date'] or date.today() + timedelta(days=1)
+        queued = queue_session_reminders(day)
+        self.stdout.write(f'Queued {len(queued)} reminders for {day}.')
+        if not options['queue_only']:
+            sent = send_queued_emails(batch_size=options['batch_size'], rate=options['rate'] or None, ids=queued)
+            self.stdout.write(self.style.SUCCESS(f'Sent {sent} reminders.'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from appusers.mail import send_queued_emails
+from appusers.notifications import queue_tutor_digests
+
+
+class Command(BaseCommand):
+    help = ('Queues one summary email per digest-mode tutor for the session changes since the last run, '
+            'then sends them. Run it once per digest window, e.g. hourly.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queue-only', action='store_true',
+                            help='Only queue the digests; leave sending to send_queued_emails.')
+
+    def handle(self, *args, **options):
+        queued = queue_tutor_digests()
+        self.stdout.write(f'Queued {len(queued)} digests.')
+        if not options['queue_only']:
+            sent = send_queued_emails(ids=queued)
+            self.stdout.write(self.style.SUCCESS(f'Sent {sent} digests.'))
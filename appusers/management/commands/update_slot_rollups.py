@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from appusers.rollups import rebuild_slot_rollups, update_slot_rollups
+
+
+class Command(BaseCommand):
+    help = 'Updates the per-course slot status counts from the slot event log since the last run.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Recompute the counts from all slots instead, correcting changes made '
+                                 'without slot events such as admin edits.')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            written = rebuild_slot_rollups()
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} slot status counts.'))
+            return
+        applied = update_slot_rollups()
+        self.stdout.write(self.style.SUCCESS(f'Applied {applied} slot events.'))
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+
+# Responses smaller than this many bytes are sent as they are; compressing them saves too little.
+COMPRESSION_MIN_SIZE = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'application/xml', 'image/svg+xml')
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Gzips rendered pages and JSON responses that are large enough to benefit.
+
+    Django's GZipMiddleware already skips clients that don't accept gzip, already encoded
+    responses, and pads compressed bodies against BREACH. On top of that this leaves streamed
+    responses alone: slot event streams have to reach the browser as each event is written, and
+    file responses are binary or already precompressed by build_static.
+    """
+
+    def process_response(self, request, response):
+        if response.streaming:
+            return response
+        if len(response.content) < COMPRESSION_MIN_SIZE:
+            return response
+        if not response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES):
+            return response
+        return super().process_response(request, response)
@@ -0,0 +1,34 @@
+# Generated by Django 4.2 on 2026-10-19 18:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appusers', '0017_alter_student_ums_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('created', 'Created'), ('booked', 'Booked'), ('cancelled', 'Cancelled'), ('deleted', 'Deleted')], max_length=10)),
+                ('availability_id', models.BigIntegerField()),
+                ('payload', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_events', to='appusers.course')),
+                ('tutor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='slot_events', to='appusers.tutor')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='slotevent',
+            index=models.Index(fields=['course', 'id'], name='appusers_sl_course__006d3a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='slotevent',
+            index=models.Index(fields=['tutor', 'id'], name='appusers_sl_tutor_i_2c6487_idx'),
+        ),
+    ]
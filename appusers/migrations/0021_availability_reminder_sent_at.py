@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-19 18:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appusers', '0020_availability_attended_jobwatermark'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='availability',
+            name='reminder_sent_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-19 18:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appusers', '0021_availability_reminder_sent_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tutor',
+            name='notification_mode',
+            field=models.CharField(choices=[('digest', 'Digest'), ('instant', 'Instant')], default='digest', max_length=10),
+        ),
+    ]
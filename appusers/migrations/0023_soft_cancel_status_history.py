@@ -0,0 +1,57 @@
+# Generated by Django 4.2 on 2026-10-19 18:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appusers', '0022_tutor_notification_mode'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotStatusCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('A', 'Available'), ('B', 'Booked'), ('C', 'Canceled')], max_length=1)),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='slotevent',
+            name='from_status',
+            field=models.CharField(blank=True, choices=[('A', 'Available'), ('B', 'Booked'), ('C', 'Canceled')], max_length=1),
+        ),
+        migrations.AddField(
+            model_name='slotevent',
+            name='to_status',
+            field=models.CharField(blank=True, choices=[('A', 'Available'), ('B', 'Booked'), ('C', 'Canceled')], max_length=1),
+        ),
+        migrations.AddIndex(
+            model_name='availability',
+            index=models.Index(condition=models.Q(('status', 'C'), _negated=True), fields=['tutor', 'date'], name='availability_active_tutor'),
+        ),
+        migrations.AddIndex(
+            model_name='availability',
+            index=models.Index(condition=models.Q(('status', 'C'), _negated=True), fields=['booked_by', 'date'], name='availability_active_student'),
+        ),
+        migrations.AddIndex(
+            model_name='availability',
+            index=models.Index(condition=models.Q(('status', 'A')), fields=['course', 'date'], name='availability_open_course'),
+        ),
+        migrations.AddIndex(
+            model_name='slotevent',
+            index=models.Index(fields=['availability_id', 'id'], name='appusers_sl_availab_92e684_idx'),
+        ),
+        migrations.AddField(
+            model_name='slotstatuscount',
+            name='course',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_status_counts', to='appusers.course'),
+        ),
+        migrations.AddConstraint(
+            model_name='slotstatuscount',
+            constraint=models.UniqueConstraint(fields=('course', 'status'), name='unique_slot_status_count'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2 on 2026-10-19 18:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appusers', '0023_soft_cancel_status_history'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='availability',
+            index=models.Index(fields=['date', 'timeblock'], name='availability_date'),
+        ),
+        migrations.AddIndex(
+            model_name='availability',
+            index=models.Index(fields=['status', 'date'], name='availability_status_date'),
+        ),
+    ]
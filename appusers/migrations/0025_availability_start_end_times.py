@@ -0,0 +1,91 @@
+import datetime
+
+from django.db import migrations, models
+
+# The fixed hour-long blocks slots were limited to before they had start and end times.
+TIMEBLOCK_HOURS = {code: 8 + hour for hour, code in enumerate('ABCDEFGHI')}
+
+
+def timeblocks_to_times(apps, schema_editor):
+    Availability = apps.get_model('appusers', 'Availability')
+    for code, hour in TIMEBLOCK_HOURS.items():
+        Availability.objects.filter(timeblock=code).update(start_time=datetime.time(hour),
+                                                           end_time=datetime.time(hour + 1))
+
+
+def times_to_timeblocks(apps, schema_editor):
+    # Slots are put in the block their start falls in; the length of non-standard slots is lost.
+    Availability = apps.get_model('appusers', 'Availability')
+    for code, hour in TIMEBLOCK_HOURS.items():
+        slots = Availability.objects.all()
+        if code != 'A':
+            slots = slots.filter(start_time__gte=datetime.time(hour))
+        if code != 'I':
+            slots = slots.filter(start_time__lt=datetime.time(hour + 1))
+        slots.update(timeblock=code)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appusers', '0024_availability_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='availability',
+            name='start_time',
+            field=models.TimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='availability',
+            name='end_time',
+            field=models.TimeField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='availability',
+            name='timeblock',
+            field=models.CharField(blank=True, max_length=1),
+        ),
+        migrations.RunPython(timeblocks_to_times, times_to_timeblocks),
+        migrations.RemoveIndex(
+            model_name='availability',
+            name='availability_active_tutor',
+        ),
+        migrations.RemoveIndex(
+            model_name='availability',
+            name='availability_active_student',
+        ),
+        migrations.RemoveIndex(
+            model_name='availability',
+            name='availability_date',
+        ),
+        migrations.RemoveField(
+            model_name='availability',
+            name='timeblock',
+        ),
+        migrations.AlterField(
+            model_name='availability',
+            name='start_time',
+            field=models.TimeField(),
+        ),
+        migrations.AlterField(
+            model_name='availability',
+            name='end_time',
+            field=models.TimeField(),
+        ),
+        migrations.AddIndex(
+            model_name='availability',
+            index=models.Index(condition=models.Q(('status', 'C'), _negated=True),
+                               fields=['tutor', 'date', 'start_time'], name='availability_active_tutor'),
+        ),
+        migrations.AddIndex(
+            model_name='availability',
+            index=models.Index(condition=models.Q(('status', 'C'), _negated=True),
+                               fields=['booked_by', 'date', 'start_time'], name='availability_active_student'),
+        ),
+        migrations.AddIndex(
+            model_name='availability',
+            index=models.Index(fields=['date', 'start_time'], name='availability_date'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils.text import slugify
+
+
+def fill_department_codes(apps, schema_editor):
+    Department = apps.get_model('appusers', 'Department')
+    taken = set()
+    for department in Department.objects.order_by('id'):
+        code = slugify(department.d_name)[:20] or 'department'
+        if code in taken:
+            code = f'{code[:20 - len(str(department.id)) - 1]}-{department.id}'
+        taken.add(code)
+        department.code = code
+        department.save(update_fields=['code'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appusers', '0025_availability_start_end_times'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='department',
+            name='code',
+            field=models.SlugField(max_length=20, null=True),
+        ),
+        migrations.RunPython(fill_department_codes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='department',
+            name='code',
+            field=models.SlugField(max_length=20, unique=True),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='department',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL,
+                                    related_name='courses', to='appusers.department'),
+        ),
+        migrations.AddField(
+            model_name='tutor',
+            name='department',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL,
+                                    related_name='tutors', to='appusers.department'),
+        ),
+    ]
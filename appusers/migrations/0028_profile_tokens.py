@@ -0,0 +1,25 @@
+# Generated by Django 4.2 on 2026-10-19 19:29
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('appusers', '0027_cache_table'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('revoked_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='profile_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2 on 2026-10-19 19:30
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def fill_event_students(apps, schema_editor):
+    # Earlier events only know their slot; credit them to the student the slot is booked by now.
+    Availability = apps.get_model('appusers', 'Availability')
+    SlotEvent = apps.get_model('appusers', 'SlotEvent')
+    SlotEvent.objects.update(student_id=Subquery(
+        Availability.objects.filter(id=OuterRef('availability_id')).values('booked_by_id')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appusers', '0028_profile_tokens'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='slotevent',
+            name='student',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='slot_events', to='appusers.student'),
+        ),
+        migrations.AddIndex(
+            model_name='slotevent',
+            index=models.Index(fields=['student', 'id'], name='appusers_sl_student_977118_idx'),
+        ),
+        migrations.RunPython(fill_event_students, migrations.RunPython.noop),
+    ]
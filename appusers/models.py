@@ -4,6 +4,7 @@ from django.db import models
 
 # Create your models here.
 
+# The standard hour-long blocks, offered as presets when creating slots and filtering by time.
 TIMEBLOCK_CHOICES = (
     ("A", "8:00 AM - 9:00 AM"),
     ("B", "9:00 AM - 10:00 AM"),
@@ -15,6 +16,8 @@ TIMEBLOCK_CHOICES = (
     ("H", "3:00 PM - 4:00 PM"),
     ("I", "4:00 PM - 5:00 PM"),
 )
+TIMEBLOCK_TIMES = {key: (datetime.time(8 + hour), datetime.time(9 + hour))
+                   for hour, (key, label) in enumerate(TIMEBLOCK_CHOICES)}
 
 STATUS_CHOICES = [
     ('A', 'Available'),
@@ -23,6 +26,35 @@ STATUS_CHOICES = [
 ]
 
 
+def format_time(value):
+    """Formats a time the way TIMEBLOCK_CHOICES does, e.g. "9:30 AM"."""
+    return value.strftime('%I:%M %p').lstrip('0')
+
+
+NOTIFICATION_MODE_CHOICES = [
+    ('digest', 'Digest'),
+    ('instant', 'Instant'),
+]
+
+
+class Department(models.Model):
+    """
+    Represents a department running its own tutoring centre.
+
+    Courses and tutors belong to a department, and so do the sessions of its courses. The code
+    names the department in URLs, cache keys and the DEPARTMENT_DATABASES setting.
+
+    Attributes:
+        d_name (CharField): The name of the department.
+        code (SlugField): The short unique name of the department.
+    """
+    d_name = models.CharField(max_length=100)
+    code = models.SlugField(max_length=20, unique=True)
+
+    def __str__(self):
+        return self.d_name
+
+
 class Course(models.Model):
     """
     Represents a course.
@@ -30,9 +62,12 @@ class Course(models.Model):
     Attributes:
         c_name (CharField): The name of the course.
         c_code (CharField): The code of the course.
+        department (ForeignKey): The department offering the course.
     """
     c_name = models.CharField(max_length=100)
     c_code = models.CharField(max_length=50, unique=True, null=False)
+    department = models.ForeignKey(Department, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='courses')
 
     def __str__(self):
         return self.c_name
@@ -70,10 +105,15 @@ class Tutor(models.Model):
         user (OneToOneField): The associated user.
         courses (ManyToManyField): The courses taught by the tutor.
         profile_picture (URLField): The URL of the tutor's profile picture.
+        notification_mode (CharField): Whether session emails are sent one by one or as a periodic digest.
+        department (ForeignKey): The department the tutor works for.
     """
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     courses = models.ManyToManyField(Course, related_name='tutors')
     profile_picture = models.URLField(default='static/images/favicons/Blue_logo.png', null=True, blank=True)
+    notification_mode = models.CharField(max_length=10, choices=NOTIFICATION_MODE_CHOICES, default='digest')
+    department = models.ForeignKey(Department, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='tutors')
 
     def availabilities(self):
         return self.availabilities.all()
@@ -82,6 +122,33 @@ class Tutor(models.Model):
         return self.user.username
 
 
+class AvailabilityQuerySet(models.QuerySet):
+    """
+    QuerySet for Availability with shortcuts matching its partial indexes.
+    """
+
+    def active(self):
+        """
+        Excludes cancelled slots, which are kept for their history.
+
+        Returns:
+            QuerySet: The slots that are available or booked.
+        """
+        return self.exclude(status='C')
+
+    def for_department(self, department):
+        """
+        Keeps the sessions of a department's courses.
+
+        Args:
+            department (Department): The department, or None for all of them.
+
+        Returns:
+            QuerySet: The department's slots.
+        """
+        return self if department is None else self.filter(course__department=department)
+
+
 class Availability(models.Model):
     """
     Represents the availability of a tutor.
@@ -89,20 +156,43 @@ class Availability(models.Model):
     Attributes:
         tutor (ForeignKey): The associated tutor.
         date (DateField): The date of availability.
-        timeblock (CharField): The selected time block.
+        start_time (TimeField): When the session starts.
+        end_time (TimeField): When the session ends; sessions of one tutor or student never overlap.
         booked_by (ForeignKey): The student who booked the slot.
         course (ForeignKey): The associated course.
         status (CharField): The status of the availability.
         semester (CharField): The semester of the availability.
+        attended (BooleanField): Whether the tutor confirmed that the student attended.
+        reminder_sent_at (DateTimeField): When the booking's reminder email was queued.
     """
     tutor = models.ForeignKey(Tutor, on_delete=models.CASCADE, null=True, blank=True, related_name='availabilities')
     date = models.DateField()
-    timeblock = models.CharField(max_length=1, choices=TIMEBLOCK_CHOICES)
+    start_time = models.TimeField()
+    end_time = models.TimeField()
     booked_by = models.ForeignKey(Student, on_delete=models.SET_NULL, null=True, blank=True,
                                   related_name='booked_slots')
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
     status = models.CharField(max_length=1, choices=STATUS_CHOICES)
     semester = models.CharField(max_length=25, null=True)
+    attended = models.BooleanField(default=False)
+    reminder_sent_at = models.DateTimeField(null=True, blank=True)
+
+    objects = AvailabilityQuerySet.as_manager()
+
+    class Meta:
+        # Cancelled rows are kept, so the indexes behind the active-slot queries leave them out.
+        indexes = [
+            # Overlap checks seek the last session starting before a new one ends within these.
+            models.Index(fields=['tutor', 'date', 'start_time'], condition=~models.Q(status='C'),
+                         name='availability_active_tutor'),
+            models.Index(fields=['booked_by', 'date', 'start_time'], condition=~models.Q(status='C'),
+                         name='availability_active_student'),
+            models.Index(fields=['course', 'date'], condition=models.Q(status='A'),
+                         name='availability_open_course'),
+            # Back the admin changelist's ordering, date drill-down and status filter.
+            models.Index(fields=['date', 'start_time'], name='availability_date'),
+            models.Index(fields=['status', 'date'], name='availability_status_date'),
+        ]
 
     def __str__(self):
         """
@@ -115,6 +205,12 @@ class Availability(models.Model):
        """
         return f"{self.tutor} - {self.date} - {self.get_timeblock_display()} with {self.booked_by} is {self.status}"
 
+    def get_timeblock_display(self):
+        """
+        Returns the session's time range, e.g. "8:00 AM - 9:30 AM".
+        """
+        return f"{format_time(self.start_time)} - {format_time(self.end_time)}"
+
     def check_semester(self):
         today = self.date
         if today.month >= 1 and today.month <= 4:
@@ -132,19 +228,6 @@ class Availability(models.Model):
         super().save(*args, **kwargs)
 
 
-class Department(models.Model):
-    """
-    Represents a department.
-
-    Attributes:
-        d_name (CharField): The name of the department.
-    """
-    d_name = models.CharField(max_length=100)
-
-    def __str__(self):
-        return self.d_name
-
-
 class SemesterDates(models.Model):
     """
    Represents the dates of a semester.
@@ -159,3 +242,143 @@ class SemesterDates(models.Model):
     startDate = models.DateField(null=False)
     endDate = models.DateField(null=False)
     currentSemester = models.BooleanField(default=False)
+
+
+SLOT_EVENT_CHOICES = [
+    ('created', 'Created'),
+    ('booked', 'Booked'),
+    ('cancelled', 'Cancelled'),
+    ('deleted', 'Deleted'),
+]
+
+
+class SlotEvent(models.Model):
+    """
+    Represents a change to an availability slot, used to push live updates to clients.
+
+    Rows are append-only and record every status transition, so they are the history of each
+    slot and the input of the incremental rollups. The auto-incrementing id doubles as the
+    server-sent event id so that reconnecting clients can resume from the last event they saw.
+
+    Attributes:
+        kind (CharField): What happened to the slot.
+        availability_id (BigIntegerField): The id of the slot (kept after the slot is deleted).
+        course (ForeignKey): The course of the slot.
+        tutor (ForeignKey): The tutor of the slot.
+        student (ForeignKey): The student who booked the slot, before or by the change, if any.
+        from_status (CharField): The status of the slot before the change, blank for new slots.
+        to_status (CharField): The status of the slot after the change, blank for deleted slots.
+        payload (JSONField): The serialized slot, as sent to clients.
+        created_at (DateTimeField): When the event was recorded.
+    """
+    kind = models.CharField(max_length=10, choices=SLOT_EVENT_CHOICES)
+    availability_id = models.BigIntegerField()
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='slot_events')
+    tutor = models.ForeignKey(Tutor, on_delete=models.CASCADE, null=True, blank=True, related_name='slot_events')
+    student = models.ForeignKey(Student, on_delete=models.SET_NULL, null=True, blank=True, related_name='slot_events')
+    from_status = models.CharField(max_length=1, choices=STATUS_CHOICES, blank=True)
+    to_status = models.CharField(max_length=1, choices=STATUS_CHOICES, blank=True)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['course', 'id']),
+            models.Index(fields=['tutor', 'id']),
+            models.Index(fields=['student', 'id']),
+            models.Index(fields=['availability_id', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} slot {self.availability_id}"
+
+
+class OutboundEmail(models.Model):
+    """
+    Represents an email queued for sending by the send_queued_emails command.
+
+    Queuing keeps SMTP round-trips out of the request path and lets the sender reuse one
+    connection for many messages.
+
+    Attributes:
+        to_email (EmailField): The recipient.
+        subject (CharField): The subject line.
+        body (TextField): The rendered message.
+        created_at (DateTimeField): When the email was queued.
+        sent_at (DateTimeField): When the email was sent, or null while pending.
+    """
+    to_email = models.EmailField()
+    subject = models.CharField(max_length=200)
+    body = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['sent_at', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {self.to_email}"
+
+
+class JobWatermark(models.Model):
+    """
+    Records how far a recurring job has processed, so reruns never process the same rows twice.
+
+    Attributes:
+        name (CharField): The name of the job.
+        date (DateField): The last date the job has fully processed.
+        last_id (BigIntegerField): The last row id the job has fully processed.
+        updated_at (DateTimeField): When the watermark last moved.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    date = models.DateField(null=True, blank=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} at {self.date or self.last_id}"
+
+
+class SlotStatusCount(models.Model):
+    """
+    Represents the number of slots of a course in a status, maintained incrementally from the
+    SlotEvent log by the update_slot_rollups command.
+
+    Attributes:
+        course (ForeignKey): The course.
+        status (CharField): The slot status.
+        count (IntegerField): The number of slots.
+    """
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='slot_status_counts')
+    status = models.CharField(max_length=1, choices=STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'status'], name='unique_slot_status_count'),
+        ]
+
+    def __str__(self):
+        return f"{self.course} {self.get_status_display()}: {self.count}"
+
+
+class ProfileToken(models.Model):
+    """
+    Represents a token issued to a staff member for profiling live requests.
+
+    The signed token only carries the id of this row, so a token stops working as soon as it is
+    revoked, or its staff member is deactivated or loses staff status.
+
+    Attributes:
+        user (ForeignKey): The staff member the token was issued to.
+        created_at (DateTimeField): When the token was issued.
+        revoked_at (DateTimeField): When the token was revoked, or null while it is valid.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='profile_tokens')
+    created_at = models.DateTimeField(auto_now_add=True)
+    revoked_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Profile token {self.id} of {self.user}"
@@ -0,0 +1,131 @@
+from datetime import date
+from itertools import groupby
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .mail import build_email, queue_emails
+from .models import JobWatermark, SlotEvent
+
+DIGEST_JOB = 'tutor_digest'
+
+TUTOR_EMAILS = {
+    'booked': ('Session Booked', 'emails/session_booked_email_tutor.html'),
+    'cancelled': ('Session Cancelled', 'emails/session_cancel_email_tutor.html'),
+    'created': ('Session Created', 'emails/session_created_email.html'),
+}
+
+DIGEST_LABELS = {
+    'created': 'Created',
+    'booked': 'Booked',
+    'cancelled': 'Cancelled by student',
+    'deleted': 'Deleted',
+}
+
+
+def _digest_label(event):
+    # Cancelled slots moving to 'C' were cancelled by the tutor; students' cancellations reopen them.
+    if event.kind == 'cancelled' and event.to_status == 'C':
+        return 'Cancelled'
+    return DIGEST_LABELS.get(event.kind, event.kind)
+
+
+def is_urgent(kind, session_date, today):
+    """
+    Returns whether a slot event must reach the tutor right away rather than in the next digest.
+
+    Bookings and cancellations by students for a session later the same day can't wait.
+
+    Args:
+        kind (str): The slot event kind.
+        session_date (date or str): The date of the session.
+        today (date): The date the event happened.
+
+    Returns:
+        bool: True if the event is urgent.
+    """
+    return kind in ('booked', 'cancelled') and str(session_date) == str(today)
+
+
+def tutor_email(kind, availability, student=None):
+    """
+    Builds the email telling the slot's tutor about a slot event, unless it can wait for the digest.
+
+    Tutors in instant mode get every event; tutors in digest mode only get urgent ones here and
+    the rest from send_tutor_digests.
+
+    Args:
+        kind (str): 'booked', 'cancelled' or 'created'.
+        availability (Availability): The slot.
+        student (Student): The student who booked or cancelled, if any.
+
+    Returns:
+        OutboundEmail: The unsaved email, or None if there is nothing to send now.
+    """
+    tutor = availability.tutor
+    if tutor is None or kind not in TUTOR_EMAILS or not tutor.user.email:
+        return None
+    if tutor.notification_mode != 'instant' and not is_urgent(kind, availability.date, date.today()):
+        return None
+    subject, template_name = TUTOR_EMAILS[kind]
+    return build_email(tutor.user.email, subject, template_name, {
+        'user': tutor.user,
+        'course': availability.course,
+        'student': student,
+        'tutor': tutor,
+        'timeblock': availability.get_timeblock_display(),
+    })
+
+
+def notify_tutor(kind, availability, student=None):
+    """
+    Sends an email to the slot's tutor about a slot event once the transaction commits, unless it
+    can wait for the digest.
+
+    Args:
+        kind (str): 'booked', 'cancelled' or 'created'.
+        availability (Availability): The slot.
+        student (Student): The student who booked or cancelled, if any.
+    """
+    email = tutor_email(kind, availability, student)
+    if email is not None:
+        queue_emails([email], send=True)
+
+
+def queue_tutor_digests():
+    """
+    Queues one summary email per digest-mode tutor covering the slot events since the last digest.
+
+    Events are read from the SlotEvent log after the job's watermark; urgent events, which were
+    already sent on their own, are left out. The emails are queued and the watermark advanced in
+    one transaction, so a rerun never sends the same event twice. The first run only records the
+    watermark.
+
+    Returns:
+        list: The ids of the queued digest emails.
+    """
+    JobWatermark.objects.get_or_create(
+        name=DIGEST_JOB, defaults={'last_id': SlotEvent.objects.aggregate(last=Max('id'))['last'] or 0})
+    with transaction.atomic():
+        watermark = JobWatermark.objects.select_for_update().get(name=DIGEST_JOB)
+        upper = SlotEvent.objects.aggregate(last=Max('id'))['last'] or 0
+        if upper <= watermark.last_id:
+            return []
+        events = (SlotEvent.objects
+                  .filter(id__gt=watermark.last_id, id__lte=upper, tutor__notification_mode='digest')
+                  .select_related('tutor__user')
+                  .order_by('tutor_id', 'id'))
+        emails = []
+        for tutor, tutor_events in groupby(events, key=lambda event: event.tutor):
+            entries = [dict(event.payload, label=_digest_label(event))
+                       for event in tutor_events
+                       if event.to_status == 'C'
+                       or not is_urgent(event.kind, event.payload.get('date'), timezone.localdate(event.created_at))]
+            if entries and tutor.user.email:
+                emails.append(build_email(tutor.user.email, 'Your tutoring session updates',
+                                          'emails/tutor_digest_email.html', {'user': tutor.user, 'events': entries}))
+        queue_emails(emails)
+        watermark.last_id = upper
+        watermark.save(update_fields=['last_id', 'updated_at'])
+    return [email.id for email in emails]
@@ -0,0 +1,343 @@
+import contextvars
+import functools
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Template
+from django.template.defaulttags import ForNode
+from django.template.loader_tags import BlockNode, IncludeNode
+from django.utils import timezone
+from django.utils.html import escape
+
+from .models import ProfileToken
+
+TEMPLATE_PROFILE_FLAG = 'profile_templates'
+
+_template_profile = contextvars.ContextVar('template_profile', default=None)
+
+
+class TemplateProfile:
+    """
+    Render times and query counts of the templates and template blocks of one request.
+
+    Times and queries are inclusive: a block's figures include the blocks rendered inside it.
+    Queries triggered while no template is rendering are counted against the view.
+
+    Attributes:
+        entries (dict): Labels mapped to [calls, seconds, queries].
+        view_queries (int): The queries run outside of template rendering.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.view_queries = 0
+        self._stack = []
+
+    def enter(self, label):
+        self._stack.append([label, time.perf_counter(), 0])
+
+    def exit(self):
+        label, started, queries = self._stack.pop()
+        entry = self.entries.setdefault(label, [0, 0.0, 0])
+        entry[0] += 1
+        entry[1] += time.perf_counter() - started
+        entry[2] += queries
+
+    def record_query(self, execute, sql, params, many, context):
+        if self._stack:
+            for frame in self._stack:
+                frame[2] += 1
+        else:
+            self.view_queries += 1
+        return execute(sql, params, many, context)
+
+    def report(self):
+        """Returns the entries as (label, calls, milliseconds, queries) tuples, slowest first."""
+        return sorted(((label, calls, seconds * 1000, queries)
+                       for label, (calls, seconds, queries) in self.entries.items()),
+                      key=lambda row: row[2], reverse=True)
+
+
+def _node_label(node, description):
+    origin = getattr(node, 'origin', None)
+    token = getattr(node, 'token', None)
+    name = origin.template_name if origin else '?'
+    return f'{name}:{token.lineno if token else "?"} {description}'
+
+
+def _profiled(render, label):
+    @functools.wraps(render)
+    def wrapper(self, context):
+        profile = _template_profile.get()
+        if profile is None:
+            return render(self, context)
+        profile.enter(label(self))
+        try:
+            return render(self, context)
+        finally:
+            profile.exit()
+    return wrapper
+
+
+# Methods wrapped while a profiled request renders, with the label each call is recorded under.
+TEMPLATE_HOOKS = (
+    (Template, '_render', lambda template: template.origin.template_name or '<string>'),
+    (BlockNode, 'render', lambda node: _node_label(node, f'block {node.name}')),
+    (IncludeNode, 'render', lambda node: _node_label(node, f'include {node.template.token}')),
+    (ForNode, 'render', lambda node: _node_label(node, f"for {', '.join(node.loopvars)} in {node.sequence.token}")),
+)
+
+_hooks_lock = threading.Lock()
+_hooks_users = 0
+_hooks_originals = []
+
+
+@contextmanager
+def _template_hooks():
+    """
+    Wraps template and block rendering while a profiled request is served.
+
+    The wrappers are installed by the first profiled request in progress and the original methods
+    are put back when the last one finishes, so unprofiled traffic renders unwrapped otherwise.
+    Other threads rendering meanwhile only pay for a context variable lookup per node.
+    """
+    global _hooks_users
+    with _hooks_lock:
+        if not _hooks_users:
+            for cls, name, label in TEMPLATE_HOOKS:
+                original = cls.__dict__[name]
+                _hooks_originals.append((cls, name, original))
+                setattr(cls, name, _profiled(original, label))
+        _hooks_users += 1
+    try:
+        yield
+    finally:
+        with _hooks_lock:
+            _hooks_users -= 1
+            if not _hooks_users:
+                for cls, name, original in _hooks_originals:
+                    setattr(cls, name, original)
+                _hooks_originals.clear()
+
+
+def _render_report(profile, elapsed):
+    rows = ''.join(
+        f'<tr><td>{escape(label)}</td><td>{calls}</td><td>{milliseconds:.1f}</td><td>{queries}</td></tr>'
+        for label, calls, milliseconds, queries in profile.report())
+    return (
+        '<div id="template-profile" style="position:fixed;bottom:0;right:0;max-height:50%;overflow:auto;'
+        'z-index:9999;background:#fff;border:1px solid #ccc;font:12px monospace;padding:8px">'
+        f'<strong>Request {elapsed * 1000:.1f} ms, {profile.view_queries} queries outside templates</strong>'
+        '<table><tr><th>Template or block</th><th>Calls</th><th>ms</th><th>Queries</th></tr>'
+        f'{rows}</table></div>'
+    )
+
+
+class TemplateProfilerMiddleware:
+    """
+    Reports per-template and per-block render times and lazily triggered queries to staff.
+
+    Profiling is requested with the ``profile_templates`` GET parameter and only honoured for
+    staff users. The report is added to the bottom of HTML pages.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if TEMPLATE_PROFILE_FLAG not in request.GET or not request.user.is_staff:
+            return self.get_response(request)
+
+        profile = TemplateProfile()
+        token = _template_profile.set(profile)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                stack.enter_context(_template_hooks())
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile.record_query))
+                response = self.get_response(request)
+                if hasattr(response, 'render') and callable(response.render):
+                    response.render()
+        finally:
+            _template_profile.reset(token)
+        elapsed = time.perf_counter() - started
+
+        if not response.streaming and response.get('Content-Type', '').startswith('text/html'):
+            content = response.content.decode(response.charset)
+            report = _render_report(profile, elapsed)
+            if '</body>' in content:
+                content = content.replace('</body>', report + '</body>', 1)
+            else:
+                content += report
+            response.content = content.encode(response.charset)
+            if response.has_header('Content-Length'):
+                response['Content-Length'] = str(len(response.content))
+        return response
+
+
+REQUEST_PROFILE_FLAG = 'profile'
+REQUEST_PROFILE_HEADER = 'X-Profile'
+REQUEST_PROFILE_SALT = 'appusers.request-profile'
+
+
+class StackSampler:
+    """
+    Samples the call stack of one thread at a fixed interval from a background thread.
+
+    Stacks are kept collapsed, root first and separated by semicolons, with the number of times
+    each was seen, which is the input format of flamegraph tools.
+
+    Attributes:
+        stacks (Counter): Collapsed stacks mapped to their sample counts.
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f'{frame.f_globals.get("__name__", "?")}:{code.co_name}')
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+
+def make_profile_token(user):
+    """
+    Issues a signed token that turns on request profiling when sent in the X-Profile header.
+
+    Args:
+        user (User): The staff member the token is issued to, recorded with each profile.
+
+    Returns:
+        str: The signed token.
+    """
+    return signing.dumps({'token': ProfileToken.objects.create(user=user).id}, salt=REQUEST_PROFILE_SALT)
+
+
+def revoke_profile_tokens(user):
+    """
+    Revokes every profile token issued to a staff member.
+
+    Args:
+        user (User): The staff member.
+
+    Returns:
+        int: The number of tokens revoked.
+    """
+    return ProfileToken.objects.filter(user=user, revoked_at__isnull=True).update(revoked_at=timezone.now())
+
+
+class RequestProfilerMiddleware:
+    """
+    Records a sampled call-stack profile and the SQL of selected requests.
+
+    A request is profiled when it carries an unrevoked X-Profile token from make_profile_token, when a
+    staff user adds the ``profile`` GET parameter, or at random at REQUEST_PROFILE_SAMPLE_RATE.
+    Each profile is written to REQUEST_PROFILE_DIR as a collapsed-stack ``.folded`` file with a
+    ``.sql`` file of the request's statements and their timings next to it, and its name is
+    returned in the X-Profile-Id header. Query parameters are left out, since they include
+    session keys, password hashes and personal details.
+
+    The middleware removes itself when REQUEST_PROFILER is off, so it costs nothing then.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_PROFILER', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'REQUEST_PROFILE_SAMPLE_RATE', 0)
+        self.interval = getattr(settings, 'REQUEST_PROFILE_INTERVAL', 0.005)
+        self.directory = getattr(settings, 'REQUEST_PROFILE_DIR', os.path.join(settings.BASE_DIR, 'profiles'))
+        self.token_max_age = getattr(settings, 'REQUEST_PROFILE_TOKEN_MAX_AGE', 24 * 60 * 60)
+
+    def _profiled_by(self, request):
+        token = request.headers.get(REQUEST_PROFILE_HEADER)
+        if token:
+            try:
+                token_id = signing.loads(token, salt=REQUEST_PROFILE_SALT, max_age=self.token_max_age)['token']
+            except (signing.BadSignature, KeyError, TypeError):
+                return None
+            # Checked on every use, so revoking the token or the staff status takes effect at once.
+            return ProfileToken.objects.filter(
+                id=token_id, revoked_at__isnull=True, user__is_active=True, user__is_staff=True,
+            ).values_list('user__username', flat=True).first()
+        if REQUEST_PROFILE_FLAG in request.GET and request.user.is_staff:
+            return request.user.get_username()
+        if self.sample_rate and random.random() < self.sample_rate:
+            return 'sampled'
+        return None
+
+    def __call__(self, request):
+        profiled_by = self._profiled_by(request)
+        if profiled_by is None:
+            return self.get_response(request)
+
+        queries = []
+
+        def record_query(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                queries.append((time.perf_counter() - started, sql))
+
+        sampler = StackSampler(threading.get_ident(), self.interval)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(record_query))
+                response = self.get_response(request)
+                if hasattr(response, 'render') and callable(response.render):
+                    response.render()
+        finally:
+            sampler.stop()
+        elapsed = time.perf_counter() - started
+
+        name = self._save(request, profiled_by, elapsed, sampler.stacks, queries)
+        response['X-Profile-Id'] = name
+        return response
+
+    def _save(self, request, profiled_by, elapsed, stacks, queries):
+        os.makedirs(self.directory, exist_ok=True)
+        slug = re.sub(r'[^A-Za-z0-9]+', '-', request.path).strip('-') or 'root'
+        name = f'{timezone.now():%Y%m%d-%H%M%S}-{slug}-{uuid.uuid4().hex[:8]}'
+        with open(os.path.join(self.directory, f'{name}.folded'), 'w') as folded:
+            for collapsed, count in stacks.most_common():
+                folded.write(f'{collapsed} {count}\n')
+        with open(os.path.join(self.directory, f'{name}.sql'), 'w') as sql:
+            sql.write(f'-- {request.method} {request.get_full_path()} by {profiled_by}\n')
+            sql.write(f'-- {elapsed * 1000:.1f} ms, {len(queries)} queries, '
+                      f'{sum(duration for duration, _ in queries) * 1000:.1f} ms in SQL\n')
+            for duration, statement in queries:
+                sql.write(f'-- {duration * 1000:.2f} ms\n{statement};\n')
+        return name
@@ -0,0 +1,45 @@
+from django.db import transaction
+from django.utils import timezone
+
+from .mail import build_email, queue_emails
+from .models import Availability
+
+
+def queue_session_reminders(day, chunk_size=500):
+    """
+    Queues a reminder email for every booked session on a day that has not been reminded yet.
+
+    Each chunk of sessions is rendered, queued with one bulk insert and marked reminded with
+    one update in the same transaction, so rerunning never queues a second reminder.
+
+    Args:
+        day (date): The date of the sessions to remind.
+        chunk_size (int): The number of sessions handled per transaction.
+
+    Returns:
+        list: The ids of the queued reminder emails.
+    """
+    pending = (Availability.objects
+               .filter(date=day, status='B', booked_by__isnull=False, reminder_sent_at__isnull=True)
+               .select_related('booked_by__user', 'tutor__user', 'course')
+               .order_by('id'))
+    queued = []
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            sessions = list(pending.filter(id__gt=last_id).select_for_update(of=('self',))[:chunk_size])
+            if not sessions:
+                break
+            emails = [build_email(session.booked_by.user.email, 'Session Reminder', 'emails/session_reminder_email.html', {
+                'user': session.booked_by.user,
+                'date': session.date,
+                'course': session.course,
+                'tutor': session.tutor,
+                'timeblock': session.get_timeblock_display(),
+            }) for session in sessions if session.booked_by.user.email]
+            queue_emails(emails)
+            queued.extend(email.id for email in emails)
+            Availability.objects.filter(id__in=[session.id for session in sessions]).update(
+                reminder_sent_at=timezone.now())
+            last_id = sessions[-1].id
+    return queued
@@ -0,0 +1,114 @@
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.db import transaction
+from django.utils import timezone
+
+from .caching import forget_count_gap
+from .models import Availability, JobWatermark, OutboundEmail, SlotEvent
+from .notifications import DIGEST_JOB
+from .rollups import ROLLUP_JOB, subtract_slots
+
+# Days each kind of row is kept; sessions are removed as soon as they expire.
+RETENTION_DAYS = getattr(settings, 'RETENTION_DAYS', {
+    'signups': 7,
+    'slots': 30,
+    'slot_events': 90,
+    'emails': 30,
+})
+# Jobs that read the slot event log after their watermark; events they haven't read are kept.
+EVENT_JOBS = (ROLLUP_JOB, DIGEST_JOB)
+
+
+def _sessions(now):
+    return Session.objects.filter(expire_date__lt=now)
+
+
+def _signups(now):
+    # Accounts created by the signup page that were never activated, and so never used.
+    return User.objects.filter(is_active=False, last_login__isnull=True, is_staff=False, is_superuser=False,
+                               date_joined__lt=now - timedelta(days=RETENTION_DAYS['signups']))
+
+
+def _slots(now):
+    # Only slots nobody booked or cancelled; cancelled ones stay in the session history and
+    # the cancellation counts.
+    return Availability.objects.filter(booked_by__isnull=True, status='A',
+                                       date__lt=date.today() - timedelta(days=RETENTION_DAYS['slots']))
+
+
+def _slot_events(now):
+    events = SlotEvent.objects.filter(created_at__lt=now - timedelta(days=RETENTION_DAYS['slot_events']))
+    watermarks = list(JobWatermark.objects.filter(name__in=EVENT_JOBS).values_list('last_id', flat=True))
+    if watermarks:
+        events = events.filter(id__lte=min(watermarks))
+    return events
+
+
+def _emails(now):
+    return OutboundEmail.objects.filter(sent_at__lt=now - timedelta(days=RETENTION_DAYS['emails']))
+
+
+POLICIES = {
+    'sessions': _sessions,
+    'signups': _signups,
+    'slots': _slots,
+    'slot_events': _slot_events,
+    'emails': _emails,
+}
+
+
+def _delete_batch(policy, rows):
+    if policy == 'slots':
+        # Deleted slots leave the per-course counts, which are otherwise only moved by slot events.
+        subtract_slots(Counter(rows.values_list('course_id', 'status')))
+    _, deleted = rows.delete()
+    return deleted.get(rows.model._meta.label, 0)
+
+
+def purge(policies=None, batch_size=500, pause=0.1, dry_run=False):
+    """
+    Deletes rows past their retention period, a small batch at a time.
+
+    Each batch is selected by primary key and deleted in its own short transaction, followed by
+    a pause, so other writers never wait long for SQLite's write lock. Rows are selected again
+    for every batch, so a purge can be stopped and rerun at any point.
+
+    Args:
+        policies (list): The POLICIES keys to apply; defaults to all of them.
+        batch_size (int): The number of rows deleted per transaction.
+        pause (float): The seconds to sleep between batches.
+        dry_run (bool): Only count the rows that would be deleted.
+
+    Returns:
+        dict: Policy names mapped to the number of rows deleted, or that would be deleted.
+    """
+    removed = {}
+    for policy in policies or POLICIES:
+        rows = POLICIES[policy](timezone.now())
+        if dry_run:
+            removed[policy] = rows.count()
+            continue
+        removed[policy] = 0
+        last_pk = None
+        while True:
+            batch = rows.order_by('pk')
+            if last_pk is not None:
+                batch = batch.filter(pk__gt=last_pk)
+            pks = list(batch.values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                break
+            with transaction.atomic():
+                # The policy's filter is applied again, in case a row changed since it was selected.
+                removed[policy] += _delete_batch(policy, rows.filter(pk__in=pks))
+            last_pk = pks[-1]
+            if pause:
+                time.sleep(pause)
+        if removed[policy]:
+            # The admin's row count estimates are corrected for deleted rows; recount them.
+            forget_count_gap(rows.model)
+    return removed
@@ -0,0 +1,134 @@
+"""
+Per-course slot status counts for the dashboard, kept in SlotStatusCount.
+
+The counts are moved incrementally by the SlotEvent log, so they only see changes that publish
+slot events. Slots edited in the admin, from a shell or by other bulk writes change without
+one, so the counts are also recomputed from Availability by rebuild_slot_rollups, which the
+update_slot_rollups command runs with --rebuild; schedule that nightly to reconcile them.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Sum
+
+from .models import Availability, JobWatermark, SlotEvent, SlotStatusCount
+
+ROLLUP_JOB = 'slot_rollups'
+BATCH_SIZE = 5000
+
+
+def _apply(deltas):
+    """Adds per (course, status) deltas to SlotStatusCount with one update per changed key."""
+    SlotStatusCount.objects.bulk_create(
+        [SlotStatusCount(course_id=course_id, status=status) for course_id, status in deltas],
+        ignore_conflicts=True)
+    for (course_id, status), delta in deltas.items():
+        if delta:
+            SlotStatusCount.objects.filter(course_id=course_id, status=status).update(count=F('count') + delta)
+
+
+def _seed(watermark):
+    # Counts Availability as it is now and moves the watermark past every event already in the log.
+    SlotStatusCount.objects.all().delete()
+    watermark.last_id = SlotEvent.objects.aggregate(last=Max('id'))['last'] or 0
+    SlotStatusCount.objects.bulk_create([
+        SlotStatusCount(course_id=row['course'], status=row['status'], count=row['count'])
+        for row in Availability.objects.order_by().values('course', 'status').annotate(count=Count('id'))
+    ])
+    watermark.save()
+
+
+def rebuild_slot_rollups():
+    """
+    Recomputes the per-course slot status counts from Availability with one aggregate.
+
+    Corrects the drift left by slot changes that published no slot event. Events already in the
+    log are considered counted, so update_slot_rollups carries on from the rebuilt counts.
+
+    Returns:
+        int: The number of (course, status) counts written.
+    """
+    with transaction.atomic():
+        watermark, _ = JobWatermark.objects.select_for_update().get_or_create(name=ROLLUP_JOB)
+        _seed(watermark)
+        return SlotStatusCount.objects.count()
+
+
+def update_slot_rollups():
+    """
+    Brings the per-course slot status counts up to date from the SlotEvent log.
+
+    The first run seeds the counts with one aggregate over Availability; later runs only read the
+    events after the job's watermark and apply their transitions, so the cost follows the number
+    of changes rather than the size of Availability.
+
+    Returns:
+        int: The number of events applied.
+    """
+    with transaction.atomic():
+        watermark, created = JobWatermark.objects.select_for_update().get_or_create(name=ROLLUP_JOB)
+        if created:
+            _seed(watermark)
+            return 0
+
+        applied = 0
+        while True:
+            events = list(SlotEvent.objects.filter(id__gt=watermark.last_id).order_by('id')
+                          .values_list('id', 'course_id', 'from_status', 'to_status')[:BATCH_SIZE])
+            if not events:
+                break
+            deltas = Counter()
+            for _, course_id, from_status, to_status in events:
+                if from_status:
+                    deltas[(course_id, from_status)] -= 1
+                if to_status:
+                    deltas[(course_id, to_status)] += 1
+            _apply(deltas)
+            applied += len(events)
+            watermark.last_id = events[-1][0]
+        watermark.save()
+    return applied
+
+
+def subtract_slots(counts):
+    """
+    Removes slots deleted without slot events from the per-course counts.
+
+    Nothing is done until update_slot_rollups has seeded the counts, since the seed aggregates
+    Availability as it then is.
+
+    Args:
+        counts (Counter): Numbers of deleted slots keyed by (course id, status).
+    """
+    if JobWatermark.objects.filter(name=ROLLUP_JOB).exists():
+        _apply({key: -count for key, count in counts.items()})
+
+
+def session_counts_by_course(include_cancelled=False, department=None, using='default'):
+    """
+    Returns the number of slots per course name from the rollup table.
+
+    Until update_slot_rollups has run for the first time the counts are aggregated from
+    Availability directly.
+
+    Args:
+        include_cancelled (bool): Whether to count cancelled slots.
+        department (Department): Only count this department's courses, if given.
+        using (str): The database alias to read from.
+
+    Returns:
+        dict: Course names mapped to slot counts.
+    """
+    if not JobWatermark.objects.using(using).filter(name=ROLLUP_JOB).exists():
+        slots = Availability.objects.using(using).for_department(department)
+        if not include_cancelled:
+            slots = slots.active()
+        return {row['course__c_name']: row['total'] for row in
+                slots.values('course__c_name').annotate(total=Count('id')).order_by('course__c_name')}
+    counts = SlotStatusCount.objects.using(using).filter(count__gt=0)
+    if department is not None:
+        counts = counts.filter(course__department=department)
+    if not include_cancelled:
+        counts = counts.exclude(status='C')
+    return {row['course__c_name']: row['total'] for row in
+            counts.values('course__c_name').annotate(total=Sum('count')).order_by('course__c_name')}
@@ -0,0 +1,218 @@
+import csv
+import io
+import json
+from itertools import islice
+
+from django.contrib.auth.models import Group, User
+from django.contrib.auth.tokens import default_token_generator
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from . import caching, search
+from .mail import build_email, queue_emails
+from .models import Course, Student, Tutor
+
+ROLES = ('student', 'tutor')
+ROSTER_FIELDS = ('username', 'email', 'first_name', 'last_name', 'role', 'ums_id', 'courses')
+
+
+class RosterResult:
+    """
+    Summary of a roster import.
+
+    Attributes:
+        rows (int): The number of rows read.
+        users_created (int): The number of new users.
+        profiles_created (int): The number of new Student and Tutor rows.
+        enrollments (int): The number of course enrollments requested.
+        emails_queued (int): The number of activation emails queued.
+        errors (list): (line number, message) tuples for the rejected rows.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.users_created = 0
+        self.profiles_created = 0
+        self.enrollments = 0
+        self.emails_queued = 0
+        self.errors = []
+
+
+def roster_format(filename):
+    """Returns the roster format of a file from its extension: 'jsonl', 'json' or 'csv'."""
+    if filename.endswith('.jsonl'):
+        return 'jsonl'
+    if filename.endswith('.json'):
+        return 'json'
+    return 'csv'
+
+
+def read_roster(fileobj, fmt='csv'):
+    """
+    Streams roster rows from a CSV file with a header row, a JSON Lines file or a JSON file
+    holding an array of rows.
+
+    A JSON file is parsed whole, so its rows are numbered by their position in the array.
+
+    Args:
+        fileobj: A text or binary file object.
+        fmt (str): 'csv', 'jsonl' or 'json'.
+
+    Yields:
+        tuple: (line number, row dictionary).
+
+    Raises:
+        ValueError: If the format is unknown, or a JSON file doesn't hold an array.
+    """
+    if isinstance(fileobj.read(0), bytes):
+        fileobj = io.TextIOWrapper(fileobj, encoding='utf-8-sig')
+    if fmt == 'csv':
+        reader = csv.DictReader(fileobj)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'jsonl':
+        for line_num, line in enumerate(fileobj, start=1):
+            if line.strip():
+                try:
+                    yield line_num, json.loads(line)
+                except ValueError:
+                    yield line_num, None
+    elif fmt == 'json':
+        try:
+            rows = json.load(fileobj)
+        except ValueError:
+            raise ValueError('The roster is not valid JSON.')
+        if not isinstance(rows, list):
+            raise ValueError('A JSON roster must hold an array of rows.')
+        yield from enumerate(rows, start=1)
+    else:
+        raise ValueError(f'Unsupported roster format: {fmt}')
+
+
+def _clean_row(row, course_ids, seen):
+    """Validates and normalizes one roster row, raising ValidationError when it is unusable."""
+    if not isinstance(row, dict):
+        raise ValidationError('Row is not a valid record.')
+    row = {field: str(row.get(field) or '').strip() for field in ROSTER_FIELDS}
+    if not row['username']:
+        raise ValidationError('Username is required.')
+    if row['username'] in seen:
+        raise ValidationError(f"Username {row['username']} appears more than once.")
+    row['role'] = row['role'].lower()
+    if row['role'] not in ROLES:
+        raise ValidationError(f"Role must be one of {', '.join(ROLES)}.")
+    validate_email(row['email'])
+    codes = [code.strip() for code in row['courses'].replace(',', ';').split(';') if code.strip()]
+    unknown = [code for code in codes if code not in course_ids]
+    if unknown:
+        raise ValidationError(f"Unknown course code(s): {', '.join(unknown)}.")
+    row['course_ids'] = [course_ids[code] for code in codes]
+    seen.add(row['username'])
+    return row
+
+
+def _activation_email(user, domain):
+    return build_email(user.email, 'Activate your account', 'emails/roster_activation_email.html', {
+        'user': user,
+        'domain': domain,
+        'uid': urlsafe_base64_encode(force_bytes(user.pk)),
+        'token': default_token_generator.make_token(user),
+    })
+
+
+def _import_chunk(rows, groups, domain, send_activation, result):
+    usernames = [row['username'] for row in rows]
+    existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+
+    new_users = []
+    for row in rows:
+        if row['username'] not in existing:
+            user = User(username=row['username'], email=row['email'],
+                        first_name=row['first_name'], last_name=row['last_name'])
+            # Imported users choose their password from the activation link; no hashing here.
+            user.set_unusable_password()
+            new_users.append(user)
+    User.objects.bulk_create(new_users)
+    result.users_created += len(new_users)
+
+    users = {user.username: user for user in User.objects.filter(username__in=usernames)}
+    user_ids = [user.id for user in users.values()]
+
+    User.groups.through.objects.bulk_create(
+        [User.groups.through(user_id=users[row['username']].id, group_id=groups[row['role']].id) for row in rows],
+        ignore_conflicts=True)
+
+    for role, model in (('student', Student), ('tutor', Tutor)):
+        role_rows = [row for row in rows if row['role'] == role]
+        if not role_rows:
+            continue
+        have_profile = set(model.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True))
+        profiles = []
+        for row in role_rows:
+            user_id = users[row['username']].id
+            if user_id not in have_profile:
+                profile = model(user_id=user_id)
+                if role == 'student':
+                    profile.ums_id = row['ums_id'] or None
+                profiles.append(profile)
+        model.objects.bulk_create(profiles)
+        result.profiles_created += len(profiles)
+
+        profile_ids = dict(model.objects.filter(user_id__in=user_ids).values_list('user_id', 'id'))
+        through = model.courses.through
+        owner_field = f'{role}_id'
+        enrollments = [through(**{owner_field: profile_ids[users[row['username']].id], 'course_id': course_id})
+                       for row in role_rows for course_id in row['course_ids']]
+        through.objects.bulk_create(enrollments, ignore_conflicts=True)
+        result.enrollments += len(enrollments)
+
+    if send_activation and new_users:
+        created = [users[user.username] for user in new_users]
+        result.emails_queued += queue_emails([_activation_email(user, domain) for user in created])
+
+
+def import_roster(rows, domain, chunk_size=1000, send_activation=True):
+    """
+    Imports students, tutors and their course enrollments from roster rows.
+
+    Rows are validated and written chunk by chunk, each chunk in its own transaction, with bulk
+    inserts for users, group memberships, Student and Tutor rows and enrollment through-rows.
+    Existing users keep their account and gain the role and enrollments; rejected rows are
+    reported and skipped. Activation emails for new users are queued, not sent.
+
+    Args:
+        rows (iterable): (line number, row dictionary) tuples, as yielded by read_roster.
+        domain (str): The host used in activation links.
+        chunk_size (int): The number of rows validated and written together.
+        send_activation (bool): Whether to queue activation emails for new users.
+
+    Returns:
+        RosterResult: What was imported and what was rejected.
+    """
+    result = RosterResult()
+    course_ids = dict(Course.objects.values_list('c_code', 'id'))
+    groups = {role: Group.objects.get_or_create(name=role)[0] for role in ROLES}
+    seen = set()
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        result.rows += len(chunk)
+        valid = []
+        for line_num, row in chunk:
+            try:
+                valid.append(_clean_row(row, course_ids, seen))
+            except ValidationError as error:
+                result.errors.append((line_num, ' '.join(error.messages)))
+        if valid:
+            with transaction.atomic():
+                _import_chunk(valid, groups, domain, send_activation, result)
+
+    # Bulk inserts bypass the signals that keep these up to date.
+    caching.bump_version('course_tutor_map')
+    search.invalidate_index()
+    return result
@@ -0,0 +1,284 @@
+import bisect
+import heapq
+import re
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Q
+
+from .models import Course, Tutor
+
+# Seconds after which the index is rebuilt from the database, so changes saved by other worker
+# processes (which only update their own in-process index) are eventually picked up.
+INDEX_MAX_AGE = getattr(settings, 'TYPEAHEAD_INDEX_MAX_AGE', 300)
+# Courses returned per page by the profile course picker.
+COURSE_PAGE_SIZE = 20
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+
+def _words(text):
+    return _WORD_RE.findall((text or '').lower())
+
+
+def _word_grams(word, closed=True):
+    """
+    Returns the trigrams of a word padded with two leading blanks, so that one and two character
+    prefixes are grams too. Query words are left open at the end so they match as prefixes.
+    """
+    padded = '  ' + word + (' ' if closed else '')
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """
+    In-memory trigram index answering word-prefix queries over short labels.
+
+    Each document is a key, a label and one or more searchable texts. A query matches a document
+    when every query word is a prefix of some word of the document.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = defaultdict(set)
+        self._documents = {}
+        # (lowercased label, key) pairs kept sorted, so broad queries can walk documents in result
+        # order and stop early instead of ranking every candidate.
+        self._order = []
+
+    def __len__(self):
+        return len(self._documents)
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._documents.clear()
+            self._order.clear()
+
+    def add(self, key, label, *texts):
+        """
+        Adds or replaces a document.
+
+        Args:
+            key (hashable): The document key.
+            label (str): The text returned for the document.
+            *texts (str): The texts to index.
+        """
+        words = set()
+        for text in (label,) + texts:
+            words.update(_words(text))
+        with self._lock:
+            self._remove(key)
+            self._documents[key] = (label, label.lower(), words)
+            bisect.insort(self._order, (label.lower(), key))
+            for word in words:
+                for gram in _word_grams(word):
+                    self._postings[gram].add(key)
+
+    def remove(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key):
+        document = self._documents.pop(key, None)
+        if document is None:
+            return
+        position = bisect.bisect_left(self._order, (document[1], key))
+        if position < len(self._order) and self._order[position][1] == key:
+            del self._order[position]
+        for word in document[2]:
+            for gram in _word_grams(word):
+                keys = self._postings.get(gram)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._postings[gram]
+
+    def search(self, query, limit=10, kind=None, allowed=None):
+        """
+        Returns the documents matching a query, best matches first.
+
+        Args:
+            query (str): The text typed by the user.
+            limit (int): The maximum number of results.
+            kind (str): Only return documents whose key starts with this kind, if given.
+            allowed (set): Only return documents with these keys, if given.
+
+        Returns:
+            list: (key, label) tuples.
+        """
+        query_words = _words(query)
+        if not query_words:
+            return []
+        with self._lock:
+            postings = []
+            for gram in {g for w in query_words for g in _word_grams(w, closed=False)}:
+                keys = self._postings.get(gram)
+                if not keys:
+                    return []
+                postings.append(keys)
+            # Candidates come from the smallest posting set; the others are only probed, so broad
+            # queries never copy or intersect large sets.
+            postings.sort(key=len)
+            candidates, others = postings[0], postings[1:]
+            # Grams of a word up to two characters long only occur at word starts, so such a
+            # query is already exact; longer words need checking against the document words.
+            verify = len(query_words) > 1 or len(query_words[0]) > 2
+
+            def accept(key):
+                if kind is not None and key[0] != kind:
+                    return False
+                if allowed is not None and key not in allowed:
+                    return False
+                if key not in candidates or not all(key in keys for keys in others):
+                    return False
+                return not verify or all(any(word.startswith(q) for word in self._documents[key][2])
+                                         for q in query_words)
+
+            first = query_words[0]
+            if limit * len(self._order) < len(candidates) ** 2:
+                return self._walk(first, limit, accept)
+            matches = []
+            for key in candidates:
+                if accept(key):
+                    label, label_lower, _ = self._documents[key]
+                    matches.append((not label_lower.startswith(first), label_lower, key, label))
+        return [(key, label) for _, _, key, label in heapq.nsmallest(limit, matches)]
+
+    def _walk(self, first, limit, accept):
+        """
+        Collects results by walking documents in label order: labels starting with the first query
+        word come first, then the rest. Used when candidates are dense enough to fill the limit
+        quickly.
+        """
+        start = bisect.bisect_left(self._order, (first,))
+        end = bisect.bisect_left(self._order, (first + '\uffff',))
+        results = []
+        for position in range(start, end):
+            if len(results) == limit:
+                break
+            key = self._order[position][1]
+            if accept(key):
+                results.append((key, self._documents[key][0]))
+        for position in range(len(self._order)):
+            if len(results) == limit:
+                break
+            if start <= position < end:
+                continue
+            key = self._order[position][1]
+            if accept(key):
+                results.append((key, self._documents[key][0]))
+        return results
+
+
+_index = TrigramIndex()
+_built_at = None
+_build_lock = threading.Lock()
+
+
+def _index_course(course):
+    _index.add(('course', course.id), course.c_name, course.c_code)
+
+
+def _index_tutor(tutor):
+    user = tutor.user
+    _index.add(('tutor', tutor.id), user.username, user.first_name, user.last_name)
+
+
+def rebuild_index():
+    """Rebuilds the typeahead index from the database with one query per model."""
+    global _built_at
+    with _build_lock:
+        _index.clear()
+        for course in Course.objects.only('id', 'c_name', 'c_code'):
+            _index_course(course)
+        for tutor in Tutor.objects.select_related('user').only(
+                'id', 'user__username', 'user__first_name', 'user__last_name'):
+            _index_tutor(tutor)
+        _built_at = time.monotonic()
+
+
+def get_index():
+    """Returns the typeahead index, building it on first use and after INDEX_MAX_AGE seconds."""
+    if _built_at is None or time.monotonic() - _built_at > INDEX_MAX_AGE:
+        rebuild_index()
+    return _index
+
+
+def invalidate_index():
+    """Forces a rebuild on next use, for changes made without signals such as bulk inserts."""
+    global _built_at
+    _built_at = None
+
+
+def search(query, kind=None, limit=10, tutor_ids=None):
+    """
+    Searches courses and tutors.
+
+    Args:
+        query (str): The text typed by the user.
+        kind (str): 'course' or 'tutor' to restrict the results, if given.
+        limit (int): The maximum number of results.
+        tutor_ids (list): Only return these tutors (and no courses), if given.
+
+    Returns:
+        list: Result dictionaries with type, id and label.
+    """
+    allowed = None if tutor_ids is None else {('tutor', tutor_id) for tutor_id in tutor_ids}
+    return [{'type': key[0], 'id': key[1], 'label': label}
+            for key, label in get_index().search(query, limit=limit, kind=kind, allowed=allowed)]
+
+
+def course_page(query='', after=None, limit=COURSE_PAGE_SIZE):
+    """
+    Returns one page of the courses whose name or code contains every word of a query.
+
+    Pages are ordered by the unique course code and continue after the last code of the previous
+    page, so each page is one indexed range scan however deep the user scrolls.
+
+    Args:
+        query (str): The text typed by the user; every course matches an empty query.
+        after (str): The code of the last course of the previous page, if any.
+        limit (int): The number of courses per page.
+
+    Returns:
+        tuple: The (id, code, name) tuples of the page, and the code to continue after, or None
+        on the last page.
+    """
+    courses = Course.objects.order_by('c_code')
+    for word in _words(query):
+        courses = courses.filter(Q(c_name__icontains=word) | Q(c_code__icontains=word))
+    if after:
+        courses = courses.filter(c_code__gt=after)
+    page = list(courses.values_list('id', 'c_code', 'c_name')[:limit + 1])
+    return page[:limit], page[limit - 1][1] if len(page) > limit else None
+
+
+def course_saved(sender, instance, **kwargs):
+    if _built_at is not None:
+        _index_course(instance)
+
+
+def course_deleted(sender, instance, **kwargs):
+    _index.remove(('course', instance.id))
+
+
+def tutor_saved(sender, instance, **kwargs):
+    if _built_at is not None:
+        _index_tutor(instance)
+
+
+def tutor_deleted(sender, instance, **kwargs):
+    _index.remove(('tutor', instance.id))
+
+
+def user_saved(sender, instance, update_fields=None, **kwargs):
+    # Logins save last_login only; skip the tutor lookup unless a name may have changed.
+    if _built_at is None or (update_fields and not {'username', 'first_name', 'last_name'} & set(update_fields)):
+        return
+    tutor = Tutor.objects.filter(user=instance).first()
+    if tutor is not None:
+        tutor.user = instance
+        _index_tutor(tutor)
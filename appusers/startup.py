@@ -0,0 +1,106 @@
+# Measures the cold start of a worker process for the profile_startup command, which runs this
+# module in a fresh interpreter started with -X importtime so nothing is imported beforehand.
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+
+def _module_times(profile, modules):
+    """
+    Sums a profile's own time per module.
+
+    Args:
+        profile (cProfile.Profile): The profile of one request.
+        modules (dict): Source file paths mapped to module names.
+
+    Returns:
+        list: (module, seconds) pairs, slowest first.
+    """
+    import pstats
+
+    totals = Counter()
+    for (filename, _, _), (_, _, own_time, _, _) in pstats.Stats(profile).stats.items():
+        totals[modules.get(filename, '(builtins)' if filename == '~' else filename)] += own_time
+    return totals.most_common()
+
+
+def _request(application, path, cookies):
+    from wsgiref.util import setup_testing_defaults
+
+    environ = {'PATH_INFO': path, 'HTTP_HOST': 'localhost', 'HTTP_COOKIE': cookies}
+    setup_testing_defaults(environ)
+    status = []
+    started = time.perf_counter()
+    response = application(environ, lambda code, headers, exc_info=None: status.append(int(code[:3])))
+    for _ in response:
+        pass
+    response.close()
+    return status[0], time.perf_counter() - started
+
+
+def main(options):
+    """
+    Boots the project as a WSGI worker would, then requests each path twice.
+
+    Args:
+        options (dict): 'paths' to request, the session 'cookies' to send and 'warmup', whether
+            the worker warm-up runs.
+
+    Returns:
+        dict: The boot and warm-up timings and, per path, the first and second request times,
+        the modules the first request imported and its own time per module. The first request
+        runs under cProfile, so its time includes the profiler's overhead.
+    """
+    started = time.perf_counter()
+    import django
+    from django.conf import settings
+
+    django.setup()
+    setup = time.perf_counter() - started
+
+    # The WSGI module warms up by itself; it is run here instead to time each step.
+    settings.WORKER_WARMUP = False
+    started = time.perf_counter()
+    from django.core.servers.basehttp import get_internal_wsgi_application
+
+    application = get_internal_wsgi_application()
+    boot = time.perf_counter() - started
+    warmup = {}
+    if options['warmup']:
+        from appusers.warmup import warm_up
+
+        warmup = warm_up()
+
+    # Imported only now, so the profiler isn't counted in the import times.
+    import cProfile
+
+    requests = []
+    for path in options['paths']:
+        imported = set(sys.modules)
+        profile = cProfile.Profile()
+        profile.enable()
+        status, first = _request(application, path, options['cookies'])
+        profile.disable()
+        imported = sorted(set(sys.modules) - imported)
+        _, second = _request(application, path, options['cookies'])
+        modules = {}
+        for name, module in list(sys.modules.items()):
+            if getattr(module, '__file__', None):
+                modules[module.__file__] = modules[os.path.abspath(module.__file__)] = name
+        requests.append({
+            'path': path,
+            'status': status,
+            'first': first,
+            'second': second,
+            'imported': imported,
+            'modules': _module_times(profile, modules),
+        })
+    return {'setup': setup, 'boot': boot, 'warmup': warmup, 'requests': requests}
+
+
+if __name__ == '__main__':
+    result = main(json.loads(sys.argv[1]))
+    # Import times go to stderr, so the result is the only thing on stdout.
+    sys.stdout.write(json.dumps(result))
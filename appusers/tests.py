@@ -1,3 +1,1021 @@
-from django.test import TestCase
+import gzip
+import tempfile
+from datetime import date, time, timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import Group, User
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.template.loader import get_template
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import parse_http_date
+
+from . import events, profiling, search, throttling, views, warmup
+from .attendance import mark_attended, mark_no_shows, process_no_shows
+from .caching import get_dashboard_stats
+from .calendar_feed import feed_token
+from .checks import check_shared_cache
+from .events import publish_slot_event
+from .forms import AvailabilityForm
+from .intervals import IntervalIndex, find_overlap
+from .middleware import COMPRESSION_MIN_SIZE, CompressionMiddleware
+from .models import Availability, Course, Department, OutboundEmail, SemesterDates, SlotEvent, Student, Tutor
+from .retention import purge
+from .uploads import PROFILE_PICTURE_MAX_SIZE
+from .roster import import_roster, read_roster
+from .template_loaders import minify_html
+
+
+class TypeaheadQueryCountTests(TestCase):
+    """
+    The tutor typeahead answers from the in-memory index and the cached course-tutor mapping, so
+    its queries don't grow with the number of tutors of a course.
+    """
+
+    def setUp(self):
+        cache.clear()
+        search.invalidate_index()
+        self.course = Course.objects.create(c_name='Calculus', c_code='MATH140')
+        self.user = User.objects.create_user('student', password='password')
+        self.client.force_login(self.user)
+
+    def add_tutors(self, count):
+        for number in range(Tutor.objects.count(), Tutor.objects.count() + count):
+            tutor = Tutor.objects.create(user=User.objects.create_user(f'tutor{number}'))
+            tutor.courses.add(self.course)
+
+    def get_typeahead(self, **params):
+        response = self.client.get(reverse('typeahead'), {'q': 'tutor', 'type': 'tutor', **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def cold_queries(self, **params):
+        cache.clear()
+        search.invalidate_index()
+        with CaptureQueriesContext(connection) as queries:
+            results = self.get_typeahead(**params)
+        return len(queries), len(results)
+
+    def test_course_filter_queries_do_not_grow_with_tutors(self):
+        self.add_tutors(3)
+        few = self.cold_queries(course=self.course.id, limit=50)
+        self.add_tutors(27)
+        self.assertEqual(self.cold_queries(course=self.course.id, limit=50), (few[0], 30))
+        # Once built, the session, the user and the mapping's version and value from the cache.
+        with self.assertNumQueries(4):
+            self.get_typeahead(course=self.course.id, limit=50)
+
+    def test_without_course_filter(self):
+        self.add_tutors(3)
+        few = self.cold_queries(limit=50)
+        self.add_tutors(27)
+        self.assertEqual(self.cold_queries(limit=50), (few[0], 30))
+        # The index is in process memory, so only the session and the user are read.
+        with self.assertNumQueries(2):
+            self.get_typeahead(limit=50)
+
+    def test_mapping_follows_course_changes(self):
+        self.add_tutors(2)
+        self.assertEqual(len(self.get_typeahead(course=self.course.id)), 2)
+        Tutor.objects.first().courses.remove(self.course)
+        self.assertEqual(len(self.get_typeahead(course=self.course.id)), 1)
+
+
+class SessionReminderTests(TestCase):
+    """
+    The reminder job sends one email per booked session tomorrow, through the locmem backend the
+    test runner sets up, and never reminds a session twice.
+    """
+    SESSIONS = 10000
+    STUDENTS = 100
+
+    @classmethod
+    def setUpTestData(cls):
+        course = Course.objects.create(c_name='Calculus', c_code='MATH140')
+        tutor = Tutor.objects.create(user=User.objects.create_user('tutor'))
+        User.objects.bulk_create([User(username=f'student{number}', email=f'student{number}@example.com')
+                                  for number in range(cls.STUDENTS)])
+        Student.objects.bulk_create([Student(user=user)
+                                     for user in User.objects.filter(username__startswith='student')])
+        students = list(Student.objects.all())
+        tomorrow = date.today() + timedelta(days=1)
+        sessions = [Availability(tutor=tutor, booked_by=students[number % cls.STUDENTS], course=course,
+                                 status='B', date=tomorrow, start_time=time(8 + number % 9, 0),
+                                 end_time=time(9 + number % 9, 0)) for number in range(cls.SESSIONS)]
+        # Sessions that get no reminder: open, cancelled, or another day.
+        sessions += [Availability(tutor=tutor, course=course, status='A', date=tomorrow,
+                                  start_time=time(8), end_time=time(9)),
+                     Availability(tutor=tutor, booked_by=students[0], course=course, status='C', date=tomorrow,
+                                  start_time=time(8), end_time=time(9)),
+                     Availability(tutor=tutor, booked_by=students[0], course=course, status='B',
+                                  date=tomorrow + timedelta(days=1), start_time=time(8), end_time=time(9))]
+        Availability.objects.bulk_create(sessions)
+
+    def test_reminders_are_sent_once(self):
+        other = OutboundEmail.objects.create(to_email='student0@example.com', subject='Session Booked', body='')
+        call_command('send_session_reminders', '--rate', '0', '--batch-size', '500', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), self.SESSIONS)
+        self.assertEqual({message.subject for message in mail.outbox}, {'Session Reminder'})
+        # Only the reminders are sent; other queued emails are left to send_queued_emails.
+        self.assertEqual(list(OutboundEmail.objects.filter(sent_at__isnull=True)), [other])
+        self.assertEqual(Availability.objects.filter(reminder_sent_at__isnull=False).count(), self.SESSIONS)
+
+        call_command('send_session_reminders', '--rate', '0', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), self.SESSIONS)
+
+
+class NoShowTests(TestCase):
+    """
+    Attendance changes to sessions the no-show job has already processed correct the students'
+    no-show counts, so they match what the job would have counted.
+    """
+
+    def setUp(self):
+        course = Course.objects.create(c_name='Calculus', c_code='MATH140')
+        self.tutor = Tutor.objects.create(user=User.objects.create_user('tutor'))
+        self.student = Student.objects.create(user=User.objects.create_user('student'))
+        self.today = date.today()
+        self.sessions = [Availability.objects.create(
+            tutor=self.tutor, booked_by=self.student, course=course, status='B',
+            date=self.today - timedelta(days=days), start_time=time(10), end_time=time(11)).id
+            for days in (10, 9)]
+
+    def no_shows(self):
+        self.student.refresh_from_db()
+        return self.student.no_shows
+
+    def test_job_counts_missed_sessions_once(self):
+        process_no_shows(self.today - timedelta(days=2), since=self.today - timedelta(days=30))
+        self.assertEqual(self.no_shows(), 2)
+        process_no_shows(self.today - timedelta(days=2))
+        self.assertEqual(self.no_shows(), 2)
+
+    def test_late_confirmation_and_undo_correct_the_count(self):
+        process_no_shows(self.today - timedelta(days=2), since=self.today - timedelta(days=30))
+        self.assertEqual(mark_attended(self.sessions, tutor=self.tutor), 2)
+        self.assertEqual(self.no_shows(), 0)
+        # Marking again changes nothing, so the count doesn't move either.
+        mark_attended(self.sessions, tutor=self.tutor)
+        self.assertEqual(self.no_shows(), 0)
+        mark_no_shows(self.sessions[:1], tutor=self.tutor)
+        self.assertEqual(self.no_shows(), 1)
+        mark_no_shows(self.sessions[:1], tutor=self.tutor)
+        self.assertEqual(self.no_shows(), 1)
+
+    def test_sessions_after_the_watermark_are_left_to_the_job(self):
+        mark_attended(self.sessions[:1])
+        self.assertEqual(self.no_shows(), 0)
+        process_no_shows(self.today - timedelta(days=2), since=self.today - timedelta(days=30))
+        self.assertEqual(self.no_shows(), 1)
+
+    def test_undo_through_the_view(self):
+        process_no_shows(self.today - timedelta(days=2), since=self.today - timedelta(days=30))
+        self.client.force_login(self.tutor.user)
+        response = self.client.post(reverse('mark_attendance'), {'session_ids': self.sessions})
+        self.assertEqual(response.json()['updated'], 2)
+        self.assertEqual(self.no_shows(), 0)
+        self.client.post(reverse('mark_attendance'), {'session_ids': self.sessions, 'attended': 'false'})
+        self.assertEqual(self.no_shows(), 2)
+
+
+class CalendarFeedTests(TestCase):
+    """
+    The feed's bytes and validators only change when the sessions do, so calendar apps polling it
+    get a 304 even after the cached feed expired.
+    """
+
+    def setUp(self):
+        course = Course.objects.create(c_name='Calculus', c_code='MATH140')
+        self.tutor = Tutor.objects.create(user=User.objects.create_user('tutor'))
+        self.session = Availability.objects.create(tutor=self.tutor, course=course, status='A',
+                                                   date=date.today(), start_time=time(10), end_time=time(11))
+        publish_slot_event('created', self.session)
+        self.url = reverse('calendar_feed', args=[feed_token(self.tutor.user)])
+
+    def test_validators_survive_a_rebuild(self):
+        first = self.client.get(self.url)
+        cache.clear()
+        second = self.client.get(self.url)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertEqual(first['Last-Modified'], second['Last-Modified'])
+        cache.clear()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+    def test_validators_change_with_the_sessions(self):
+        first = self.client.get(self.url)
+        self.session.status = 'C'
+        self.session.save()
+        publish_slot_event('cancelled', self.session, 'A')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'STATUS:CANCELLED', response.content)
+
+    def test_last_modified_moves_on_when_a_student_cancels(self):
+        student = Student.objects.create(user=User.objects.create_user('student'))
+        self.session.status, self.session.booked_by = 'B', student
+        self.session.save()
+        publish_slot_event('booked', self.session, 'A')
+        SlotEvent.objects.update(created_at=timezone.now() - timedelta(hours=1))
+        url = reverse('calendar_feed', args=[feed_token(student.user)])
+        booked = self.client.get(url)
+
+        self.client.force_login(student.user)
+        self.client.post(reverse('cancel_session'), {'session_id': self.session.id})
+        cancelled = self.client.get(url, HTTP_IF_MODIFIED_SINCE=booked['Last-Modified'])
+        self.assertEqual(cancelled.status_code, 200)
+        self.assertGreater(parse_http_date(cancelled['Last-Modified']), parse_http_date(booked['Last-Modified']))
+
+
+class ApiTests(TestCase):
+    """
+    The API gives away who booked a slot only to its tutor, the booking student and superusers,
+    and applies the same booking rules as the site.
+    """
+
+    def setUp(self):
+        course = Course.objects.create(c_name='Calculus', c_code='MATH140')
+        self.tutor = Tutor.objects.create(user=User.objects.create_user('tutor'))
+        self.student = Student.objects.create(user=User.objects.create_user('student'))
+        self.other = Student.objects.create(user=User.objects.create_user('other'))
+        for student in (self.student, self.other):
+            student.courses.add(course)
+        tomorrow = date.today() + timedelta(days=1)
+        self.booked = Availability.objects.create(tutor=self.tutor, booked_by=self.student, course=course,
+                                                  status='B', date=tomorrow, start_time=time(10), end_time=time(11))
+        self.open = Availability.objects.create(tutor=self.tutor, course=course, status='A', date=tomorrow,
+                                                start_time=time(12), end_time=time(13))
+
+    def booked_by(self, user):
+        self.client.force_login(user)
+        response = self.client.get(reverse('api_slots'), {'fields': 'id,booked_by,booked_by_id'})
+        return {slot['id']: slot['booked_by'] for slot in response.json()['slots']}
+
+    def test_booked_by_is_shown_only_to_owners(self):
+        self.assertEqual(self.booked_by(self.tutor.user)[self.booked.id], 'student')
+        self.assertEqual(self.booked_by(self.student.user)[self.booked.id], 'student')
+        self.assertIsNone(self.booked_by(self.other.user)[self.booked.id])
+        self.assertIsNone(self.booked_by(User.objects.create_user('staff', is_staff=True))[self.booked.id])
+        self.assertEqual(self.booked_by(User.objects.create_superuser('admin'))[self.booked.id], 'student')
+
+    def test_students_with_no_shows_cannot_book(self):
+        Student.objects.filter(id=self.other.id).update(no_shows=3)
+        self.client.force_login(self.other.user)
+        response = self.client.post(reverse('api_batch'), {'operations': [{'op': 'book', 'slot': self.open.id}]},
+                                    content_type='application/json')
+        self.assertEqual(response.json()['applied'], 0)
+        self.assertIn('no-shows', response.json()['results'][0]['error'])
+        self.open.refresh_from_db()
+        self.assertEqual(self.open.status, 'A')
+
+
+class RetentionTests(TestCase):
+    """The purge deletes past slots nobody booked, but keeps the cancelled ones in the history."""
+
+    def test_cancelled_slots_are_kept(self):
+        course = Course.objects.create(c_name='Calculus', c_code='MATH140')
+        tutor = Tutor.objects.create(user=User.objects.create_user('tutor'))
+        past = date.today() - timedelta(days=60)
+        for status in ('A', 'C'):
+            Availability.objects.create(tutor=tutor, course=course, status=status, date=past,
+                                        start_time=time(10), end_time=time(11))
+        self.assertEqual(purge(['slots'], pause=0), {'slots': 1})
+        self.assertEqual(list(Availability.objects.values_list('status', flat=True)), ['C'])
+
+
+class SlotEventStreamTests(TestCase):
+    """
+    Slot changes are streamed to the available slots page, and a process holds only a few streams
+    open at a time.
+    """
+
+    def setUp(self):
+        course = Course.objects.create(c_name='Calculus', c_code='MATH140')
+        tutor = Tutor.objects.create(user=User.objects.create_user('tutor'))
+        self.slot = Availability.objects.create(tutor=tutor, course=course, status='A',
+                                                date=date.today(), start_time=time(10), end_time=time(11))
+
+    def test_events_are_streamed_in_scope(self):
+        event = publish_slot_event('created', self.slot)
+        stream = events.slot_event_stream(course_ids=[self.slot.course_id], last_event_id=0)
+        self.assertEqual(next(stream), f'retry: {events.RETRY_MS}\n\n')
+        self.assertEqual(next(stream), events.format_event(event))
+        stream.close()
+
+    def test_streams_over_the_limit_are_sent_away(self):
+        streams = [events.slot_event_stream(last_event_id=0) for _ in range(events.MAX_STREAMS)]
+        for stream in streams:
+            next(stream)
+        busy = events.slot_event_stream(last_event_id=0)
+        self.assertEqual(list(busy), [f'retry: {events.BUSY_RETRY_MS}\n\n'])
+        streams.pop().close()
+        stream = events.slot_event_stream(last_event_id=0)
+        self.assertEqual(next(stream), f'retry: {events.RETRY_MS}\n\n')
+        for stream in streams + [stream]:
+            stream.close()
+
+
+class TrigramIndexTests(SimpleTestCase):
+    """The typeahead index matches every query word as a word prefix, labels starting with it first."""
+
+    def setUp(self):
+        self.index = search.TrigramIndex()
+        self.index.add(('course', 1), 'Calculus I', 'MATH140')
+        self.index.add(('course', 2), 'Applied Calculus', 'MATH135')
+        self.index.add(('course', 3), 'Linear Algebra', 'MATH260')
+        self.index.add(('tutor', 1), 'calvin', 'Calvin', 'Harris')
+
+    def labels(self, query, **kwargs):
+        return [label for _, label in self.index.search(query, **kwargs)]
+
+    def test_prefix_matching(self):
+        self.assertEqual(self.labels('calc'), ['Calculus I', 'Applied Calculus'])
+        self.assertEqual(self.labels('ca'), ['Calculus I', 'calvin', 'Applied Calculus'])
+        self.assertEqual(self.labels('math2'), ['Linear Algebra'])
+        # Every word must match, and only at word starts.
+        self.assertEqual(self.labels('calc app'), ['Applied Calculus'])
+        self.assertEqual(self.labels('alculus'), [])
+        self.assertEqual(self.labels(''), [])
+
+    def test_filters_and_limit(self):
+        self.assertEqual(self.labels('ca', kind='tutor'), ['calvin'])
+        self.assertEqual(self.labels('calc', allowed={('course', 2)}), ['Applied Calculus'])
+        self.assertEqual(len(self.labels('math', limit=2)), 2)
+
+    def test_replace_and_remove(self):
+        self.index.add(('course', 1), 'Differential Calculus', 'MATH140')
+        self.assertEqual(self.labels('calculus i'), [])
+        self.assertEqual(self.labels('diff'), ['Differential Calculus'])
+        self.index.remove(('course', 1))
+        self.assertEqual(self.labels('math14'), [])
+        self.assertEqual(len(self.index), 3)
+
+    def test_dense_queries_walk_in_label_order(self):
+        index = search.TrigramIndex()
+        for number in range(200):
+            index.add(('tutor', number), f'tutor{number:03}')
+        index.add(('course', 1), 'Tutoring Practicum')
+        results = [label for _, label in index.search('tutor', limit=3)]
+        self.assertEqual(results, ['tutor000', 'tutor001', 'tutor002'])
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    """Cache versions and login counters only hold across workers with a shared default cache."""
+
+    def test_configured_cache_is_shared(self):
+        self.assertEqual(check_shared_cache(None), [])
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_per_process_cache_is_rejected(self):
+        with self.settings(DEBUG=False):
+            self.assertEqual([error.id for error in check_shared_cache(None)], ['appusers.E001'])
+        with self.settings(DEBUG=True):
+            self.assertEqual([error.id for error in check_shared_cache(None)], ['appusers.W001'])
+
+
+class RosterImportTests(TestCase):
+    """
+    Rosters are validated and written in chunks with bulk inserts, and rerunning one changes
+    nothing for the users it already created.
+    """
+    ROSTER = (
+        'username,email,first_name,last_name,role,ums_id,courses\n'
+        'ada,ada@example.com,Ada,Lovelace,student,1001,MATH140;CS110\n'
+        'alan,alan@example.com,Alan,Turing,tutor,,CS110\n'
+        'grace,grace@example.com,Grace,Hopper,student,1003,\n'
+        'ghost,ghost@example.com,,,student,,PHYS101\n'
+        'ada,ada2@example.com,,,student,,\n'
+        'bob,not-an-email,,,student,,\n'
+    )
+
+    def setUp(self):
+        Course.objects.create(c_name='Calculus', c_code='MATH140')
+        Course.objects.create(c_name='Programming', c_code='CS110')
+
+    def import_roster(self, roster=ROSTER, **kwargs):
+        return import_roster(read_roster(StringIO(roster)), 'testserver', **kwargs)
+
+    def test_import_in_chunks(self):
+        result = self.import_roster(chunk_size=2)
+        self.assertEqual((result.rows, result.users_created, result.profiles_created, result.enrollments),
+                         (6, 3, 3, 3))
+        self.assertEqual([line for line, _ in result.errors], [5, 6, 7])
+        self.assertIn('PHYS101', result.errors[0][1])
+        # Duplicates are caught across chunks too.
+        self.assertIn('more than once', result.errors[1][1])
+
+        ada = Student.objects.get(user__username='ada')
+        self.assertEqual(ada.ums_id, '1001')
+        self.assertEqual(set(ada.courses.values_list('c_code', flat=True)), {'MATH140', 'CS110'})
+        self.assertFalse(ada.user.has_usable_password())
+        self.assertEqual(list(Tutor.objects.get(user__username='alan').courses.values_list('c_code', flat=True)),
+                         ['CS110'])
+        self.assertEqual(Group.objects.get(name='student').user_set.count(), 2)
+        self.assertEqual(result.emails_queued, 3)
+        self.assertEqual(set(OutboundEmail.objects.values_list('to_email', 'subject')),
+                         {(f'{name}@example.com', 'Activate your account') for name in ('ada', 'alan', 'grace')})
+
+    def test_rerun_changes_nothing(self):
+        self.import_roster()
+        result = self.import_roster()
+        self.assertEqual((result.users_created, result.profiles_created, result.emails_queued), (0, 0, 0))
+        self.assertEqual(Student.courses.through.objects.count(), 2)
+        self.assertEqual(OutboundEmail.objects.count(), 3)
+
+    def test_queries_do_not_grow_with_rows(self):
+        def queries(rows, prefix):
+            roster = 'username,email,role,courses\n' + ''.join(
+                f'{prefix}{number},{prefix}{number}@example.com,student,MATH140\n' for number in range(rows))
+            with CaptureQueriesContext(connection) as captured:
+                self.import_roster(roster)
+            return len(captured)
+        # The first import also creates the role groups and the cache version. Above 80 rows,
+        # SQLite's limit on query parameters splits the user inserts into more batches.
+        queries(1, 'first')
+        self.assertEqual(queries(10, 'few'), queries(80, 'many'))
+
+    def test_benchmark_leaves_nothing_behind(self):
+        out = StringIO()
+        call_command('benchmark_roster_import', '--rows', '200', '--chunk-size', '50', stdout=out)
+        self.assertIn('Imported 200 rows', out.getvalue())
+        self.assertIn('200 activation emails queued, 0 rows rejected', out.getvalue())
+        self.assertFalse(User.objects.exists())
+
+    def test_upload_page(self):
+        self.client.force_login(User.objects.create_superuser('admin'))
+        roster = SimpleUploadedFile('roster.json', b'[{"username": "ada", "email": "ada@example.com", '
+                                                   b'"role": "student", "courses": "MATH140"}]')
+        response = self.client.post(reverse('roster_import'), {'roster': roster})
+        self.assertEqual(response.context['result'].users_created, 1)
+        self.assertTrue(Student.objects.filter(user__username='ada', courses__c_code='MATH140').exists())
+
+
+class TutorNotificationTests(TestCase):
+    """
+    Booking emails go out as soon as the booking commits; digest-mode tutors hear about bookings
+    that aren't urgent in their next digest, which sends nothing else from the queue.
+    """
+
+    def setUp(self):
+        self.course = Course.objects.create(c_name='Calculus', c_code='MATH140')
+        self.tutor = Tutor.objects.create(user=User.objects.create_user('tutor', email='tutor@example.com'))
+        self.student = Student.objects.create(user=User.objects.create_user('student', email='student@example.com'))
+        self.slot = Availability.objects.create(tutor=self.tutor, course=self.course, status='A',
+                                                date=date.today() + timedelta(days=2),
+                                                start_time=time(10), end_time=time(11))
+        self.client.force_login(self.student.user)
+
+    def book(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('booking_page', args=[self.slot.id]))
+        return sorted((message.to[0], message.subject) for message in mail.outbox)
+
+    def test_instant_tutors_are_emailed_with_the_booking(self):
+        Tutor.objects.filter(id=self.tutor.id).update(notification_mode='instant')
+        self.assertEqual(self.book(), [('student@example.com', 'Session Booked'),
+                                       ('tutor@example.com', 'Session Booked')])
+        self.assertFalse(OutboundEmail.objects.filter(sent_at__isnull=True).exists())
+
+    def test_digest_tutors_get_the_booking_in_the_digest(self):
+        call_command('send_tutor_digests', stdout=StringIO())
+        self.assertEqual(self.book(), [('student@example.com', 'Session Booked')])
+        other = OutboundEmail.objects.create(to_email='someone@example.com', subject='Activate', body='')
+        call_command('send_tutor_digests', stdout=StringIO())
+        self.assertEqual(mail.outbox[-1].to, ['tutor@example.com'])
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(list(OutboundEmail.objects.filter(sent_at__isnull=True)), [other])
+
+    def test_tutors_edit_their_courses(self):
+        other = Course.objects.create(c_name='Algebra', c_code='MATH120')
+        self.tutor.courses.add(self.course)
+        self.client.force_login(self.tutor.user)
+        self.assertContains(self.client.get(reverse('profile')), 'Tutor Courses')
+        self.client.post(reverse('profile'), {'first_name': 'Tu', 'last_name': 'Tor', 'notification_mode': 'instant',
+                                              'courses': [self.course.id, other.id]})
+        self.tutor.refresh_from_db()
+        self.assertEqual(self.tutor.notification_mode, 'instant')
+        self.assertEqual(set(self.tutor.courses.all()), {self.course, other})
+
+
+class CancelRangeTests(TestCase):
+    """
+    A tutor cancels the sessions of a date range, optionally only some time blocks, and their
+    students are told with replacement slots from other tutors.
+    """
+
+    def setUp(self):
+        self.course = Course.objects.create(c_name='Calculus', c_code='MATH140')
+        self.tutor = Tutor.objects.create(user=User.objects.create_user('tutor'))
+        other = Tutor.objects.create(user=User.objects.create_user('other'))
+        student = Student.objects.create(user=User.objects.create_user('student', email='student@example.com'))
+        self.day = date.today() + timedelta(days=1)
+
+        def slot(tutor, days, hour, **kwargs):
+            return Availability.objects.create(tutor=tutor, course=self.course, date=self.day + timedelta(days=days),
+                                               start_time=time(hour), end_time=time(hour + 1), **kwargs)
+        self.booked = slot(self.tutor, 0, 10, status='B', booked_by=student)
+        self.afternoon = slot(self.tutor, 0, 14, status='A')
+        self.next_day = slot(self.tutor, 1, 10, status='A')
+        self.later = slot(self.tutor, 5, 10, status='A')
+        self.replacement = slot(other, 2, 10, status='A')
+        self.client.force_login(self.tutor.user)
+
+    def test_cancel_a_time_block_over_two_days(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('cancel_sessions_range'), {
+                'start_date': self.day.isoformat(), 'end_date': (self.day + timedelta(days=1)).isoformat(),
+                'timeblocks': ['C'], 'offer_replacements': 'on'})
+        self.assertEqual(response.json(), {'success': True, 'cancelled': 2, 'notified': 1})
+        self.assertEqual(set(Availability.objects.filter(status='C')), {self.booked, self.next_day})
+        # Cancelled sessions keep their student, for the history.
+        self.assertEqual(Availability.objects.get(id=self.booked.id).booked_by.user.username, 'student')
+        self.assertEqual(SlotEvent.objects.filter(kind='cancelled', to_status='C').count(), 2)
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['student@example.com'])
+        self.assertIn(reverse('booking_page', args=[self.replacement.id]), mail.outbox[0].body)
+
+
+class ProfilePictureUploadTests(TestCase):
+    """An oversized profile picture is refused with a message, not a CSRF failure."""
+
+    def setUp(self):
+        self.student = Student.objects.create(user=User.objects.create_user('student'))
+        self.client = self.client_class(enforce_csrf_checks=True)
+        self.client.force_login(self.student.user)
+
+    def test_csrf_token_comes_before_the_picture(self):
+        page = self.client.get(reverse('profile')).content.decode()
+        form = page.index('id="profile_form"')
+        self.assertLess(form, page.index('name="csrfmiddlewaretoken"'))
+        self.assertLess(page.index('name="csrfmiddlewaretoken"'), page.index('name="profile_picture"'))
+
+    def test_oversized_picture_is_stopped_while_uploading(self):
+        self.client.get(reverse('profile'))
+        # Small enough for the declared length to pass, so the upload handler stops it.
+        picture = SimpleUploadedFile('big.png', b'0' * (PROFILE_PICTURE_MAX_SIZE + 1000))
+        response = self.client.post(reverse('profile'), {
+            'csrfmiddlewaretoken': self.client.cookies['csrftoken'].value,
+            'first_name': 'Stu', 'last_name': 'Dent', 'profile_picture': picture}, follow=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'The profile picture is too large.')
+        self.student.refresh_from_db()
+        self.assertFalse(self.student.profile_picture)
+
+
+class StaticAssetTests(SimpleTestCase):
+    """
+    build_static hashes and precompresses the assets the templates use, which are then served
+    with immutable caching; anything else is revalidated on every use.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(STATIC_ROOT=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        call_command('build_static', stdout=StringIO())
+
+    def get(self, path, **headers):
+        response = views.static_asset(RequestFactory().get('/', **headers), path)
+        self.addCleanup(response.close)
+        return response
+
+    def test_built_assets_are_immutable_and_precompressed(self):
+        path = next(name for name in staticfiles_storage.hashed_files.values() if name.endswith('.css'))
+        response = self.get(path, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        with staticfiles_storage.open(path) as asset:
+            self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), asset.read())
+        self.assertNotIn('Content-Encoding', self.get(path))
+
+    def test_templates_link_to_built_assets(self):
+        self.assertTrue(staticfiles_storage.is_hashed(staticfiles_storage.stored_name('images/favicons/Blue_logo.png')))
+
+    def test_other_assets_are_revalidated(self):
+        source = next(name for name in staticfiles_storage.hashed_files if name.endswith('.css'))
+        self.assertEqual(self.get(source)['Cache-Control'], 'no-cache')
+        with self.assertRaises(Http404):
+            self.get('css/missing.css')
+
+
+class MinifiedResponseTests(SimpleTestCase):
+    """
+    Templates lose their indentation but keep their line breaks and any pre or textarea content,
+    email bodies are left alone, and large text responses are gzipped.
+    """
+
+    def test_indentation_is_stripped_but_not_line_breaks(self):
+        source = '<ul>\n    <li>{{ name }}</li>  \n</ul>\n<pre>\n  kept\n</pre>\n<TEXTAREA>  kept  </TEXTAREA>\n'
+        minified = minify_html(source)
+        self.assertEqual(minified, '<ul>\n<li>{{ name }}</li>\n</ul>\n<pre>\n  kept\n</pre>\n<TEXTAREA>  kept  </TEXTAREA>\n')
+        self.assertEqual(minified.count('\n'), source.count('\n'))
+
+    def test_pages_are_minified_and_emails_are_not(self):
+        page = get_template('account/login.html').template.source
+        self.assertNotRegex(page, r'\n[ \t]+<')
+        email = get_template('emails/activate_account_email.html').template.source
+        with open(get_template('emails/activate_account_email.html').origin.name) as template:
+            self.assertEqual(email, template.read())
+
+    def compress(self, response):
+        middleware = CompressionMiddleware(lambda request: response)
+        return middleware(RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip'))
+
+    def test_large_text_responses_are_gzipped(self):
+        body = 'x' * COMPRESSION_MIN_SIZE
+        response = self.compress(HttpResponse(body))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content).decode(), body)
+
+    def test_small_streamed_and_binary_responses_are_left_alone(self):
+        small = HttpResponse('x' * (COMPRESSION_MIN_SIZE - 1))
+        streamed = StreamingHttpResponse(iter(['x' * COMPRESSION_MIN_SIZE]), content_type='text/event-stream')
+        binary = HttpResponse(b'x' * COMPRESSION_MIN_SIZE, content_type='image/png')
+        for response in (small, streamed, binary):
+            self.assertNotIn('Content-Encoding', self.compress(response))
+
+    def test_measure_responses_reports_each_variant(self):
+        output = StringIO()
+        call_command('measure_responses', reverse('login'), repeat=1, stdout=output)
+        sizes = [float(size) for size in output.getvalue().splitlines()[1].split()[1:6:2]]
+        plain, minified, gzipped = sizes
+        self.assertGreater(plain, minified)
+        self.assertGreater(minified, gzipped)
+
+
+class DashboardTests(TestCase):
+    """
+    The dashboard tiles and charts are JSON for superusers only, counting active sessions, and
+    may be reused by the browser for as long as the cached figures live.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.course = Course.objects.create(c_name='Calculus', c_code='MATH140')
+        tutor = Tutor.objects.create(user=User.objects.create_user('tutor'))
+        Student.objects.create(user=User.objects.create_user('student'))
+        for status in ('A', 'B', 'C'):
+            Availability.objects.create(tutor=tutor, course=self.course, status=status, date=date.today(),
+                                        start_time=time(10), end_time=time(11))
+        self.admin = User.objects.create_superuser('admin', password='password')
+        self.client.force_login(self.admin)
+
+    def test_stats_count_active_sessions(self):
+        response = self.client.get(reverse('dashboard_stats'))
+        self.assertEqual(response.json(), {'sessions': 2, 'tutors': 1, 'students': 1, 'courses': 1})
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('max-age=60', response['Cache-Control'])
+
+    def test_chart_counts_sessions_by_course(self):
+        response = self.client.get(reverse('dashboard_chart'))
+        self.assertEqual(response.json(), {'sessions_by_course': {'Calculus': 2}, 'students': 1, 'tutors': 1})
+
+    def test_figures_are_scoped_by_department(self):
+        maths = Department.objects.create(d_name='Mathematics', code='math')
+        physics = Department.objects.create(d_name='Physics', code='phys')
+        Course.objects.filter(id=self.course.id).update(department=maths)
+        Tutor.objects.update(department=maths)
+        mechanics = Course.objects.create(c_name='Mechanics', c_code='PHYS151', department=physics)
+        tutor = Tutor.objects.create(user=User.objects.create_user('physicist'), department=physics)
+        Availability.objects.create(tutor=tutor, course=mechanics, status='A', date=date.today(),
+                                    start_time=time(10), end_time=time(11))
+        Student.objects.get().courses.add(mechanics)
+
+        self.assertEqual(self.client.get(reverse('dashboard_stats')).json(),
+                         {'sessions': 3, 'tutors': 2, 'students': 1, 'courses': 2})
+        self.assertEqual(self.client.get(reverse('dashboard_stats'), {'department': 'math'}).json(),
+                         {'sessions': 2, 'tutors': 1, 'students': 0, 'courses': 1})
+        self.assertEqual(self.client.get(reverse('dashboard_stats'), {'department': 'phys'}).json(),
+                         {'sessions': 1, 'tutors': 1, 'students': 1, 'courses': 1})
+        self.assertEqual(self.client.get(reverse('dashboard_chart'), {'department': 'phys'}).json(),
+                         {'sessions_by_course': {'Mechanics': 1}, 'students': 1, 'tutors': 1})
+
+    def test_other_users_are_refused(self):
+        self.client.force_login(User.objects.get(username='student'))
+        for name in ('dashboard_stats', 'dashboard_chart'):
+            self.assertEqual(self.client.get(reverse(name)).status_code, 403)
+
+
+class TemplateProfilerTests(TestCase):
+    """
+    Staff can ask for a page's template render profile; rendering is only wrapped while a
+    profiled request is served.
+    """
+
+    def setUp(self):
+        self.staff = User.objects.create_user('staff', password='password', is_staff=True)
+        self.client.force_login(self.staff)
+
+    def test_profile_is_added_and_hooks_are_removed(self):
+        originals = [cls.__dict__[name] for cls, name, _ in profiling.TEMPLATE_HOOKS]
+        response = self.client.get(reverse('home'), {'profile_templates': 1})
+        self.assertContains(response, 'id="template-profile"')
+        self.assertContains(response, 'home.html')
+        self.assertEqual([cls.__dict__[name] for cls, name, _ in profiling.TEMPLATE_HOOKS], originals)
+
+    def test_other_users_get_no_profile(self):
+        self.staff.is_staff = False
+        self.staff.save()
+        response = self.client.get(reverse('home'), {'profile_templates': 1})
+        self.assertNotContains(response, 'id="template-profile"')
+
+
+@override_settings(REQUEST_PROFILER=True)
+class RequestProfilerTests(TestCase):
+    """
+    Requests are profiled for staff and for holders of an unrevoked token of an active staff
+    member; the recorded SQL leaves out the query parameters.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(REQUEST_PROFILE_DIR=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.directory = directory.name
+        self.staff = User.objects.create_user('staff', password='password', is_staff=True)
+
+    def test_recorded_sql_has_no_parameters(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('home'), HTTP_X_PROFILE=profiling.make_profile_token(self.staff))
+        with open(f"{self.directory}/{response['X-Profile-Id']}.sql") as sql:
+            recorded = sql.read()
+        self.assertIn('django_session', recorded)
+        self.assertNotIn(self.client.session.session_key, recorded)
+        self.assertNotIn('params=', recorded)
+
+    def test_tokens_stop_working_when_revoked(self):
+        token = profiling.make_profile_token(self.staff)
+        self.assertIn('X-Profile-Id', self.client.get(reverse('login'), HTTP_X_PROFILE=token))
+        call_command('make_profile_token', 'staff', revoke=True, stdout=StringIO())
+        self.assertNotIn('X-Profile-Id', self.client.get(reverse('login'), HTTP_X_PROFILE=token))
+
+    def test_tokens_stop_working_without_staff_status(self):
+        token = profiling.make_profile_token(self.staff)
+        User.objects.filter(id=self.staff.id).update(is_staff=False)
+        self.assertNotIn('X-Profile-Id', self.client.get(reverse('login'), HTTP_X_PROFILE=token))
+
+
+class LoginThrottleTests(TestCase):
+    """
+    Failed logins are counted in fixed windows blended into a sliding one; attempts over the
+    limit are refused until enough failures have slid out of range.
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def fail(self, times, now, username='student', ip='198.51.100.7'):
+        for _ in range(times):
+            throttling.record_login_failure(username, ip, now=now)
+
+    def test_refused_at_the_limit(self):
+        self.fail(4, now=600)
+        self.assertEqual(throttling.login_retry_after('student', '198.51.100.7', now=600), 0)
+        self.fail(1, now=600)
+        self.assertEqual(throttling.login_retry_after('student', '198.51.100.7', now=600), 300)
+        self.assertEqual(throttling.login_retry_after('Student', '203.0.113.1', now=601), 299)
+        self.assertEqual(throttling.login_retry_after('someone', '203.0.113.1', now=601), 0)
+
+    def test_previous_window_is_weighted_by_its_overlap(self):
+        self.fail(8, now=600)
+        retry_after = throttling.login_retry_after('student', '198.51.100.7', now=600)
+        self.assertEqual(retry_after, 413)
+        # 80% into the next window the 8 earlier failures still weigh 6.4.
+        self.assertEqual(throttling.login_retry_after('student', '198.51.100.7', now=960), 53)
+        self.assertEqual(throttling.login_retry_after('student', '198.51.100.7', now=600 + retry_after), 0)
+        self.assertEqual(throttling.login_retry_after('student', '198.51.100.7', now=1050), 0)
+
+    def test_address_limit_counts_every_username(self):
+        for number in range(50):
+            throttling.record_login_failure(f'user{number}', '198.51.100.7', now=600)
+        self.assertEqual(throttling.login_retry_after('student', '198.51.100.7', now=600), 300)
+        self.assertEqual(throttling.login_retry_after('student', '203.0.113.1', now=600), 0)
+
+    def login(self, password):
+        return self.client.post(reverse('login'), {'username': 'student', 'password': password})
+
+    def test_success_resets_the_username(self):
+        User.objects.create_user('student', password='password')
+        for _ in range(4):
+            self.login('wrong')
+        self.assertEqual(self.login('password').status_code, 302)
+        self.client.logout()
+        for _ in range(4):
+            self.login('wrong')
+        self.assertEqual(throttling.login_retry_after('student', '127.0.0.1'), 0)
+        self.login('wrong')
+        response = self.login('password')
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(0 < int(response['Retry-After']) <= 300)
+
+
+class IntervalIndexTests(SimpleTestCase):
+    """
+    Intervals are half-open, so sessions that only touch don't overlap, and the index stays
+    sorted however intervals are added.
+    """
+
+    def test_touching_intervals_do_not_overlap(self):
+        index = IntervalIndex([(10, 11, 'b'), (8, 9, 'a')])
+        self.assertIsNone(index.overlapping(9, 10))
+        self.assertIsNone(index.add(9, 10, 'c'))
+        self.assertIsNone(index.overlapping(11, 12))
+        self.assertEqual(index.overlapping(7, 8.5), (8, 9, 'a'))
+
+    def test_insertion_keeps_the_index_sorted(self):
+        index = IntervalIndex()
+        for start in (14, 9, 11, 16, 8):
+            self.assertIsNone(index.add(start, start + 1, start))
+        self.assertEqual(index.starts, [8, 9, 11, 14, 16])
+        self.assertEqual([item for _, _, item in index.intervals], [8, 9, 11, 14, 16])
+
+    def test_overlapping_intervals_are_refused(self):
+        index = IntervalIndex([(9, 11, 'a'), (13, 14, 'b')])
+        self.assertEqual(index.add(10, 12, 'c'), (9, 11, 'a'))
+        self.assertEqual(index.add(8, 15, 'c'), (13, 14, 'b'))
+        self.assertEqual(index.add(9.5, 10, 'c'), (9, 11, 'a'))
+        self.assertEqual(len(index), 2)
+
+
+class SessionOverlapTests(TestCase):
+    """A tutor can't create, and a student can't book, a session overlapping one they already have."""
+
+    def setUp(self):
+        self.course = Course.objects.create(c_name='Calculus', c_code='MATH140')
+        self.tutor = Tutor.objects.create(user=User.objects.create_user('tutor'))
+        self.day = date.today() + timedelta(days=2)
+        self.session = self.add_session(self.tutor, time(10), time(11))
+
+    def add_session(self, tutor, start_time, end_time, status='A'):
+        return Availability.objects.create(tutor=tutor, course=self.course, date=self.day, status=status,
+                                           start_time=start_time, end_time=end_time)
+
+    def test_find_overlap(self):
+        sessions = Availability.objects.active().filter(tutor=self.tutor, date=self.day)
+        self.add_session(self.tutor, time(13), time(14), status='C')
+        self.assertEqual(find_overlap(sessions, time(10, 30), time(12)), self.session)
+        self.assertEqual(find_overlap(sessions, time(9), time(10, 15)), self.session)
+        self.assertIsNone(find_overlap(sessions, time(11), time(12)))
+        self.assertIsNone(find_overlap(sessions, time(9), time(10)))
+        self.assertIsNone(find_overlap(sessions, time(13), time(14)))
+
+    def test_overlapping_slot_is_refused(self):
+        form = AvailabilityForm({'date': self.day, 'start_time': '10:30', 'end_time': '11:30',
+                                 'course': self.course.id, 'status': 'A', 'semester': 'Fall 2026'},
+                                user=self.tutor.user)
+        self.assertFalse(form.is_valid())
+        self.assertIn('The tutor already has a session', form.non_field_errors()[0])
+        form = AvailabilityForm({'date': self.day, 'start_time': '11:00', 'end_time': '12:00',
+                                 'course': self.course.id, 'status': 'A', 'semester': 'Fall 2026'},
+                                user=self.tutor.user)
+        self.assertTrue(form.is_valid(), form.errors)
+
+    def test_overlapping_booking_is_refused(self):
+        student = Student.objects.create(user=User.objects.create_user('student'))
+        self.session.status, self.session.booked_by = 'B', student
+        self.session.save()
+        other = self.add_session(Tutor.objects.create(user=User.objects.create_user('other')), time(10, 30), time(11, 30))
+        self.client.force_login(student.user)
+        response = self.client.post(reverse('booking_page', args=[other.id]))
+        self.assertRedirects(response, reverse('booking_page', args=[other.id]), fetch_redirect_response=False)
+        other.refresh_from_db()
+        self.assertEqual(other.status, 'A')
+
+
+class OccupancyHeatmapTests(TestCase):
+    """
+    The heatmap bins a semester's active sessions by day and starting hour and folds them onto
+    the weekdays, for superusers only.
+    """
+
+    def setUp(self):
+        cache.clear()
+        SemesterDates.objects.create(name='Fall 2026', startDate=date(2026, 9, 7), endDate=date(2026, 9, 13))
+        course = Course.objects.create(c_name='Calculus', c_code='MATH140')
+        self.tutor = Tutor.objects.create(user=User.objects.create_user('tutor'))
+        other = Tutor.objects.create(user=User.objects.create_user('other'))
+        student = Student.objects.create(user=User.objects.create_user('student'))
+        for tutor, day, start, status in ((self.tutor, date(2026, 9, 7), time(10), 'B'),
+                                          (other, date(2026, 9, 7), time(10, 30), 'A'),
+                                          (self.tutor, date(2026, 9, 8), time(7), 'B'),
+                                          (self.tutor, date(2026, 9, 8), time(12), 'C'),
+                                          (self.tutor, date(2026, 9, 14), time(10), 'B')):
+            Availability.objects.create(tutor=tutor, course=course, date=day, start_time=start,
+                                        end_time=time(start.hour + 1), status=status,
+                                        booked_by=student if status == 'B' else None)
+        self.client.force_login(User.objects.create_superuser('admin', password='password'))
+
+    def get_heatmap(self, **params):
+        response = self.client.get(reverse('dashboard_heatmap'), {'semester': 'Fall 2026', **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_sessions_are_binned_by_day_and_hour(self):
+        heatmap = self.get_heatmap()
+        self.assertEqual(heatmap['sessions'], 3)
+        self.assertEqual(len(heatmap['offered']), 7)
+        self.assertEqual(heatmap['offered'][0][2], 2)
+        self.assertEqual(heatmap['booked'][0][2], 1)
+        # Sessions before the first hour go to the first bin.
+        self.assertEqual(heatmap['offered'][1][0], 1)
+        self.assertEqual(heatmap['utilization'][0][2], 0.5)
+        self.assertEqual(heatmap['utilization'][1][0], 1)
+        self.assertIsNone(heatmap['utilization'][2][0])
+        self.assertEqual(heatmap['saturated'][1][0], 1)
+        self.assertEqual(heatmap['saturated'][0][2], 0)
+        self.assertEqual([(peak['weekday'], peak['hour']) for peak in heatmap['peaks']], [('Tue', 8), ('Mon', 10)])
+        self.assertEqual([(row['name'], row['offered'], row['booked']) for row in heatmap['tutors']],
+                         [('tutor', 2, 2), ('other', 1, 0)])
+
+    def test_heatmap_can_be_narrowed_to_a_tutor(self):
+        heatmap = self.get_heatmap(tutor=self.tutor.id)
+        self.assertEqual(heatmap['sessions'], 2)
+        self.assertEqual(heatmap['offered'][0][2], 1)
+
+    def test_unknown_semester_and_other_users(self):
+        self.assertEqual(self.client.get(reverse('dashboard_heatmap'), {'semester': 'Spring 1990'}).status_code, 404)
+        self.client.force_login(User.objects.get(username='student'))
+        self.assertEqual(self.client.get(reverse('dashboard_heatmap')).status_code, 403)
+
+
+class CoursePageTests(TestCase):
+    """
+    The profile course picker pages through the matching courses by code, each page continuing
+    after the last code of the previous one.
+    """
+
+    def setUp(self):
+        for number in range(1, 8):
+            Course.objects.create(c_name=f'Calculus {number}', c_code=f'MATH{number:03}')
+        Course.objects.create(c_name='Mechanics', c_code='PHYS151')
+        self.client.force_login(User.objects.create_user('student'))
+
+    def test_pages_continue_after_the_last_code(self):
+        page, after = search.course_page('calc', limit=3)
+        self.assertEqual([code for _, code, _ in page], ['MATH001', 'MATH002', 'MATH003'])
+        self.assertEqual(after, 'MATH003')
+        page, after = search.course_page('calc', after=after, limit=3)
+        self.assertEqual([code for _, code, _ in page], ['MATH004', 'MATH005', 'MATH006'])
+        page, after = search.course_page('calc', after=after, limit=3)
+        self.assertEqual([code for _, code, _ in page], ['MATH007'])
+        self.assertIsNone(after)
+
+    def test_every_word_must_match(self):
+        page, _ = search.course_page('math 7')
+        self.assertEqual([name for _, _, name in page], ['Calculus 7'])
+
+    def test_course_options(self):
+        response = self.client.get(reverse('course_options'), {'q': 'phys'})
+        course = Course.objects.get(c_code='PHYS151')
+        self.assertEqual(response.json(), {'results': [{'id': course.id, 'code': 'PHYS151', 'label': 'Mechanics'}],
+                                           'next': None})
+        response = self.client.get(reverse('course_options'), {'limit': 'x'})
+        self.assertEqual(len(response.json()['results']), 8)
+        response = self.client.get(reverse('course_options'), {'limit': 2, 'after': 'MATH004'})
+        self.assertEqual([course['code'] for course in response.json()['results']], ['MATH005', 'MATH006'])
+        self.assertEqual(response.json()['next'], 'MATH006')
+
+
+class WarmUpTests(TransactionTestCase):
+    """
+    A worker's warm-up runs every step, fills the caches and times each step; a failing step is
+    logged and skipped without stopping the others.
+    """
+
+    def setUp(self):
+        cache.clear()
+        search.invalidate_index()
+
+    def test_every_step_is_run_and_timed(self):
+        timings = warmup.warm_up()
+        self.assertEqual(list(timings), list(warmup.STEPS))
+        self.assertTrue(all(seconds >= 0 for seconds in timings.values()))
+        self.assertIsNotNone(search._built_at)
+        with CaptureQueriesContext(connection) as queries:
+            get_dashboard_stats()
+        self.assertEqual(len([query for query in queries if 'appusers_cache' not in query['sql']]), 0)
+
+    def test_failed_step_is_logged_and_skipped(self):
+        def fail():
+            raise RuntimeError('no templates')
+
+        with self.assertLogs('appusers.warmup', 'ERROR') as logs, \
+                mock.patch.dict(warmup.STEPS, {'templates': fail}):
+            timings = warmup.warm_up()
+        self.assertIsNone(timings['templates'])
+        self.assertIsNotNone(timings['caches'])
+        self.assertIn('Worker warm-up step templates failed', logs.output[0])
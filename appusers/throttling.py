@@ -0,0 +1,80 @@
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+# (failed attempts, seconds) allowed per username and per client address before logins are refused.
+LOGIN_USER_LIMIT = getattr(settings, 'LOGIN_USER_LIMIT', (5, 5 * 60))
+LOGIN_IP_LIMIT = getattr(settings, 'LOGIN_IP_LIMIT', (50, 5 * 60))
+
+
+def client_ip(request):
+    """Returns the client address, trusting X-Forwarded-For only when LOGIN_TRUST_FORWARDED_FOR is set."""
+    if getattr(settings, 'LOGIN_TRUST_FORWARDED_FOR', False) and request.META.get('HTTP_X_FORWARDED_FOR'):
+        return request.META['HTTP_X_FORWARDED_FOR'].split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def _scopes(username, ip):
+    return [(f'login:user:{username.lower()}', LOGIN_USER_LIMIT), (f'login:ip:{ip}', LOGIN_IP_LIMIT)]
+
+
+def _bucket_keys(scope, window, now):
+    bucket = int(now // window)
+    return f'{scope}:{bucket}', f'{scope}:{bucket - 1}'
+
+
+def login_retry_after(username, ip, now=None):
+    """
+    Returns how long a login attempt must wait, or 0 if it may go ahead.
+
+    Failed attempts are counted per username and per address in the cache, in fixed windows
+    blended into a sliding one: the previous window's count is weighted by how much of it still
+    overlaps the sliding window. Both counters are read with one cache round trip, so refused
+    attempts never reach the password hasher.
+
+    Args:
+        username (str): The username being logged in to.
+        ip (str): The client address.
+        now (float): The current time in seconds; defaults to time.time().
+
+    Returns:
+        int: The number of seconds to wait.
+    """
+    now = time.time() if now is None else now
+    scopes = _scopes(username, ip)
+    keys = {scope: _bucket_keys(scope, window, now) for scope, (limit, window) in scopes}
+    counts = cache.get_many([key for pair in keys.values() for key in pair])
+    wait = 0
+    for scope, (limit, window) in scopes:
+        current, previous = (counts.get(key, 0) for key in keys[scope])
+        overlap = 1 - (now % window) / window
+        if current + previous * overlap >= limit:
+            if current >= limit:
+                # Refused until this window is over and enough of it has slid out of range.
+                wait = max(wait, 1, window - now % window + window * (1 - limit / current))
+            else:
+                # Refused until enough of the previous window has slid out of range.
+                wait = max(wait, 1, window * (overlap - (limit - current) / previous))
+    return math.ceil(wait)
+
+
+def record_login_failure(username, ip, now=None):
+    """Counts a failed login attempt against the username and the address."""
+    now = time.time() if now is None else now
+    for scope, (limit, window) in _scopes(username, ip):
+        key = _bucket_keys(scope, window, now)[0]
+        # Buckets must outlive their own window to weigh in on the next one.
+        cache.add(key, 0, window * 2)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, window * 2)
+
+
+def reset_login_failures(username, now=None):
+    """Clears a username's failed attempts after a successful login; the address keeps its count."""
+    now = time.time() if now is None else now
+    scope, (limit, window) = _scopes(username, '')[0]
+    cache.delete_many(_bucket_keys(scope, window, now))
@@ -0,0 +1,142 @@
+import hashlib
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+from django.utils import timezone
+
+PROFILE_PICTURE_DIR = 'profile_pictures'
+PROFILE_PICTURE_EXTENSIONS = ('.gif', '.jpeg', '.jpg', '.png', '.webp')
+# Bytes an uploaded profile picture may have; larger uploads are rejected while they arrive.
+PROFILE_PICTURE_MAX_SIZE = getattr(settings, 'PROFILE_PICTURE_MAX_SIZE', 2 * 1024 * 1024)
+
+
+class SizeLimitUploadHandler(FileUploadHandler):
+    """
+    Upload handler that stops reading a request as soon as an uploaded file goes over a size limit.
+
+    It runs before the handlers that buffer the file, so nothing larger than the limit is kept in
+    memory or on disk. Views should also refuse a declared Content-Length over the limit before
+    touching the body; this covers requests that don't declare one.
+
+    Attributes:
+        max_size (int): The largest accepted file, in bytes.
+        exceeded (bool): Whether an upload was stopped for being too large.
+    """
+
+    def __init__(self, request=None, max_size=PROFILE_PICTURE_MAX_SIZE):
+        super().__init__(request)
+        self.max_size = max_size
+        self.received = 0
+        self.exceeded = False
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_size:
+            self.exceeded = True
+            raise StopUpload(connection_reset=True)
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+
+def request_too_large(request, max_size=PROFILE_PICTURE_MAX_SIZE):
+    """
+    Returns whether a request declares a body too large for an upload of max_size bytes.
+
+    Args:
+        request (HttpRequest): The request, whose body must not have been read yet.
+        max_size (int): The largest accepted file, in bytes.
+
+    Returns:
+        bool: True if the request should be refused without reading its body.
+    """
+    try:
+        content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        return False
+    # The multipart framing and the other form fields add a little to the file's size.
+    return content_length > max_size + 64 * 1024
+
+
+def content_hash(upload):
+    """
+    Computes the SHA-256 of an uploaded file chunk by chunk.
+
+    Args:
+        upload (UploadedFile): The uploaded file.
+
+    Returns:
+        str: The hex digest.
+    """
+    digest = hashlib.sha256()
+    for chunk in upload.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def store_upload(upload, directory=PROFILE_PICTURE_DIR):
+    """
+    Stores an upload under a name derived from its content, streaming it to storage.
+
+    Identical files get the same name, so a file already in storage is not written again. The
+    name changes whenever the content does, which lets the file be cached indefinitely.
+
+    Args:
+        upload (UploadedFile): The uploaded file.
+        directory (str): The storage directory to store it in.
+
+    Returns:
+        str: The storage name of the file.
+    """
+    digest = content_hash(upload)
+    extension = os.path.splitext(upload.name)[1].lower()
+    name = f'{directory}/{digest[:2]}/{digest}{extension}'
+    if not default_storage.exists(name):
+        upload.seek(0)
+        # Storage backends copy UploadedFile objects chunk by chunk rather than reading them whole.
+        saved = default_storage.save(name, upload)
+        if saved != name:
+            # Another request stored the same content first; keep that copy.
+            default_storage.delete(saved)
+    return name
+
+
+def purge_unreferenced(referenced, directory=PROFILE_PICTURE_DIR, grace=timedelta(hours=1), dry_run=False):
+    """
+    Deletes stored files that no row refers to any more.
+
+    Files newer than the grace period are kept, so an upload saved to storage but not yet to its
+    row is never removed.
+
+    Args:
+        referenced (set): The storage names still in use.
+        directory (str): The storage directory to clean up.
+        grace (timedelta): The minimum age of a file before it may be deleted.
+        dry_run (bool): Only report what would be deleted.
+
+    Returns:
+        list: The storage names deleted, or that would be deleted.
+    """
+    if not default_storage.exists(directory):
+        return []
+    cutoff = timezone.now() - grace
+    deleted = []
+    subdirectories, _ = default_storage.listdir(directory)
+    for subdirectory in subdirectories:
+        _, files = default_storage.listdir(f'{directory}/{subdirectory}')
+        for filename in files:
+            name = f'{directory}/{subdirectory}/{filename}'
+            if name in referenced or default_storage.get_modified_time(name) > cutoff:
+                continue
+            if not dry_run:
+                default_storage.delete(name)
+            deleted.append(name)
+    return deleted
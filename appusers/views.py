@@ -1,26 +1,46 @@
-import json
-
-from django.contrib.admin.helpers import AdminForm
-from datetime import timedelta
-
-from django.db.models import Count
-from django.db.models.functions import TruncWeek
-from django.http import JsonResponse
+import math
+import mimetypes
+import os
+from datetime import date
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
-from django.utils.datetime_safe import date
+from django.urls import reverse
 from UMassSchedulingApplication.settings import DEFAULT_FROM_EMAIL
-from .models import Availability, SemesterDates, Tutor, Student, Course
+from .models import Availability, Department, SemesterDates, Tutor, Student
 from django.contrib.auth import login, logout, get_user_model, authenticate, update_session_auth_hash
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from .forms import AvailabilityForm, SignupForm, StudentForm, TutorForm
+from .forms import AdminForm, AvailabilityForm, StudentForm, TutorForm
+from .events import publish_slot_event, slot_event_stream
+from . import search
+from .caching import DASHBOARD_CHART_TIMEOUT, DASHBOARD_STATS_TIMEOUT, get_dashboard_stats, \
+    get_occupancy_heatmap, get_sessions_by_course, tutor_ids_for_course
+from .roster import import_roster, read_roster, roster_format
+from .attendance import mark_attended, mark_no_shows
+from .mail import build_email, queue_emails
+from .notifications import notify_tutor
+from .cancellation import cancel_range
+from .uploads import PROFILE_PICTURE_DIR, SizeLimitUploadHandler, request_too_large
+from .intervals import find_overlap
+from .departments import get_department
+from .calendar_feed import feed_token, get_feed, touch_calendars, user_id_from_token
+from .throttling import client_ip, login_retry_after, record_login_failure, reset_login_failures
+from .models import TIMEBLOCK_CHOICES
 from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes
 from django.contrib.auth.tokens import default_token_generator
 from django.contrib.auth.models import User, Group
-from django.contrib.auth.forms import PasswordResetForm, PasswordChangeForm
+from django.contrib.auth.forms import PasswordChangeForm
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.views.static import serve
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 
 User = get_user_model()
 
@@ -32,6 +52,8 @@ def login_view(request):
     If the request method is POST, it attempts to authenticate the user based on the provided username and password.
     If authentication is successful, the user is logged in and redirected to the home page.
     If authentication fails, an error message is displayed and the user is redirected back to the login page.
+    After too many failed attempts for the username or from the client's address, attempts are refused
+    with a 429 response before the password is checked.
 
     Returns:
         HttpResponse: The rendered login page or a redirect response.
@@ -39,12 +61,21 @@ def login_view(request):
     if request.method == "POST":
         username = request.POST['username']
         password = request.POST['password']
+        ip = client_ip(request)
+        retry_after = login_retry_after(username, ip)
+        if retry_after:
+            messages.error(request, f"Too many failed login attempts. Try again in {math.ceil(retry_after / 60)} minute(s).")
+            response = render(request, 'account/login.html', status=429)
+            response['Retry-After'] = retry_after
+            return response
         user = authenticate(request, username=username, password=password)
         if user is not None:
+            reset_login_failures(username)
             login(request, user)
             return redirect('home')
 
         else:
+            record_login_failure(username, ip)
             messages.error(request, "Username or password invalid")
             return redirect('login')
 
@@ -234,12 +265,11 @@ def home_view(request):
   """
     current_user = request.user
     today = date.today()
-    slots = Availability.objects.all().order_by('date')
     try:
         student = current_user.student
-        s_today_sessions = Availability.objects.filter(booked_by=student, date=today).order_by('timeblock')
-        s_upcoming_sessions = Availability.objects.filter(booked_by=student, date__gt=today).order_by('date')
-        s_done_sessions = Availability.objects.filter(booked_by=student, date__lt=today).order_by('date')
+        s_today_sessions = Availability.objects.active().filter(booked_by=student, date=today).order_by('start_time')
+        s_upcoming_sessions = Availability.objects.active().filter(booked_by=student, date__gt=today).order_by('date')
+        s_done_sessions = Availability.objects.active().filter(booked_by=student, date__lt=today).order_by('date')
         no_show = student.no_shows
     except Student.DoesNotExist:
         no_show = 0
@@ -249,41 +279,92 @@ def home_view(request):
 
     try:
         tutor = current_user.tutor
-        t_today_sessions = Availability.objects.filter(tutor=tutor, date=today).order_by('timeblock')
-        t_upcoming_sessions = Availability.objects.filter(tutor=tutor, date__gt=today).order_by('date')
-        t_done_sessions = Availability.objects.filter(tutor=tutor, date__lt=today).order_by('date')
+        t_today_sessions = Availability.objects.active().filter(tutor=tutor, date=today).order_by('start_time')
+        t_upcoming_sessions = Availability.objects.active().filter(tutor=tutor, date__gt=today).order_by('date')
+        t_done_sessions = Availability.objects.active().filter(tutor=tutor, date__lt=today).order_by('date')
     except Tutor.DoesNotExist:
         t_done_sessions = []
         t_today_sessions = []
         t_upcoming_sessions = []
 
-    # Query the data for the histogram chart
-    session_data = (
-        Availability.objects.values('course__c_name')
-        .annotate(num_sessions=Count('id'))
-        .order_by('course__c_name')
-    )
+    # The site-wide tiles and charts are loaded by the page from dashboard_stats and
+    # dashboard_chart, so the personal session lists don't wait for the global aggregates.
+    departments = Department.objects.order_by('d_name') if current_user.is_superuser else []
+    return render(request, 'home.html',
+                  {'today': today, 'departments': departments, 'department': get_department(request),
+                   'tsessions': s_today_sessions, 'upsessions': s_upcoming_sessions, 'sdonesessions':s_done_sessions,
+                   'ttutsessions': t_today_sessions, 'uptutsessions': t_upcoming_sessions, 'tdonesessions':t_done_sessions,
+                   'no_show': no_show})
 
-    # Create a dictionary with course names as keys and number of sessions as values
-    session_dict = {data['course__c_name']: data['num_sessions'] for data in session_data}
 
-    # Convert the session_dict to a JSON string
-    session_data_json = json.dumps(session_dict)
+@login_required
+def dashboard_stats(request):
+    """
+View function for the dashboard statistics tiles.
 
+Only superusers see the tiles. The counts are for the whole site, or for the department given
+with the ``department`` GET parameter. They are cached and the response may be reused by the
+browser for as long as the cached counts live.
 
-    # Calculate the student and tutor counts
-    students_count = Student.objects.count()
-    tutors_count = Tutor.objects.count()
-    sessions_Count = Availability.objects.count()
-    courses_count = Course.objects.count()
+Returns:
+    JsonResponse: The numbers of sessions, tutors, students and courses.
+"""
+    if not request.user.is_superuser:
+        return JsonResponse({'error': 'Not authorized.'}, status=403)
+    response = JsonResponse(get_dashboard_stats(get_department(request)))
+    patch_cache_control(response, private=True, max_age=DASHBOARD_STATS_TIMEOUT)
+    return response
+
+
+@login_required
+def dashboard_chart(request):
+    """
+View function for the dashboard charts.
+
+Only superusers see the charts, for the whole site or the department given with the
+``department`` GET parameter. The sessions per course come from the slot status rollups and
+are cached; the student and tutor counts are shared with the statistics tiles.
+
+Returns:
+    JsonResponse: Sessions per course name and the student and tutor counts.
+"""
+    if not request.user.is_superuser:
+        return JsonResponse({'error': 'Not authorized.'}, status=403)
+    department = get_department(request)
+    stats = get_dashboard_stats(department)
+    response = JsonResponse({'sessions_by_course': get_sessions_by_course(department),
+                             'students': stats['students'], 'tutors': stats['tutors']})
+    patch_cache_control(response, private=True, max_age=DASHBOARD_CHART_TIMEOUT)
+    return response
+
+
+@login_required
+def dashboard_heatmap(request):
+    """
+View function for the staffing heatmap.
+
+Only superusers see the heatmap. It covers the semester named by the ``semester`` GET parameter,
+or the current one, and can be narrowed with the ``department`` and ``tutor`` parameters. The
+occupancy is cached like the other dashboard charts.
+
+Returns:
+    JsonResponse: The occupancy matrices of the semester.
+"""
+    if not request.user.is_superuser:
+        return JsonResponse({'error': 'Not authorized.'}, status=403)
+    if request.GET.get('semester'):
+        semester = SemesterDates.objects.filter(name=request.GET['semester']).first()
+    else:
+        semester = SemesterDates.objects.filter(currentSemester=True).first() or \
+            SemesterDates.objects.filter(startDate__lte=date.today(), endDate__gte=date.today()).first()
+    if semester is None:
+        return JsonResponse({'error': 'No such semester.'}, status=404)
+    tutor = int(request.GET['tutor']) if request.GET.get('tutor', '').isdigit() else None
+    response = JsonResponse(dict(get_occupancy_heatmap(semester, get_department(request), tutor),
+                                 semester=semester.name))
+    patch_cache_control(response, private=True, max_age=DASHBOARD_CHART_TIMEOUT)
+    return response
 
-    return render(request, 'home.html',
-                  {'slots': slots, 'today': today,
-                   'tsessions': s_today_sessions, 'upsessions': s_upcoming_sessions, 'sdonesessions':s_done_sessions,
-                   'ttutsessions': t_today_sessions, 'uptutsessions': t_upcoming_sessions, 'tdonesessions':t_done_sessions,
-                   'no_show': no_show,'session_data':session_data,'session_data_json': session_data_json,
-                   'students_count': students_count, 'tutors_count': tutors_count,
-                   'sessions_Count': sessions_Count, 'courses_count': courses_count})
 
 @login_required
 def available_slots(request):
@@ -298,19 +379,100 @@ Returns:
     HttpResponse: A rendered available_slot.html page with the relevant information.
 """
     today = date.today()
-    courses = Course.objects.all()
-    tutors = Tutor.objects.all()
 
     if request.user.student:
         student = request.user.student
         no_show = student.no_shows
         ns = True
-        slots = Availability.objects.filter(course__in=student.courses.all(), date__gt=today).order_by('date')
+        slots = Availability.objects.filter(status='A', course__in=student.courses.all(), date__gt=today).order_by('date')
         if no_show > 2:
             ns = False
     else:
-        slots = Availability.objects.all().filter(date__gt=today).order_by('date')
-    return render(request, 'available_slot.html', {'slots': slots, 'courses': courses, 'tutors': tutors, 'ns': ns})
+        slots = Availability.objects.filter(status='A', date__gt=today).order_by('date')
+    return render(request, 'available_slot.html', {'slots': slots, 'ns': ns, 'today': today})
+
+
+@login_required
+def slot_events(request):
+    """
+View function for the live slot update stream.
+
+Streams slot created, booked, cancelled and deleted events as server-sent events so the
+available slots page can update in place. The stream can be scoped with the ``course`` and
+``tutor`` GET parameters; students only ever receive events for their own courses. Clients
+resume from the ``Last-Event-ID`` header after a reconnect.
+
+Returns:
+    StreamingHttpResponse: A text/event-stream response.
+"""
+    course_id = request.GET.get('course')
+    tutor_id = request.GET.get('tutor')
+    course_ids = [int(course_id)] if course_id and course_id.isdigit() else None
+    if hasattr(request.user, 'student'):
+        student_course_ids = list(request.user.student.courses.values_list('id', flat=True))
+        if course_ids is None:
+            course_ids = student_course_ids
+        else:
+            course_ids = [c for c in course_ids if c in student_course_ids]
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    last_event_id = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+
+    response = StreamingHttpResponse(
+        slot_event_stream(course_ids=course_ids,
+                          tutor_id=int(tutor_id) if tutor_id and tutor_id.isdigit() else None,
+                          last_event_id=last_event_id),
+        content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@login_required
+def typeahead(request):
+    """
+View function for the course and tutor typeahead.
+
+Answers from the in-memory search index, so the filter inputs on the available slots page
+don't need to embed every course and tutor. The ``q`` GET parameter is the typed text,
+``type`` restricts the results to ``course`` or ``tutor``, ``course`` restricts them to the
+tutors of a course and ``limit`` caps their number.
+
+Returns:
+    JsonResponse: The matching courses and tutors.
+"""
+    kind = request.GET.get('type')
+    if kind not in ('course', 'tutor'):
+        kind = None
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), 50)
+    except ValueError:
+        limit = 10
+    course_id = request.GET.get('course')
+    tutor_ids = tutor_ids_for_course(course_id) if course_id and course_id.isdigit() else None
+    return JsonResponse({'results': search.search(request.GET.get('q', ''), kind=kind, limit=limit,
+                                                  tutor_ids=tutor_ids)})
+
+
+@login_required
+def course_options(request):
+    """
+View function for the course picker on the profile page.
+
+Returns one page of the courses whose name or code contains every word of the ``q`` GET
+parameter, so the profile page never embeds the whole course catalogue. ``after`` is the
+``next`` value of the previous page and ``limit`` caps the page size.
+
+Returns:
+    JsonResponse: The page of courses and the ``next`` value of the following page, or null.
+"""
+    try:
+        limit = min(max(int(request.GET.get('limit', search.COURSE_PAGE_SIZE)), 1), 50)
+    except ValueError:
+        limit = search.COURSE_PAGE_SIZE
+    courses, after = search.course_page(request.GET.get('q', ''), after=request.GET.get('after'), limit=limit)
+    results = [{'id': course_id, 'code': code, 'label': name} for course_id, code, name in courses]
+    return JsonResponse({'results': results, 'next': after})
 
 
 @login_required
@@ -318,9 +480,9 @@ def book_slots(request, availability_id):
     """
 View function for booking slots.
 
-Handles the slot booking process when a user submits the booking form. Sends confirmation
-emails to the student and tutor. If the user is a superuser, it allows selecting a student
-to book the slot for.
+Handles the slot booking process when a user submits the booking form. Queues a confirmation
+email to the student and notifies the tutor, right away or in their next digest. If the user is a superuser, it allows selecting a student
+to book the slot for. Bookings overlapping another of the student's sessions are refused.
 
 Args:
     request (HttpRequest): The HTTP request object.
@@ -329,7 +491,7 @@ Args:
 Returns:
     HttpResponse: A redirect response to the home page or a rendered booking_page.html page.
 """
-    availability = get_object_or_404(Availability, id=availability_id)
+    availability = get_object_or_404(Availability.objects.active(), id=availability_id)
 
     if request.method == 'POST':
         # get the selected student
@@ -339,33 +501,28 @@ Returns:
         else:
             student = request.user.student
 
+        overlap = find_overlap(Availability.objects.active().filter(booked_by=student, date=availability.date)
+                               .exclude(id=availability.id), availability.start_time, availability.end_time)
+        if overlap is not None:
+            messages.error(request, f'Already booked for a session from {overlap.get_timeblock_display()} that day.')
+            return redirect('booking_page', availability.id)
+
         # code to handle booking the slot goes here
+        previous_status = availability.status
         availability.booked_by = student
         availability.status = 'B'
         availability.save()
-        # Send confirmation email to the student
-        subject = 'Session Booked'
-        message = render_to_string('emails/session_booked_email.html', {
+        publish_slot_event('booked', availability, previous_status)
+        # Send the confirmation email to the student
+        queue_emails([build_email(student.user.email, 'Session Booked', 'emails/session_booked_email.html', {
             'user': student.user,
             'course': availability.course,
             'tutor': availability.tutor,
-            'timeblock': availability.timeblock,
-        })
-        from_email = DEFAULT_FROM_EMAIL
-        to_email = student.user.email
-        send_mail(subject, message, from_email, [to_email], fail_silently=False)
+            'timeblock': availability.get_timeblock_display(),
+        })], send=True)
 
-        # Send confirmation email to the tutor
-        subject = 'Session Booked'
-        message = render_to_string('emails/session_booked_email_tutor.html', {
-            'user': availability.tutor,
-            'course': availability.course,
-            'student': availability.booked_by,
-            'timeblock': availability.timeblock,
-        })
-        from_email = DEFAULT_FROM_EMAIL
-        to_email = availability.tutor.user.email
-        send_mail(subject, message, from_email, [to_email], fail_silently=False)
+        # Notify the tutor now or in their next digest
+        notify_tutor('booked', availability, student)
         messages.success(request,"Session booked successfully")
         return redirect('home')
 
@@ -413,14 +570,14 @@ def create_slot(request):
  View function for creating a session slot.
 
  Renders the create_slots.html template and handles the form submission for creating a new session slot.
- Sends a confirmation email to the tutor upon successful creation.
+ Notifies the tutor upon successful creation, right away or in their next digest.
 
  Returns:
      HttpResponse: A redirect response to the home page or a rendered create_slots.html page.
  """
     try:
         tutor = request.user.tutor
-        tutor_session_history = Availability.objects.filter(tutor=tutor).order_by('date')
+        tutor_session_history = Availability.objects.active().filter(tutor=tutor).order_by('date')
     except Tutor.DoesNotExist:
         tutor_session_history = []
 
@@ -435,20 +592,13 @@ def create_slot(request):
             if not request.user.is_superuser:
                 availability.tutor = request.user.tutor
             availability.save()
-            # Send confirmation email to the tutor
-            subject = 'Session Created'
-            message = render_to_string('emails/session_created_email.html', {
-                'user': tutor.user,
-                'course': availability.course,
-                'timeblock': availability.timeblock,
-            })
-            from_email = DEFAULT_FROM_EMAIL
-            to_email = tutor.user.email
-            send_mail(subject, message, from_email, [to_email], fail_silently=False)
+            publish_slot_event('created', availability)
+            # Notify the tutor now or in their next digest
+            notify_tutor('created', availability)
             messages.success(request, 'Session created successfully.')
             return redirect('home')
         else:
-            messages.error(request, 'Session already exist on same date.')
+            messages.error(request, ' '.join(form.non_field_errors()) or 'Session already exist on same date.')
             return redirect('create_slot')
     else:
         if request.user.is_superuser:
@@ -457,9 +607,11 @@ def create_slot(request):
             initial_data = {'tutor': request.user.tutor}
             form = AvailabilityForm(initial=initial_data, user=request.user)
 
-    return render(request, 'create_slots.html', {'form': form, 'tutor_session_history' : tutor_session_history})
+    return render(request, 'create_slots.html', {'form': form, 'tutor_session_history' : tutor_session_history,
+                                                 'timeblocks': TIMEBLOCK_CHOICES})
 
 
+@csrf_exempt
 @login_required
 def profile_view(request):
     """
@@ -468,9 +620,22 @@ View function for the profile page.
 Renders the profile.html template and handles the form submission for updating the user's profile.
 Depending on the user's role (student, tutor, or superuser), different forms are used.
 
+Profile picture uploads over the size limit are refused before the request body is read, which is
+why the upload limit is set up here and the CSRF check is done afterwards by _profile_view.
+
 Returns:
     HttpResponse: A rendered profile.html page with the relevant form.
 """
+    if request.method == 'POST' and request_too_large(request):
+        messages.error(request, 'The profile picture is too large.')
+        return redirect('profile')
+    upload_limit = SizeLimitUploadHandler(request)
+    request.upload_handlers.insert(0, upload_limit)
+    return _profile_view(request, upload_limit)
+
+
+@csrf_protect
+def _profile_view(request, upload_limit):
     user = request.user
     if hasattr(user, 'student'):
         profile = user.student
@@ -482,22 +647,122 @@ Returns:
     if request.user.is_superuser:
         form_class = AdminForm
         if request.method == 'POST':
-            form = form_class(request.POST)
+            form = form_class(request.POST, instance=user)
             if form.is_valid():
                 form.save()
                 messages.success(request, 'Profile Updated!')
         else:
-            form = form_class()  # remove the instance argument
+            form = form_class(instance=user)
     else:
         if request.method == 'POST':
-            form = form_class(request.POST, instance=profile)
+            form = form_class(request.POST, request.FILES, instance=profile)
+            if upload_limit.exceeded:
+                messages.error(request, 'The profile picture is too large.')
+                return redirect('profile')
             if form.is_valid():
                 form.save()
                 messages.success(request, 'Profile Updated!')
         else:
             form = form_class(instance=profile)
 
-    return render(request, 'profile.html', {'form': form})
+    profile_picture_url = None
+    if hasattr(user, 'student') and user.student.profile_picture:
+        profile_picture_url = user.student.profile_picture.url
+    elif hasattr(user, 'tutor'):
+        profile_picture_url = user.tutor.profile_picture
+
+    calendar_url = None
+    if not user.is_superuser:
+        calendar_url = request.build_absolute_uri(reverse('calendar_feed', args=[feed_token(user)]))
+
+    return render(request, 'profile.html', {'form': form, 'profile_picture_url': profile_picture_url,
+                                            'calendar_url': calendar_url})
+
+
+def calendar_feed(request, token):
+    """
+View function for a user's iCalendar feed of their tutoring sessions.
+
+Calendar apps poll the feed without logging in, so the user is identified by the signed token in
+the URL. The feed is cached until the user's sessions change, and its ETag and Last-Modified
+validators let a poll with nothing new end in a 304.
+
+Args:
+    token (str): The user's feed token, as shown on their profile.
+
+Returns:
+    HttpResponse: The text/calendar feed, a 304, or a 404 for an unknown token.
+"""
+    user_id = user_id_from_token(token)
+    profile = User.objects.filter(pk=user_id, is_active=True).values('student__id', 'tutor__id').first() \
+        if user_id else None
+    if profile is None:
+        raise Http404('Unknown calendar feed.')
+
+    feed = get_feed(user_id, profile['tutor__id'], profile['student__id'], request.get_host())
+    response = get_conditional_response(request, etag=feed['etag'], last_modified=feed['last_modified'])
+    if response is None:
+        response = HttpResponse(feed['body'], content_type='text/calendar; charset=utf-8')
+    response['ETag'] = feed['etag']
+    response['Last-Modified'] = http_date(feed['last_modified'])
+    patch_cache_control(response, private=True, max_age=5 * 60)
+    return response
+
+
+def static_asset(request, path):
+    """
+View function for static assets when they are not served by the web server, which is only routed
+when SERVE_FILES is set, by default under DEBUG.
+
+Assets from the build_static output are content-hashed, so they are sent with far-future immutable
+caching, as the precompressed brotli or gzip copy when the browser accepts it. Assets that are not
+part of the build are served from their source directories and revalidated on every use.
+
+Args:
+    path (str): The asset's path below STATIC_URL.
+
+Returns:
+    FileResponse: The asset, or a 404 if there is none with that path.
+"""
+    built = os.path.join(settings.STATIC_ROOT, path)
+    if staticfiles_storage.is_hashed(path) and os.path.isfile(built):
+        content_type, _ = mimetypes.guess_type(path)
+        accepted = request.headers.get('Accept-Encoding', '')
+        for suffix, encoding in (('.br', 'br'), ('.gz', 'gzip')):
+            if encoding in accepted and os.path.isfile(built + suffix):
+                response = FileResponse(open(built + suffix, 'rb'), content_type=content_type)
+                response['Content-Encoding'] = encoding
+                break
+        else:
+            response = FileResponse(open(built, 'rb'), content_type=content_type)
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+        response['Vary'] = 'Accept-Encoding'
+        return response
+
+    source = finders.find(path)
+    if source is None:
+        raise Http404('Static asset not found.')
+    response = FileResponse(open(source, 'rb'))
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+def profile_picture(request, name):
+    """
+View function for stored profile pictures, only routed when SERVE_FILES is set.
+
+The pictures are stored under their content hash, so a name always refers to the same bytes and
+the response can be cached by browsers and proxies for as long as they like.
+
+Args:
+    name (str): The picture's name below the profile picture directory.
+
+Returns:
+    HttpResponse: The picture, or a 404 if there is none with that name.
+"""
+    response = serve(request, f'{PROFILE_PICTURE_DIR}/{name}', document_root=settings.MEDIA_ROOT)
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
 
 
 @login_required
@@ -528,6 +793,34 @@ Returns:
         roles = Group.objects.all()
         return render(request, 'assign_roles.html', {'users': users, 'roles': roles})
 
+@login_required
+def roster_import(request):
+    """
+View function for importing a roster of students and tutors.
+
+Handles the upload of a CSV, JSON Lines or JSON roster and imports its users, roles and course
+enrollments in bulk. Activation emails for the new users are queued for send_queued_emails.
+Only superusers can import rosters. The page sits with assign_roles among the site's own
+administration pages rather than in the Django admin, which only staff users can open.
+
+Returns:
+    HttpResponse: A rendered roster_import.html page with the import summary.
+"""
+    if not request.user.is_superuser:
+        messages.error(request, 'You are not authorized to access this page.')
+        return redirect('home')
+
+    result = None
+    if request.method == 'POST' and request.FILES.get('roster'):
+        roster = request.FILES['roster']
+        try:
+            result = import_roster(read_roster(roster, roster_format(roster.name)), request.get_host())
+        except ValueError as error:
+            messages.error(request, str(error))
+        else:
+            messages.success(request, f'Imported {result.rows - len(result.errors)} of {result.rows} rows.')
+    return render(request, 'roster_import.html', {'result': result})
+
 @login_required
 def enter_dates(request):
     """
@@ -570,27 +863,37 @@ def cancel_session(request):
 
  Handles the cancellation of a session by the student or tutor. If the session is booked and the user is a student,
  the session status is changed to available and the booked_by field is set to None. If the user is a tutor, the session
- is deleted. Cancellation emails are sent to the affected parties.
+ status is changed to cancelled; the row is kept for its history. Each change is recorded in the slot event log.
 
  Returns:
      HttpResponse: A JsonResponse indicating the success or failure of the cancellation.
  """
     if request.method == 'POST':
         session_id = request.POST.get('session_id')
-        session = Availability.objects.filter(pk=session_id).first()
+        session = Availability.objects.active().filter(pk=session_id).first()
 
         if session :
             if hasattr(request.user, 'student'):
                 student = request.user.student
+                notify_tutor('cancelled', session, student)
+                previous_status = session.status
                 session.status = 'A'
                 session.booked_by = None
+                session.reminder_sent_at = None
                 session.save()
+                publish_slot_event('cancelled', session, previous_status, student_id=student.id)
+                # The slot no longer names the student, so the save didn't mark their feed changed.
+                touch_calendars(student_ids=[student.id])
                 #send_cancellation_emails(student, session.tutor, session.course, session.timeblock)
                 messages.success(request, 'Session Cancelled !')
                 return JsonResponse({'success': True})
             elif hasattr(request.user, 'tutor'):
                 #send_cancellation_emails(session.booked_by, session.tutor, session.course, session.timeblock)
-                session.delete()
+                # Keep the row for its history; cancelled slots are excluded from the active queries.
+                previous_status = session.status
+                session.status = 'C'
+                session.save(update_fields=['status'])
+                publish_slot_event('cancelled', session, previous_status)
 
                 messages.success(request, 'Session Cancelled !')
                 return JsonResponse({'success': True})
@@ -602,6 +905,42 @@ def cancel_session(request):
 
     return redirect('home')
 
+@login_required
+def cancel_sessions_range(request):
+    """
+ View function for cancelling all of a tutor's sessions in a date range.
+
+ Handles a POST with ``start_date``, ``end_date``, optional ``timeblocks`` and an ``offer_replacements``
+ flag. Every affected session is cancelled at once and the students who booked them are notified in one
+ batch, optionally with open slots from other tutors of the same course. Superusers pick the tutor with
+ the ``tutor`` parameter.
+
+ Returns:
+     HttpResponse: A JsonResponse with the number of sessions cancelled and students notified.
+ """
+    if request.method != 'POST':
+        return redirect('create_slot')
+    if request.user.is_superuser:
+        tutor = Tutor.objects.filter(pk=request.POST.get('tutor')).first()
+    else:
+        tutor = getattr(request.user, 'tutor', None)
+    if tutor is None:
+        return JsonResponse({'success': False, 'error': 'User is not a tutor.'})
+    try:
+        start_date = date.fromisoformat(request.POST.get('start_date', ''))
+        end_date = date.fromisoformat(request.POST.get('end_date') or request.POST.get('start_date', ''))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Enter valid dates.'})
+    if end_date < start_date:
+        return JsonResponse({'success': False, 'error': 'The end date must not be before the start date.'})
+
+    timeblocks = [block for block in request.POST.getlist('timeblocks') if block in dict(TIMEBLOCK_CHOICES)]
+    cancelled, notified = cancel_range(tutor, start_date, end_date, timeblocks=timeblocks,
+                                       offer_replacements=request.POST.get('offer_replacements') == 'on',
+                                       domain=request.get_host())
+    messages.success(request, f'{cancelled} session(s) cancelled.')
+    return JsonResponse({'success': True, 'cancelled': cancelled, 'notified': notified})
+
 # def send_cancellation_emails(student, tutor, course, timeblock):
 #     """
 #   Sends cancellation emails to the student and tutor when a session is cancelled.
@@ -639,6 +978,31 @@ def cancel_session(request):
 #     to_email = tutor.user.email
 #     #send_mail(subject, message, from_email, [to_email], fail_silently=False)
 
+@login_required
+def mark_attendance(request):
+    """
+ View function for confirming attendance of many sessions at once.
+
+ Handles a POST with one or more ``session_ids`` and an optional ``attended`` flag ("false" to undo)
+ and records attendance for all of them with a single update. Tutors can only mark their own sessions.
+ Sessions left unmarked are counted as no-shows by the process_no_shows command; changes to sessions it
+ has already processed correct the students' no-show counts.
+
+ Returns:
+     HttpResponse: A JsonResponse with the number of sessions updated.
+ """
+    if request.method != 'POST':
+        return redirect('session_history')
+    session_ids = [session_id for session_id in request.POST.getlist('session_ids') if session_id.isdigit()]
+    mark = mark_attended if request.POST.get('attended', 'true') != 'false' else mark_no_shows
+    if request.user.is_superuser:
+        updated = mark(session_ids)
+    elif hasattr(request.user, 'tutor'):
+        updated = mark(session_ids, tutor=request.user.tutor)
+    else:
+        return JsonResponse({'success': False, 'error': 'User is not a tutor.'})
+    return JsonResponse({'success': True, 'updated': updated})
+
 @login_required
 def session_history(request):
     """
@@ -652,13 +1016,13 @@ Returns:
     slots = Availability.objects.all().order_by('date')
     try:
         student = current_user.student
-        student_session_history = Availability.objects.filter(booked_by=student, date__lt=today).order_by('date')
+        student_session_history = Availability.objects.active().filter(booked_by=student, date__lt=today).order_by('date')
     except Student.DoesNotExist:
         student_session_history = []
 
     try:
         tutor = current_user.tutor
-        tutor_session_history = Availability.objects.filter(tutor=tutor, date__lt=today).order_by('date')
+        tutor_session_history = Availability.objects.active().filter(tutor=tutor, date__lt=today).order_by('date')
     except Tutor.DoesNotExist:
         tutor_session_history = []
 
@@ -714,7 +1078,7 @@ def get_sessions(request):
    The tutor ID and date are expected to be provided as GET parameters in the request.
 
    The function filters the Availability objects based on the tutor ID and date.
-   It constructs a list of session dictionaries containing the timeblock and course name.
+   It constructs a list of session dictionaries containing the session's times and course name.
    The list is then returned as a JSON response.
 
    Args:
@@ -726,9 +1090,10 @@ def get_sessions(request):
    """
     tutor_id = request.GET.get('tutor')
     date = request.GET.get('date')
-    sessions = Availability.objects.filter(tutor=tutor_id, date=date)
+    sessions = Availability.objects.active().filter(tutor=tutor_id, date=date).select_related('course') \
+        .order_by('start_time')
     history = []
     for session in sessions:
-        session_dict = {'timeblock': session.timeblock, 'course': session.course.c_name}
+        session_dict = {'timeblock': session.get_timeblock_display(), 'course': session.course.c_name}
         history.append(session_dict)
     return JsonResponse({'history': history})
\ No newline at end of file
@@ -0,0 +1,97 @@
+import logging
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.db import connections
+from django.template import engines
+from django.urls import get_resolver, reverse
+from django.utils.formats import get_format
+from django.utils.module_loading import import_string
+
+from . import search
+from .caching import get_course_tutor_map, get_dashboard_stats, get_sessions_by_course
+from .template_loaders import warm_templates
+
+logger = logging.getLogger(__name__)
+
+
+def _database():
+    # Loads the database backends and runs their connection setup once. The connections are
+    # closed again afterwards, see warm_up.
+    for alias in connections:
+        connections[alias].ensure_connection()
+
+
+def _urls():
+    # Importing the URLconf imports every view; reversing once builds the reverse lookup tables.
+    get_resolver().url_patterns
+    reverse('login')
+
+
+def _imports():
+    # What Django only imports when the first request needs it.
+    for engine in engines.all():
+        if hasattr(engine, 'engine'):
+            engine.engine.template_context_processors
+    import_module(settings.SESSION_ENGINE)
+    import_string(settings.SESSION_SERIALIZER)
+    import_string(settings.MESSAGE_STORAGE)
+    staticfiles_storage.base_url
+    get_format('DATE_FORMAT')
+
+
+def _templates():
+    if settings.TEMPLATE_WARMUP:
+        warm_templates()
+
+
+def _caches():
+    get_course_tutor_map()
+    search.get_index()
+    get_dashboard_stats()
+    get_sessions_by_course()
+
+
+# Run in this order, so the cache fill finds the database backend and the views loaded.
+STEPS = {
+    'database': _database,
+    'urls': _urls,
+    'imports': _imports,
+    'templates': _templates,
+    'caches': _caches,
+}
+
+
+def warm_up(steps=None):
+    """
+    Pays the cold costs of a new worker process before it accepts its first request.
+
+    Without it, the first requests a worker serves import the views and the modules Django loads
+    lazily, build the URL resolver's lookup tables, compile templates, fill the caches
+    and load the database backend. A step that fails is logged and skipped; the worker still boots.
+
+    Database connections are closed at the end, so a worker forked from a preloading master
+    never shares the master's connection.
+
+    Args:
+        steps (list): The STEPS keys to run; defaults to all of them.
+
+    Returns:
+        dict: Step names mapped to the seconds they took, or None for steps that failed.
+    """
+    timings = {}
+    for step in steps or STEPS:
+        started = time.perf_counter()
+        try:
+            STEPS[step]()
+        except Exception:
+            logger.exception('Worker warm-up step %s failed', step)
+            timings[step] = None
+            continue
+        timings[step] = time.perf_counter() - started
+    connections.close_all()
+    logger.info('Worker warm-up: %s', ', '.join(
+        f'{step} {"failed" if seconds is None else f"{seconds * 1000:.0f} ms"}' for step, seconds in timings.items()))
+    return timings